@@ -0,0 +1,188 @@
+"""
+End-to-end sync benchmark.
+
+Starts the Tally and ingest stand-ins in a separate process, runs the
+sync pipeline used by SyncWorker and the CLI against them, and prints a
+JSON report: throughput, peak RSS of the sync process and time per stage
+(fetch, parse, serialize, upload).
+
+    python benchmarks/bench_sync.py --records 100000
+    python benchmarks/bench_sync.py --records 1000000 --tally-latency-ms 50 --encoding utf-16
+    python benchmarks/bench_sync.py --records 50000 --set stream_parse=false --output before.json
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+# Share of --records given to each collection, roughly a trading company's mix
+RECORD_MIX = {'ledgers': 0.15, 'stock_items': 0.05, 'vouchers': 0.80}
+
+
+def serve_stand_ins(scale: Dict[str, int], days: int, tally_latency_ms: float,
+                    server_latency_ms: float, encoding: str, ports):
+    """Child process: run both stand-ins until terminated"""
+    import threading
+    import fake_ingest
+    import fake_tally
+
+    tally = fake_tally.create_server(scale, days, tally_latency_ms, encoding)
+    ingest = fake_ingest.create_server(server_latency_ms)
+    threading.Thread(target=ingest.serve_forever, daemon=True).start()
+    ports.put((tally.server_port, ingest.server_port))
+    tally.serve_forever()
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KiB, macOS bytes
+        return peak / (1024 * 1024) if platform.system() == 'Darwin' else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+    except (ImportError, AttributeError):
+        return None
+
+
+def parse_overrides(pairs: List[str]) -> Dict:
+    """--set key=value pairs; values are JSON when they parse as JSON"""
+    overrides = {}
+    for pair in pairs:
+        key, _, value = pair.partition('=')
+        try:
+            overrides[key] = json.loads(value)
+        except ValueError:
+            overrides[key] = value
+    return overrides
+
+
+def run_benchmark(args) -> Dict:
+    """Run the sync against fresh stand-ins and build the report"""
+    import requests
+    import tally_sync_core as core
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    scale = {name: int(args.records * share) for name, share in RECORD_MIX.items()}
+    for name in scale:
+        if getattr(args, name) is not None:
+            scale[name] = getattr(args, name)
+
+    ports = multiprocessing.Queue()
+    stand_ins = multiprocessing.Process(
+        target=serve_stand_ins,
+        args=(scale, args.days, args.tally_latency_ms, args.server_latency_ms, args.encoding, ports),
+        daemon=True
+    )
+    stand_ins.start()
+    try:
+        tally_port, ingest_port = ports.get(timeout=30)
+        ingest_url = f"http://127.0.0.1:{ingest_port}/api"
+
+        core.ConfigManager.CONFIG_DIR = Path(tempfile.mkdtemp(prefix='tally_sync_bench_'))
+        today = datetime.now()
+        config = core.ConfigManager.get_default_config()
+        config.update({
+            'tally_host': '127.0.0.1',
+            'tally_port': tally_port,
+            'server_url': ingest_url,
+            'from_date': (today - timedelta(days=args.days - 1)).strftime('%Y%m%d'),
+            'to_date': today.strftime('%Y%m%d'),
+        })
+        config.update(parse_overrides(args.set))
+
+        runs = []
+        for _ in range(args.repeat):
+            if not args.keep_state:
+                core.ConfigManager.CONFIG_DIR = Path(tempfile.mkdtemp(prefix='tally_sync_bench_'))
+            started = time.perf_counter()
+            results = core.SyncRunner(config, progress=lambda message: None).run()
+            elapsed = time.perf_counter() - started
+
+            synced = sum(count for name, count in results.get('items_synced', {}).items()
+                         if not name.endswith('_skipped'))
+            runs.append({
+                'success': results.get('success', False),
+                'error': results.get('error'),
+                'seconds': round(elapsed, 3),
+                'records': synced,
+                'records_per_second': round(synced / elapsed, 1) if elapsed else None,
+                'stages': {stage: round(seconds, 3) for stage, seconds in results.get('stages', {}).items()},
+                'items_synced': results.get('items_synced', {}),
+                'connections': results.get('connections', {}),
+            })
+
+        ingest_stats = requests.get(f"{ingest_url}/_stats", timeout=10).json()
+    finally:
+        stand_ins.terminate()
+        stand_ins.join(timeout=5)
+
+    return {
+        'benchmark': 'sync',
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'scale': scale,
+        'params': {
+            'days': args.days,
+            'tally_latency_ms': args.tally_latency_ms,
+            'server_latency_ms': args.server_latency_ms,
+            'encoding': args.encoding,
+            'repeat': args.repeat,
+            'keep_state': args.keep_state,
+            'overrides': parse_overrides(args.set),
+        },
+        'runs': runs,
+        'peak_rss_mb': round(peak_rss_mb() or 0, 1) or None,
+        'ingest': ingest_stats,
+    }
+
+
+def main(argv: Optional[list] = None) -> int:
+    """Benchmark entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark a full sync against local Tally/ingest stand-ins")
+    parser.add_argument('--records', type=int, default=10000,
+                        help="total records, split 15%% ledgers / 5%% stock items / 80%% vouchers")
+    parser.add_argument('--ledgers', type=int, help="override the ledger count")
+    parser.add_argument('--stock-items', dest='stock_items', type=int, help="override the stock item count")
+    parser.add_argument('--vouchers', type=int, help="override the voucher count")
+    parser.add_argument('--days', type=int, default=30, help="days the vouchers are spread over")
+    parser.add_argument('--tally-latency-ms', type=float, default=0, help="delay before each Tally response")
+    parser.add_argument('--server-latency-ms', type=float, default=0, help="delay per ingest request")
+    parser.add_argument('--encoding', choices=['utf-8', 'utf-16'], default='utf-8',
+                        help="Tally response encoding")
+    parser.add_argument('--set', action='append', default=[], metavar='KEY=VALUE',
+                        help="override a sync config key, e.g. --set upload_concurrency=8")
+    parser.add_argument('--repeat', type=int, default=1, help="number of sync runs")
+    parser.add_argument('--keep-state', action='store_true',
+                        help="keep change store/watermarks between runs to measure incremental syncs")
+    parser.add_argument('--output', type=Path, help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args)
+    text = json.dumps(report, indent=2)
+
+    if args.output:
+        args.output.write_text(text)
+    else:
+        print(text)
+    return 0 if all(run['success'] for run in report['runs']) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
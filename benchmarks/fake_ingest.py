@@ -0,0 +1,162 @@
+"""
+Local stand-in for the ingest API (Node or Laravel server).
+
+Accepts the same endpoints, Content-Encodings, NDJSON streams and
+MessagePack /bulk batches (when msgpack is installed) as the real servers, decodes and parses every upload, and keeps counters the
+benchmark reads back from GET /api/_stats. An optional per-request latency stands in for
+database time.
+"""
+import gzip
+import http.server
+import json
+import threading
+import time
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class FakeIngestHandler(http.server.BaseHTTPRequestHandler):
+    """Minimal ingest API"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path.endswith('/health'):
+            encodings = ['gzip', 'deflate'] + (['zstd'] if zstandard else [])
+            content_types = ['application/json', 'application/x-ndjson']
+            if msgpack:
+                content_types.append('application/x-msgpack')
+            self._reply(200, {'status': 'ok', 'accept_encoding': encodings,
+                              'accept_content_type': content_types})
+        elif self.path.endswith('/_stats'):
+            with self.server.stats_lock:
+                self._reply(200, dict(self.server.stats))
+        else:
+            self._reply(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        encoding = self.headers.get('Content-Encoding', '')
+        ndjson = self.headers.get('Content-Type', '').startswith('application/x-ndjson')
+        bulk = self.path.endswith('/bulk')
+        try:
+            if ndjson:
+                records, json_bytes, wire_bytes = self._read_ndjson(encoding)
+            else:
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                wire_bytes = len(body)
+                if encoding == 'gzip':
+                    body = gzip.decompress(body)
+                elif encoding == 'deflate':
+                    body = zlib.decompress(body)
+                elif encoding == 'zstd' and zstandard:
+                    body = zstandard.ZstdDecompressor().decompressobj().decompress(body)
+                if bulk:
+                    records = self._read_bulk(body)
+                else:
+                    data = json.loads(body)
+                    records = len(data) if isinstance(data, list) else 1
+                json_bytes = len(body)
+        except Exception as e:
+            self.close_connection = True
+            self._reply(400, {'success': False, 'error': str(e)})
+            return
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        with self.server.stats_lock:
+            stats = self.server.stats
+            stats['requests'] += 1
+            stats['streamed_requests'] += 1 if ndjson else 0
+            stats['bulk_requests'] += 1 if bulk else 0
+            stats['records'] += records
+            stats['wire_bytes'] += wire_bytes
+            stats['json_bytes'] += json_bytes
+
+        self._reply(200, {'success': True, 'inserted': records, 'updated': 0, 'total': records})
+
+    def _read_bulk(self, body: bytes) -> int:
+        """Decode a columnar MessagePack batch into rows, like the Node server"""
+        if not msgpack:
+            raise ValueError("msgpack is not installed")
+        batch = msgpack.unpackb(body)
+        strings = batch['strings']
+        columns = {}
+        for field, values in batch['columns'].items():
+            if field in batch['dict_columns']:
+                values = [None if index is None else strings[index] for index in values]
+            if len(values) != batch['count']:
+                raise ValueError(f"Column {field} has {len(values)} values, expected {batch['count']}")
+            columns[field] = values
+        rows = list(zip(*columns.values()))
+        return len(rows) if columns else batch['count']
+
+    def _read_ndjson(self, encoding: str):
+        """Decode a chunked NDJSON body incrementally, like the real servers"""
+        if encoding in ('gzip', 'deflate'):
+            decoder = zlib.decompressobj(47)
+        elif encoding == 'zstd' and zstandard:
+            decoder = zstandard.ZstdDecompressor().decompressobj()
+        else:
+            decoder = None
+        records = json_bytes = wire_bytes = 0
+        pending = b''
+        for chunk in self._chunks():
+            wire_bytes += len(chunk)
+            data = decoder.decompress(chunk) if decoder else chunk
+            json_bytes += len(data)
+            lines = (pending + data).split(b'\n')
+            pending = lines.pop()
+            for line in lines:
+                if line.strip():
+                    json.loads(line)
+                    records += 1
+        if pending.strip():
+            json.loads(pending)
+            records += 1
+        return records, json_bytes, wire_bytes
+
+    def _chunks(self):
+        """Body chunks of a chunked-transfer (or Content-Length) request"""
+        if 'chunked' not in self.headers.get('Transfer-Encoding', ''):
+            yield self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            return
+        while True:
+            size = int(self.rfile.readline().split(b';')[0], 16)
+            if size == 0:
+                while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+                    pass
+                return
+            yield self.rfile.read(size)
+            self.rfile.readline()
+
+    def _reply(self, status: int, payload: dict):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def create_server(latency_ms: float = 0, port: int = 0) -> http.server.ThreadingHTTPServer:
+    """Build a stand-in ingest server"""
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', port), FakeIngestHandler)
+    server.daemon_threads = True
+    server.latency = latency_ms / 1000
+    server.stats = {'requests': 0, 'streamed_requests': 0, 'bulk_requests': 0, 'records': 0,
+                    'wire_bytes': 0, 'json_bytes': 0}
+    server.stats_lock = threading.Lock()
+    return server
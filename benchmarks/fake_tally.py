@@ -0,0 +1,198 @@
+"""
+Local stand-in for the Tally XML server.
+
+Generates ledger, stock item and voucher exports on the fly at any scale,
+so a sync can be benchmarked without a live Tally. Like Tally, it answers
+one request at a time. Responses are streamed with chunked transfer
+encoding in UTF-8 or UTF-16 and honour the parts of the request the
+connector relies on:
+
+- the date range (SVFROMDATE/SVTODATE) for vouchers
+- the AlterID filter of incremental collections
+- FETCH projection: without it every object carries the extra native
+  fields a real export would
+"""
+import http.server
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, Optional
+
+LEDGER_GROUPS = ['Sundry Debtors', 'Sundry Creditors', 'Bank Accounts', 'Sales Accounts',
+                 'Purchase Accounts', 'Indirect Expenses', 'Duties &amp; Taxes']
+STOCK_GROUPS = ['Finished Goods', 'Raw Materials', 'Packing Material', 'Spares']
+UNITS = ['Nos', 'Kgs', 'Ltrs', 'Box', 'Mtrs']
+VOUCHER_TYPES = ['Sales', 'Purchase', 'Receipt', 'Payment', 'Journal']
+
+# Native fields a NATIVEMETHOD * export carries that the sync never reads
+NATIVE_NOISE = "".join(
+    f"<{tag}>{value}</{tag}>" for tag, value in [
+        ('ISBILLWISEON', 'Yes'), ('ISCOSTCENTRESON', 'No'), ('ISINTERESTON', 'No'),
+        ('ALLOWINMOBILE', 'No'), ('ISCONDENSED', 'No'), ('AFFECTSSTOCK', 'No'),
+        ('FORPAYROLL', 'No'), ('ISABCENABLED', 'No'), ('ISCREDITDAYSCHKON', 'No'),
+        ('ISREVENUE', 'No'), ('ISDEEMEDPOSITIVE', 'Yes'), ('SORTPOSITION', '1000'),
+        ('LANGUAGEID', '1033'), ('GSTTYPEOFSUPPLY', 'Goods'), ('VATDEALERTYPE', 'Regular'),
+        ('MASTERID', '0'), ('ISUPDATINGTARGETID', 'No'), ('ASORIGINAL', 'Yes'),
+    ]
+) + ("<LANGUAGENAME.LIST><NAME.LIST TYPE=\"String\"><NAME>Alias</NAME></NAME.LIST>"
+     "<LANGUAGEID> 1033</LANGUAGEID></LANGUAGENAME.LIST>"
+     "<OLDAUDITENTRYIDS.LIST TYPE=\"Number\"><OLDAUDITENTRYIDS>-1</OLDAUDITENTRYIDS>"
+     "</OLDAUDITENTRYIDS.LIST>")
+
+RECORDS_PER_CHUNK = 200
+
+
+def ledger_xml(i: int, projected: bool) -> str:
+    """One ledger master"""
+    return (
+        f'<LEDGER NAME="Ledger {i:07d}" RESERVEDNAME="">'
+        f'<GUID>bench-ledger-{i:08x}</GUID><ALTERID>{i + 1}</ALTERID>'
+        f'<PARENT>{LEDGER_GROUPS[i % len(LEDGER_GROUPS)]}</PARENT>'
+        f'<OPENINGBALANCE>{(i % 9973) * 10.5:.2f}</OPENINGBALANCE>'
+        f'<CLOSINGBALANCE>-{(i % 7919) * 12.25:.2f}</CLOSINGBALANCE>'
+        f'<PARTYGSTIN>27AAPFU{i % 10000:04d}R1Z{i % 10}</PARTYGSTIN>'
+        f'<LEDGERPHONE>+91 98{i % 100000000:08d}</LEDGERPHONE>'
+        f'<LEDGEREMAIL>accounts{i}@example.com</LEDGEREMAIL>'
+        f'<ADDRESS.LIST TYPE="String"><ADDRESS>{i % 500} Market Road</ADDRESS>'
+        f'<ADDRESS>Mumbai 4000{i % 100:02d}</ADDRESS></ADDRESS.LIST>'
+        f'{"" if projected else NATIVE_NOISE}</LEDGER>'
+    )
+
+
+def stock_item_xml(i: int, projected: bool) -> str:
+    """One stock item master"""
+    return (
+        f'<STOCKITEM NAME="Item {i:07d}" RESERVEDNAME="">'
+        f'<GUID>bench-item-{i:08x}</GUID><ALTERID>{i + 1}</ALTERID>'
+        f'<PARENT>{STOCK_GROUPS[i % len(STOCK_GROUPS)]}</PARENT>'
+        f'<BASEUNITS>{UNITS[i % len(UNITS)]}</BASEUNITS>'
+        f'<OPENINGBALANCE>{i % 500} {UNITS[i % len(UNITS)]}</OPENINGBALANCE>'
+        f'<OPENINGVALUE>{(i % 500) * 99.5:.2f}</OPENINGVALUE>'
+        f'<CLOSINGBALANCE>{i % 300} {UNITS[i % len(UNITS)]}</CLOSINGBALANCE>'
+        f'<CLOSINGVALUE>{(i % 300) * 99.5:.2f}</CLOSINGVALUE>'
+        f'<GSTAPPLICABLE>Applicable</GSTAPPLICABLE>'
+        f'<GSTDETAILS.LIST><HSNCODE>{8471 + i % 50}</HSNCODE></GSTDETAILS.LIST>'
+        f'{"" if projected else NATIVE_NOISE}</STOCKITEM>'
+    )
+
+
+def voucher_xml(i: int, date: str, ledgers: int, projected: bool) -> str:
+    """One voucher with a party and a sales/purchase ledger entry"""
+    voucher_type = VOUCHER_TYPES[i % len(VOUCHER_TYPES)]
+    party = f"Ledger {i % max(1, ledgers):07d}"
+    amount = (i % 10007) * 7.75 + 100
+    return (
+        f'<VOUCHER REMOTEID="bench-voucher-{i:08x}" VCHTYPE="{voucher_type}" ACTION="Create">'
+        f'<DATE>{date}</DATE><GUID>bench-voucher-{i:08x}</GUID><ALTERID>{i + 1}</ALTERID>'
+        f'<VOUCHERTYPENAME>{voucher_type}</VOUCHERTYPENAME>'
+        f'<VOUCHERNUMBER>{i + 1}</VOUCHERNUMBER><REFERENCE>REF/{i % 100000}</REFERENCE>'
+        f'<NARRATION>Being goods {voucher_type.lower()} as per bill {i}</NARRATION>'
+        f'<PARTYLEDGERNAME>{party}</PARTYLEDGERNAME><ISINVOICE>Yes</ISINVOICE>'
+        f'<ALLLEDGERENTRIES.LIST><LEDGERNAME>{party}</LEDGERNAME>'
+        f'<AMOUNT>-{amount:.2f}</AMOUNT></ALLLEDGERENTRIES.LIST>'
+        f'<ALLLEDGERENTRIES.LIST><LEDGERNAME>{voucher_type} Account</LEDGERNAME>'
+        f'<AMOUNT>{amount:.2f}</AMOUNT></ALLLEDGERENTRIES.LIST>'
+        f'{"" if projected else NATIVE_NOISE}</VOUCHER>'
+    )
+
+
+class FakeTallyHandler(http.server.BaseHTTPRequestHandler):
+    """Answer Tally XML export requests from the generator settings on the server"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf-8', 'replace')
+        with self.server.tally_lock:
+            if self.server.latency:
+                time.sleep(self.server.latency)
+            self._export(body)
+
+    def _export(self, body: str):
+        request_id = re.search(r'<ID>(.*?)</ID>', body)
+        request_id = request_id.group(1) if request_id else ''
+        projected = '<FETCH>' in body
+        alter_filter = re.search(r'\$AlterID &gt; (\d+)', body)
+        after = int(alter_filter.group(1)) if alter_filter else -1
+
+        if 'Ledger' in request_id:
+            records = self._masters(ledger_xml, self.server.scale['ledgers'], after, projected)
+        elif 'Stock' in request_id:
+            records = self._masters(stock_item_xml, self.server.scale['stock_items'], after, projected)
+        elif 'Voucher' in request_id:
+            from_date = re.search(r'<SVFROMDATE>(\d{8})</SVFROMDATE>', body)
+            to_date = re.search(r'<SVTODATE>(\d{8})</SVTODATE>', body)
+            records = self._vouchers(from_date.group(1) if from_date else None,
+                                     to_date.group(1) if to_date else None, after, projected)
+        elif request_id == 'List of Companies':
+            records = iter(['<COMPANY NAME="Benchmark Co"><NAME>Benchmark Co</NAME></COMPANY>'])
+        elif request_id == 'CompanyInfo':
+            records = iter(['<COMPANY><NAME>Benchmark Co</NAME><GUID>bench-company</GUID>'
+                            '<GSTREGISTRATIONNO>27AAPFU0939F1ZV</GSTREGISTRATIONNO></COMPANY>'])
+        else:
+            records = iter([])
+
+        self._stream(records)
+
+    def _masters(self, render, count: int, after: int, projected: bool) -> Iterator[str]:
+        """Masters with AlterID above the filter; AlterID is index + 1"""
+        for i in range(max(0, after), count):
+            yield render(i, projected)
+
+    def _vouchers(self, from_date: Optional[str], to_date: Optional[str],
+                  after: int, projected: bool) -> Iterator[str]:
+        """Vouchers are spread evenly over the configured days; yield the window's share"""
+        days = self.server.days
+        first_day = self.server.first_day
+        start = (datetime.strptime(from_date, '%Y%m%d') - first_day).days if from_date else 0
+        end = (datetime.strptime(to_date, '%Y%m%d') - first_day).days if to_date else days - 1
+
+        for day in range(max(0, start), min(days - 1, end) + 1):
+            date = (first_day + timedelta(days=day)).strftime('%Y%m%d')
+            for i in range(day, self.server.scale['vouchers'], days):
+                if i + 1 > after:
+                    yield voucher_xml(i, date, self.server.scale['ledgers'], projected)
+
+    def _stream(self, records: Iterator[str]):
+        """Write the envelope with chunked transfer encoding"""
+        utf16 = self.server.encoding == 'utf-16'
+        self.send_response(200)
+        self.send_header('Content-Type', f"text/xml; charset={'utf-16' if utf16 else 'utf-8'}")
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        def write(text: str, first: bool = False):
+            data = text.encode('utf-16-le') if utf16 else text.encode('utf-8')
+            if first and utf16:
+                data = b'\xff\xfe' + data
+            self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+
+        write('<ENVELOPE><BODY><DATA><COLLECTION>', first=True)
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= RECORDS_PER_CHUNK:
+                write(''.join(batch))
+                batch = []
+        if batch:
+            write(''.join(batch))
+        write('</COLLECTION></DATA></BODY></ENVELOPE>')
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def create_server(scale: Dict[str, int], days: int = 30, latency_ms: float = 0,
+                  encoding: str = 'utf-8', port: int = 0) -> http.server.ThreadingHTTPServer:
+    """Build a stand-in Tally server; vouchers fall on the last ``days`` days up to today"""
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', port), FakeTallyHandler)
+    server.daemon_threads = True
+    server.scale = scale
+    server.days = max(1, days)
+    server.first_day = datetime.strptime(datetime.now().strftime('%Y%m%d'), '%Y%m%d') - timedelta(days=server.days - 1)
+    server.latency = latency_ms / 1000
+    server.encoding = encoding
+    server.tally_lock = threading.Lock()
+    return server
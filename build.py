@@ -28,10 +28,23 @@ def build_exe():
     # Run PyInstaller
     PyInstaller.__main__.run(args)
     
+    # Headless console build, without Qt
+    PyInstaller.__main__.run([
+        'tally_sync_cli.py',
+        '--name=TallyServerSyncCLI',
+        '--onefile',
+        '--console',
+        '--exclude-module=PyQt6',
+        '--hidden-import=requests',
+        '--hidden-import=xml.etree.ElementTree',
+        '--noconfirm',
+    ])
+    
     print("\n" + "=" * 50)
     print("Build Complete!")
     print("=" * 50)
     print("\nExecutable location: dist\\TallyServerSync.exe")
+    print("Headless CLI: dist\\TallyServerSyncCLI.exe --once | --daemon")
     print("\nYou can now:")
     print("1. Run dist\\TallyServerSync.exe")
     print("2. Copy it to any Windows machine")
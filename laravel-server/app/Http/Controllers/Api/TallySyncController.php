@@ -8,12 +8,20 @@ use App\Models\Ledger;
 use App\Models\StockItem;
 use App\Models\Voucher;
 use App\Models\SyncLog;
+use App\Http\Middleware\DecompressRequest;
+use Carbon\Carbon;
 use Illuminate\Http\Request;
 use Illuminate\Support\Facades\DB;
 use Illuminate\Support\Facades\Log;
+use Symfony\Component\HttpKernel\Exception\HttpExceptionInterface;
 
 class TallySyncController extends Controller
 {
+    /**
+     * Rows per bulk upsert statement
+     */
+    private const UPSERT_CHUNK_SIZE = 500;
+
     /**
      * Sync company data
      */
@@ -74,40 +82,34 @@ class TallySyncController extends Controller
         $syncLog = $this->createSyncLog('ledgers');
         
         try {
-            $ledgers = is_array($request->all()) && isset($request->all()[0]) 
-                ? $request->all() 
-                : [$request->all()];
-            
-            $inserted = 0;
-            $updated = 0;
+            $ledgers = $this->incomingRecords($request);
             
             DB::beginTransaction();
             
-            foreach ($ledgers as $ledgerData) {
-                $ledger = Ledger::updateOrCreate(
-                    [
-                        'user_id' => $request->user()->id,
-                        'guid' => $ledgerData['GUID'] ?? $ledgerData['guid'] ?? null,
-                    ],
-                    [
-                        'name' => $ledgerData['NAME'] ?? $ledgerData['name'],
-                        'parent' => $ledgerData['PARENT'] ?? $ledgerData['parent'] ?? null,
-                        'opening_balance' => $ledgerData['OPENINGBALANCE'] ?? $ledgerData['opening_balance'] ?? 0,
-                        'closing_balance' => $ledgerData['CLOSINGBALANCE'] ?? $ledgerData['closing_balance'] ?? 0,
-                        'gstin' => $ledgerData['PARTYGSTIN'] ?? $ledgerData['gstin'] ?? null,
-                        'phone' => $ledgerData['LEDGERPHONE'] ?? $ledgerData['phone'] ?? null,
-                        'email' => $ledgerData['LEDGEREMAIL'] ?? $ledgerData['email'] ?? null,
-                        'address' => $ledgerData['ADDRESS'] ?? $ledgerData['address'] ?? null,
-                        'last_synced' => now(),
-                    ]
-                );
-                
-                $ledger->wasRecentlyCreated ? $inserted++ : $updated++;
-            }
+            $userId = $request->user()->id;
+            $now = now()->toDateTimeString();
+            $rows = $this->mapRows(fn ($row) => [
+                'user_id' => $userId,
+                'guid' => $row['GUID'] ?? $row['guid'] ?? null,
+                'name' => $row['NAME'] ?? $row['name'],
+                'parent' => $row['PARENT'] ?? $row['parent'] ?? null,
+                'opening_balance' => $this->decimal($row['OPENINGBALANCE'] ?? $row['opening_balance'] ?? 0),
+                'closing_balance' => $this->decimal($row['CLOSINGBALANCE'] ?? $row['closing_balance'] ?? 0),
+                'gstin' => $row['PARTYGSTIN'] ?? $row['gstin'] ?? null,
+                'phone' => $row['LEDGERPHONE'] ?? $row['phone'] ?? null,
+                'email' => $row['LEDGEREMAIL'] ?? $row['email'] ?? null,
+                'address' => $row['ADDRESS'] ?? $row['address'] ?? null,
+                'last_synced' => $now,
+            ], $ledgers);
+            
+            [$inserted, $updated, $total] = $this->bulkUpsert(Ledger::class, $userId, $rows, [
+                'name', 'parent', 'opening_balance', 'closing_balance',
+                'gstin', 'phone', 'email', 'address', 'last_synced',
+            ]);
             
             DB::commit();
             
-            $this->completeSyncLog($syncLog, $inserted, $updated, count($ledgers));
+            $this->completeSyncLog($syncLog, $inserted, $updated, $total);
             
             return response()->json([
                 'success' => true,
@@ -115,7 +117,7 @@ class TallySyncController extends Controller
                 'data' => [
                     'inserted' => $inserted,
                     'updated' => $updated,
-                    'total' => count($ledgers)
+                    'total' => $total
                 ]
             ]);
             
@@ -128,7 +130,7 @@ class TallySyncController extends Controller
                 'success' => false,
                 'error' => 'Failed to sync ledgers',
                 'details' => $e->getMessage()
-            ], 500);
+            ], $e instanceof HttpExceptionInterface ? $e->getStatusCode() : 500);
         }
     }
 
@@ -140,41 +142,35 @@ class TallySyncController extends Controller
         $syncLog = $this->createSyncLog('stock_items');
         
         try {
-            $stockItems = is_array($request->all()) && isset($request->all()[0]) 
-                ? $request->all() 
-                : [$request->all()];
-            
-            $inserted = 0;
-            $updated = 0;
+            $stockItems = $this->incomingRecords($request);
             
             DB::beginTransaction();
             
-            foreach ($stockItems as $itemData) {
-                $item = StockItem::updateOrCreate(
-                    [
-                        'user_id' => $request->user()->id,
-                        'guid' => $itemData['GUID'] ?? $itemData['guid'] ?? null,
-                    ],
-                    [
-                        'name' => $itemData['NAME'] ?? $itemData['name'],
-                        'parent' => $itemData['PARENT'] ?? $itemData['parent'] ?? null,
-                        'base_units' => $itemData['BASEUNITS'] ?? $itemData['base_units'] ?? null,
-                        'opening_balance' => $itemData['OPENINGBALANCE'] ?? $itemData['opening_balance'] ?? 0,
-                        'opening_value' => $itemData['OPENINGVALUE'] ?? $itemData['opening_value'] ?? 0,
-                        'closing_balance' => $itemData['CLOSINGBALANCE'] ?? $itemData['closing_balance'] ?? 0,
-                        'closing_value' => $itemData['CLOSINGVALUE'] ?? $itemData['closing_value'] ?? 0,
-                        'hsn_code' => $itemData['HSNCODE'] ?? $itemData['hsn_code'] ?? null,
-                        'gst_applicable' => $itemData['GSTAPPLICABLE'] ?? $itemData['gst_applicable'] ?? null,
-                        'last_synced' => now(),
-                    ]
-                );
-                
-                $item->wasRecentlyCreated ? $inserted++ : $updated++;
-            }
+            $userId = $request->user()->id;
+            $now = now()->toDateTimeString();
+            $rows = $this->mapRows(fn ($row) => [
+                'user_id' => $userId,
+                'guid' => $row['GUID'] ?? $row['guid'] ?? null,
+                'name' => $row['NAME'] ?? $row['name'],
+                'parent' => $row['PARENT'] ?? $row['parent'] ?? null,
+                'base_units' => $row['BASEUNITS'] ?? $row['base_units'] ?? null,
+                'opening_balance' => $this->decimal($row['OPENINGBALANCE'] ?? $row['opening_balance'] ?? 0, 3),
+                'opening_value' => $this->decimal($row['OPENINGVALUE'] ?? $row['opening_value'] ?? 0),
+                'closing_balance' => $this->decimal($row['CLOSINGBALANCE'] ?? $row['closing_balance'] ?? 0, 3),
+                'closing_value' => $this->decimal($row['CLOSINGVALUE'] ?? $row['closing_value'] ?? 0),
+                'hsn_code' => $row['HSNCODE'] ?? $row['hsn_code'] ?? null,
+                'gst_applicable' => $row['GSTAPPLICABLE'] ?? $row['gst_applicable'] ?? null,
+                'last_synced' => $now,
+            ], $stockItems);
+            
+            [$inserted, $updated, $total] = $this->bulkUpsert(StockItem::class, $userId, $rows, [
+                'name', 'parent', 'base_units', 'opening_balance', 'opening_value',
+                'closing_balance', 'closing_value', 'hsn_code', 'gst_applicable', 'last_synced',
+            ]);
             
             DB::commit();
             
-            $this->completeSyncLog($syncLog, $inserted, $updated, count($stockItems));
+            $this->completeSyncLog($syncLog, $inserted, $updated, $total);
             
             return response()->json([
                 'success' => true,
@@ -182,7 +178,7 @@ class TallySyncController extends Controller
                 'data' => [
                     'inserted' => $inserted,
                     'updated' => $updated,
-                    'total' => count($stockItems)
+                    'total' => $total
                 ]
             ]);
             
@@ -195,7 +191,7 @@ class TallySyncController extends Controller
                 'success' => false,
                 'error' => 'Failed to sync stock items',
                 'details' => $e->getMessage()
-            ], 500);
+            ], $e instanceof HttpExceptionInterface ? $e->getStatusCode() : 500);
         }
     }
 
@@ -207,41 +203,35 @@ class TallySyncController extends Controller
         $syncLog = $this->createSyncLog('vouchers');
         
         try {
-            $vouchers = is_array($request->all()) && isset($request->all()[0]) 
-                ? $request->all() 
-                : [$request->all()];
-            
-            $inserted = 0;
-            $updated = 0;
+            $vouchers = $this->incomingRecords($request);
             
             DB::beginTransaction();
             
-            foreach ($vouchers as $voucherData) {
-                $voucher = Voucher::updateOrCreate(
-                    [
-                        'user_id' => $request->user()->id,
-                        'guid' => $voucherData['GUID'] ?? $voucherData['guid'] ?? null,
-                    ],
-                    [
-                        'date' => $voucherData['DATE'] ?? $voucherData['date'],
-                        'voucher_type' => $voucherData['VOUCHERTYPENAME'] ?? $voucherData['voucher_type'],
-                        'voucher_number' => $voucherData['VOUCHERNUMBER'] ?? $voucherData['voucher_number'] ?? null,
-                        'reference' => $voucherData['REFERENCE'] ?? $voucherData['reference'] ?? null,
-                        'reference_date' => $voucherData['REFERENCEDATE'] ?? $voucherData['reference_date'] ?? null,
-                        'narration' => $voucherData['NARRATION'] ?? $voucherData['narration'] ?? null,
-                        'party_name' => $voucherData['PARTYNAME'] ?? $voucherData['party_name'] ?? null,
-                        'amount' => $voucherData['AMOUNT'] ?? $voucherData['amount'] ?? 0,
-                        'is_invoice' => $voucherData['ISINVOICE'] ?? $voucherData['is_invoice'] ?? 'No',
-                        'last_synced' => now(),
-                    ]
-                );
-                
-                $voucher->wasRecentlyCreated ? $inserted++ : $updated++;
-            }
+            $userId = $request->user()->id;
+            $now = now()->toDateTimeString();
+            $rows = $this->mapRows(fn ($row) => [
+                'user_id' => $userId,
+                'guid' => $row['GUID'] ?? $row['guid'] ?? null,
+                'date' => $this->date($row['DATE'] ?? $row['date']),
+                'voucher_type' => $row['VOUCHERTYPENAME'] ?? $row['voucher_type'],
+                'voucher_number' => $row['VOUCHERNUMBER'] ?? $row['voucher_number'] ?? null,
+                'reference' => $row['REFERENCE'] ?? $row['reference'] ?? null,
+                'reference_date' => $this->date($row['REFERENCEDATE'] ?? $row['reference_date'] ?? null),
+                'narration' => $row['NARRATION'] ?? $row['narration'] ?? null,
+                'party_name' => $row['PARTYNAME'] ?? $row['party_name'] ?? null,
+                'amount' => $this->decimal($row['AMOUNT'] ?? $row['amount'] ?? 0),
+                'is_invoice' => $row['ISINVOICE'] ?? $row['is_invoice'] ?? 'No',
+                'last_synced' => $now,
+            ], $vouchers);
+            
+            [$inserted, $updated, $total] = $this->bulkUpsert(Voucher::class, $userId, $rows, [
+                'date', 'voucher_type', 'voucher_number', 'reference', 'reference_date',
+                'narration', 'party_name', 'amount', 'is_invoice', 'last_synced',
+            ]);
             
             DB::commit();
             
-            $this->completeSyncLog($syncLog, $inserted, $updated, count($vouchers));
+            $this->completeSyncLog($syncLog, $inserted, $updated, $total);
             
             return response()->json([
                 'success' => true,
@@ -249,7 +239,7 @@ class TallySyncController extends Controller
                 'data' => [
                     'inserted' => $inserted,
                     'updated' => $updated,
-                    'total' => count($vouchers)
+                    'total' => $total
                 ]
             ]);
             
@@ -262,7 +252,7 @@ class TallySyncController extends Controller
                 'success' => false,
                 'error' => 'Failed to sync vouchers',
                 'details' => $e->getMessage()
-            ], 500);
+            ], $e instanceof HttpExceptionInterface ? $e->getStatusCode() : 500);
         }
     }
 
@@ -366,6 +356,169 @@ class TallySyncController extends Controller
         ]);
     }
 
+    /**
+     * Records of an upload: a JSON array, a single JSON object, or an
+     * NDJSON stream that is read line by line as rows are upserted
+     */
+    private function incomingRecords(Request $request)
+    {
+        if (DecompressRequest::isNdjson($request)) {
+            return $this->readNdjson($request);
+        }
+        
+        return is_array($request->all()) && isset($request->all()[0]) 
+            ? $request->all() 
+            : [$request->all()];
+    }
+
+    /**
+     * Decode an NDJSON request body one record at a time, up to MAX_BODY_BYTES
+     */
+    private function readNdjson(Request $request)
+    {
+        $stream = $request->getContent(true);
+        $limit = DecompressRequest::MAX_BODY_BYTES;
+        
+        switch (strtolower((string) $request->headers->get('Content-Encoding'))) {
+            case 'gzip':
+            case 'deflate':
+                // window 47 lets zlib detect the gzip or zlib header
+                stream_filter_append($stream, 'zlib.inflate', STREAM_FILTER_READ, ['window' => 47]);
+                break;
+            case 'zstd':
+                $stream = $this->inflateZstd($stream, $limit);
+                break;
+        }
+        
+        $read = 0;
+        while (($line = fgets($stream)) !== false) {
+            $read += strlen($line);
+            if ($read > $limit) {
+                abort(413, 'Request body too large');
+            }
+            $line = trim($line);
+            if ($line !== '') {
+                yield json_decode($line, true, 512, JSON_THROW_ON_ERROR);
+            }
+        }
+    }
+
+    /**
+     * Decode a zstd stream into a temp stream in small steps, stopping at
+     * $limit compressed or decompressed bytes. The zstd extension has no
+     * stream filter.
+     */
+    private function inflateZstd($stream, int $limit)
+    {
+        if (!function_exists('zstd_uncompress_init')) {
+            abort(415, 'Streamed zstd bodies need the incremental zstd API');
+        }
+        
+        $context = zstd_uncompress_init();
+        $decoded = fopen('php://temp', 'w+b');
+        $read = 0;
+        $written = 0;
+        
+        while (!feof($stream) && ($chunk = fread($stream, 1024)) !== false && $chunk !== '') {
+            $output = zstd_uncompress_add($context, $chunk);
+            if ($output === false) {
+                abort(400, 'Invalid zstd body');
+            }
+            $read += strlen($chunk);
+            $written += strlen($output);
+            if ($read > $limit || $written > $limit) {
+                abort(413, 'Request body too large');
+            }
+            fwrite($decoded, $output);
+        }
+        
+        rewind($decoded);
+        return $decoded;
+    }
+
+    /**
+     * Tally date (YYYYMMDD or any parseable date) as Y-m-d, like the model's date cast
+     */
+    private function date($value)
+    {
+        if ($value === null || $value === '') {
+            return null;
+        }
+        
+        $value = (string) $value;
+        $date = preg_match('/^\d{8}$/', $value)
+            ? Carbon::createFromFormat('Ymd', $value)
+            : Carbon::parse($value);
+        
+        return $date->toDateString();
+    }
+
+    /**
+     * Tally amount rounded like the model's decimal cast
+     */
+    private function decimal($value, int $places = 2)
+    {
+        return round((float) $value, $places);
+    }
+
+    /**
+     * Lazily map records to table rows
+     */
+    private function mapRows(callable $callback, iterable $records)
+    {
+        foreach ($records as $record) {
+            yield $callback($record);
+        }
+    }
+
+    /**
+     * Upsert rows on the (user_id, guid) key in chunks and count inserts/updates.
+     * Rows may be a generator; only one chunk is held at a time.
+     */
+    private function bulkUpsert($modelClass, $userId, iterable $rows, array $updateColumns)
+    {
+        $inserted = 0;
+        $updated = 0;
+        $total = 0;
+        $seen = [];
+        $chunk = [];
+        
+        $flush = function () use ($modelClass, $userId, $updateColumns, &$chunk, &$inserted, &$updated, &$seen) {
+            $guids = array_values(array_filter(array_column($chunk, 'guid'), fn ($guid) => $guid !== null));
+            $existing = $guids
+                ? array_flip($modelClass::where('user_id', $userId)->whereIn('guid', $guids)->pluck('guid')->all())
+                : [];
+            
+            foreach ($chunk as $row) {
+                $guid = $row['guid'];
+                if ($guid !== null && (isset($existing[$guid]) || isset($seen[$guid]))) {
+                    $updated++;
+                } else {
+                    $inserted++;
+                }
+                if ($guid !== null) {
+                    $seen[$guid] = true;
+                }
+            }
+            
+            $modelClass::upsert($chunk, ['user_id', 'guid'], $updateColumns);
+            $chunk = [];
+        };
+        
+        foreach ($rows as $row) {
+            $chunk[] = $row;
+            $total++;
+            if (count($chunk) >= self::UPSERT_CHUNK_SIZE) {
+                $flush();
+            }
+        }
+        if ($chunk) {
+            $flush();
+        }
+        
+        return [$inserted, $updated, $total];
+    }
+
     /**
      * Create sync log entry
      */
@@ -0,0 +1,116 @@
+<?php
+
+namespace App\Http\Middleware;
+
+use Closure;
+use Illuminate\Http\Request;
+
+class DecompressRequest
+{
+    /**
+     * Maximum decompressed body size in bytes
+     */
+    const MAX_BODY_BYTES = 50 * 1024 * 1024;
+
+    /**
+     * Content-Type of streamed uploads, one JSON record per line
+     */
+    const NDJSON_TYPE = 'application/x-ndjson';
+
+    /**
+     * Upload body formats this server can read
+     */
+    public static function acceptedContentTypes()
+    {
+        return ['application/json', self::NDJSON_TYPE];
+    }
+
+    /**
+     * Whether a request carries an NDJSON stream
+     */
+    public static function isNdjson(Request $request)
+    {
+        return strpos(strtolower((string) $request->headers->get('Content-Type')), self::NDJSON_TYPE) === 0;
+    }
+
+    /**
+     * Request Content-Encodings this server can decode
+     */
+    public static function acceptedEncodings()
+    {
+        $encodings = ['gzip', 'deflate'];
+
+        // NDJSON streams need the incremental API to bound decompression
+        if (function_exists('zstd_uncompress') && function_exists('zstd_uncompress_init')) {
+            array_unshift($encodings, 'zstd');
+        }
+
+        return $encodings;
+    }
+
+    /**
+     * Decode a compressed request body before it reaches the controller
+     */
+    public function handle(Request $request, Closure $next)
+    {
+        $encoding = strtolower((string) $request->headers->get('Content-Encoding'));
+
+        if ($encoding === '' || $encoding === 'identity') {
+            return $next($request);
+        }
+
+        if (!in_array($encoding, self::acceptedEncodings(), true)) {
+            return response()->json([
+                'success' => false,
+                'error' => "Unsupported Content-Encoding: {$encoding}"
+            ], 415);
+        }
+
+        // NDJSON streams are decoded incrementally by the controller
+        if (self::isNdjson($request)) {
+            return $next($request);
+        }
+
+        $content = $request->getContent();
+
+        switch ($encoding) {
+            case 'gzip':
+                $decoded = @gzdecode($content, self::MAX_BODY_BYTES);
+                break;
+            case 'deflate':
+                $decoded = @gzuncompress($content, self::MAX_BODY_BYTES);
+                if ($decoded === false) {
+                    $decoded = @gzinflate($content, self::MAX_BODY_BYTES);
+                }
+                break;
+            default:
+                $decoded = @zstd_uncompress($content);
+                if ($decoded !== false && strlen($decoded) > self::MAX_BODY_BYTES) {
+                    return response()->json([
+                        'success' => false,
+                        'error' => 'Request body too large'
+                    ], 413);
+                }
+        }
+
+        if ($decoded === false) {
+            return response()->json([
+                'success' => false,
+                'error' => 'Invalid compressed request body'
+            ], 400);
+        }
+
+        $request->headers->remove('Content-Encoding');
+        $request->initialize(
+            $request->query->all(),
+            [],
+            $request->attributes->all(),
+            $request->cookies->all(),
+            $request->files->all(),
+            $request->server->all(),
+            $decoded
+        );
+
+        return $next($request);
+    }
+}
@@ -5,6 +5,7 @@ use Illuminate\Support\Facades\Route;
 use App\Http\Controllers\Api\TallySyncController;
 use App\Http\Controllers\Api\AuthController;
 use App\Http\Controllers\Api\PasswordResetController;
+use App\Http\Middleware\DecompressRequest;
 
 /*
 |--------------------------------------------------------------------------
@@ -30,17 +31,21 @@ Route::prefix('password')->group(function () {
     Route::post('decrypt-data', [PasswordResetController::class, 'decryptResetData']);
 });
 
-// Public health check
-Route::get('health', function () {
+// Public health check (also under tally/ so the client can negotiate upload compression and format)
+$health = function () {
     return response()->json([
         'status' => 'ok',
         'timestamp' => now()->toIso8601String(),
-        'version' => '1.0.0'
+        'version' => '1.0.0',
+        'accept_encoding' => DecompressRequest::acceptedEncodings(),
+        'accept_content_type' => DecompressRequest::acceptedContentTypes()
     ]);
-});
+};
+Route::get('health', $health);
+Route::get('tally/health', $health);
 
 // Protected Tally Sync routes (requires authentication)
-Route::middleware('auth:sanctum')->prefix('tally')->group(function () {
+Route::middleware(['auth:sanctum', DecompressRequest::class])->prefix('tally')->group(function () {
     
     // Company data
     Route::post('company', [TallySyncController::class, 'syncCompany']);
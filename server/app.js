@@ -9,10 +9,30 @@ const cors = require('cors');
 const helmet = require('helmet');
 const rateLimit = require('express-rate-limit');
 const winston = require('winston');
+const zlib = require('zlib');
+const { pipeline } = require('stream');
+const { StringDecoder } = require('string_decoder');
+const { decode: decodeMsgpack } = require('@msgpack/msgpack');
 require('dotenv').config();
 
 const app = express();
 
+// Request body limits (applied after decompression)
+const BODY_LIMIT = '50mb';
+const BODY_LIMIT_BYTES = 50 * 1024 * 1024;
+
+// Request Content-Encodings accepted on uploads (gzip/deflate are handled by express.json)
+const ACCEPTED_ENCODINGS = ['gzip', 'deflate'];
+if (typeof zlib.createZstdDecompress === 'function') {
+    ACCEPTED_ENCODINGS.unshift('zstd');
+}
+
+// Streamed uploads carry one JSON record per line and are read incrementally
+const NDJSON_TYPE = 'application/x-ndjson';
+// Columnar batches for /api/bulk (see the client's ColumnarBatch)
+const MSGPACK_TYPE = 'application/x-msgpack';
+const ACCEPTED_CONTENT_TYPES = ['application/json', NDJSON_TYPE, MSGPACK_TYPE];
+
 // Logger configuration
 const logger = winston.createLogger({
     level: 'info',
@@ -29,11 +49,133 @@ const logger = winston.createLogger({
     ]
 });
 
+// Decode zstd-compressed JSON and MessagePack bodies (express.json/raw only understand gzip/deflate)
+function decompressZstd(req, res, next) {
+    const encoding = (req.headers['content-encoding'] || '').toLowerCase();
+    if (encoding !== 'zstd' || req.is(NDJSON_TYPE)) {
+        return next();
+    }
+    if (!ACCEPTED_ENCODINGS.includes('zstd')) {
+        return res.status(415).json({ success: false, error: 'zstd encoding not supported' });
+    }
+    
+    const chunks = [];
+    let size = 0;
+    let failed = false;
+    const decompressor = zlib.createZstdDecompress();
+    
+    const fail = (status, error) => {
+        if (failed) return;
+        failed = true;
+        req.unpipe(decompressor);
+        decompressor.destroy();
+        res.status(status).json({ success: false, error });
+    };
+    
+    decompressor.on('data', (chunk) => {
+        size += chunk.length;
+        if (size > BODY_LIMIT_BYTES) {
+            return fail(413, 'Request body too large');
+        }
+        chunks.push(chunk);
+    });
+    decompressor.on('error', () => fail(400, 'Invalid zstd body'));
+    decompressor.on('end', () => {
+        if (failed) return;
+        if (req.is(MSGPACK_TYPE)) {
+            req.body = Buffer.concat(chunks);
+        } else {
+            try {
+                req.body = JSON.parse(Buffer.concat(chunks).toString('utf8'));
+            } catch (error) {
+                return fail(400, 'Invalid JSON body');
+            }
+        }
+        // Mark the body as parsed so express.json/raw skip it
+        req._body = true;
+        next();
+    });
+    
+    req.pipe(decompressor);
+}
+
+// Yield the records of an NDJSON body as they arrive, decompressing on the fly
+async function* readNdjson(req) {
+    const encoding = (req.headers['content-encoding'] || 'identity').toLowerCase();
+    const decompressors = {
+        gzip: () => zlib.createGunzip(),
+        deflate: () => zlib.createInflate(),
+        zstd: () => zlib.createZstdDecompress()
+    };
+    let input = req;
+    if (encoding !== 'identity') {
+        if (!ACCEPTED_ENCODINGS.includes(encoding)) {
+            throw httpError(415, `Unsupported Content-Encoding: ${encoding}`);
+        }
+        input = pipeline(req, decompressors[encoding](), () => {});
+    }
+    
+    const decoder = new StringDecoder('utf8');
+    let pending = '';
+    let lineNumber = 0;
+    
+    const parse = (line) => {
+        lineNumber++;
+        try {
+            return JSON.parse(line);
+        } catch (error) {
+            throw httpError(400, `Invalid JSON on line ${lineNumber}`);
+        }
+    };
+    
+    try {
+        for await (const chunk of input) {
+            pending += decoder.write(chunk);
+            let start = 0;
+            let newline;
+            while ((newline = pending.indexOf('\n', start)) !== -1) {
+                const line = pending.slice(start, newline).trim();
+                start = newline + 1;
+                if (line) {
+                    yield parse(line);
+                }
+            }
+            pending = pending.slice(start);
+            if (pending.length > BODY_LIMIT_BYTES) {
+                throw httpError(413, 'NDJSON line too large');
+            }
+        }
+    } catch (error) {
+        throw error.status ? error : httpError(400, `Invalid ${encoding} body`);
+    }
+    
+    pending = (pending + decoder.end()).trim();
+    if (pending) {
+        yield parse(pending);
+    }
+}
+
+// Records of an upload: a JSON array, a single object, or an NDJSON stream
+function incomingRecords(req) {
+    if (req.is(NDJSON_TYPE)) {
+        return readNdjson(req);
+    }
+    return Array.isArray(req.body) ? req.body : [req.body];
+}
+
+function httpError(status, message) {
+    const error = new Error(message);
+    error.status = status;
+    return error;
+}
+
 // Middleware
 app.use(helmet());
 app.use(cors());
-app.use(express.json({ limit: '50mb' }));
-app.use(express.urlencoded({ extended: true, limit: '50mb' }));
+app.use(decompressZstd);
+app.use(express.json({ limit: BODY_LIMIT }));
+app.use(express.raw({ type: MSGPACK_TYPE, limit: BODY_LIMIT }));
+app.use(express.urlencoded({ extended: true, limit: BODY_LIMIT }));
 
 // Rate limiting
 const limiter = rateLimit({
@@ -53,6 +195,291 @@ const pool = mysql.createPool({
     queueLimit: 0
 });
 
+// Bulk upsert settings
+const MAX_ROWS_PER_UPSERT = 5000;
+const DEFAULT_MAX_PACKET_BYTES = 4 * 1024 * 1024;
+let maxPacketBytes = null;
+
+// Read max_allowed_packet once so multi-row statements stay under it
+async function getMaxPacketBytes() {
+    if (maxPacketBytes === null) {
+        try {
+            const [rows] = await pool.query('SELECT @@max_allowed_packet AS max_packet');
+            maxPacketBytes = Number(rows[0].max_packet) || DEFAULT_MAX_PACKET_BYTES;
+        } catch (error) {
+            logger.warn('Could not read max_allowed_packet, using default:', error);
+            maxPacketBytes = DEFAULT_MAX_PACKET_BYTES;
+        }
+    }
+    return maxPacketBytes;
+}
+
+// Upper bound of a row's size once escaped into SQL
+function estimateRowBytes(row) {
+    let bytes = 4;
+    for (const value of row) {
+        if (value === null || value === undefined) {
+            bytes += 5;
+        } else if (value instanceof Date) {
+            bytes += 24;
+        } else {
+            bytes += Buffer.byteLength(String(value)) * 2 + 4;
+        }
+    }
+    return bytes;
+}
+
+// Count inserted/updated rows of a multi-row INSERT ... ON DUPLICATE KEY UPDATE
+function countUpsert(result, rowCount) {
+    const match = /Duplicates:\s*(\d+)/.exec(result.info || '');
+    if (match) {
+        const duplicates = Number(match[1]);
+        return { inserted: rowCount - duplicates, updated: duplicates };
+    }
+    // affectedRows counts 1 per inserted row and 2 per updated row
+    const updated = Math.min(rowCount, Math.max(0, result.affectedRows - rowCount));
+    return { inserted: rowCount - updated, updated };
+}
+
+// Upsert rows with multi-row statements sized to max_allowed_packet, each
+// run through query(sql, values). Rows may be an async iterable; only one
+// statement's rows are held at a time.
+async function bulkUpsert(query, table, columns, updateColumns, rows) {
+    const budget = Math.floor((await getMaxPacketBytes()) * 0.75);
+    const head = `INSERT INTO ${table} (${columns.join(', ')}) VALUES ?`;
+    const tail = ` ON DUPLICATE KEY UPDATE ${updateColumns.map(c => `${c} = VALUES(${c})`).join(', ')}`;
+    const sql = head + tail;
+    
+    let inserted = 0;
+    let updated = 0;
+    let total = 0;
+    let chunk = [];
+    let chunkBytes = sql.length;
+    
+    const flush = async () => {
+        const [result] = await query(sql, [chunk]);
+        const counts = countUpsert(result, chunk.length);
+        inserted += counts.inserted;
+        updated += counts.updated;
+        chunk = [];
+        chunkBytes = sql.length;
+    };
+    
+    for await (const row of rows) {
+        total++;
+        const rowBytes = estimateRowBytes(row);
+        if (chunk.length && (chunkBytes + rowBytes > budget || chunk.length >= MAX_ROWS_PER_UPSERT)) {
+            await flush();
+        }
+        chunk.push(row);
+        chunkBytes += rowBytes;
+    }
+    if (chunk.length) {
+        await flush();
+    }
+    
+    return { inserted, updated, total };
+}
+
+// Synced collections by endpoint. Each field names its table column and
+// the record keys it is read from; the first non-empty one wins.
+const COLLECTIONS = {
+    ledgers: {
+        table: 'ledgers',
+        label: 'Ledgers',
+        keyColumns: ['name', 'guid'],
+        fields: [
+            { column: 'name', keys: ['NAME', 'name'] },
+            { column: 'guid', keys: ['GUID', 'guid'] },
+            { column: 'parent', keys: ['PARENT', 'parent'] },
+            { column: 'opening_balance', keys: ['OPENINGBALANCE', 'opening_balance'], number: true },
+            { column: 'closing_balance', keys: ['CLOSINGBALANCE', 'closing_balance'], number: true },
+            { column: 'gstin', keys: ['PARTYGSTIN', 'gstin'] },
+            { column: 'phone', keys: ['LEDGERPHONE', 'phone'] },
+            { column: 'email', keys: ['LEDGEREMAIL', 'email'] },
+            { column: 'address', keys: ['ADDRESS', 'address'] }
+        ]
+    },
+    'stock-items': {
+        table: 'stock_items',
+        label: 'Stock items',
+        keyColumns: ['name', 'guid'],
+        fields: [
+            { column: 'name', keys: ['NAME', 'name'] },
+            { column: 'guid', keys: ['GUID', 'guid'] },
+            { column: 'parent', keys: ['PARENT', 'parent'] },
+            { column: 'base_units', keys: ['BASEUNITS', 'base_units'] },
+            { column: 'opening_balance', keys: ['OPENINGBALANCE', 'opening_balance'], number: true },
+            { column: 'opening_value', keys: ['OPENINGVALUE', 'opening_value'], number: true },
+            { column: 'closing_balance', keys: ['CLOSINGBALANCE', 'closing_balance'], number: true },
+            { column: 'closing_value', keys: ['CLOSINGVALUE', 'closing_value'], number: true },
+            { column: 'hsn_code', keys: ['HSNCODE', 'hsn_code'] },
+            { column: 'gst_applicable', keys: ['GSTAPPLICABLE', 'gst_applicable'] }
+        ]
+    },
+    vouchers: {
+        table: 'vouchers',
+        label: 'Vouchers',
+        keyColumns: ['guid'],
+        fields: [
+            { column: 'guid', keys: ['GUID', 'guid'] },
+            { column: 'date', keys: ['DATE', 'date'] },
+            { column: 'voucher_type', keys: ['VOUCHERTYPENAME', 'voucher_type'] },
+            { column: 'voucher_number', keys: ['VOUCHERNUMBER', 'voucher_number'] },
+            { column: 'reference', keys: ['REFERENCE', 'reference'] },
+            { column: 'reference_date', keys: ['REFERENCEDATE', 'reference_date'] },
+            { column: 'narration', keys: ['NARRATION', 'narration'] },
+            { column: 'party_name', keys: ['PARTYNAME', 'party_name'] },
+            { column: 'amount', keys: ['AMOUNT', 'amount'], number: true },
+            { column: 'is_invoice', keys: ['ISINVOICE', 'is_invoice'], fallback: 'No' }
+        ]
+    }
+};
+
+// Store a field's value the way its column expects
+function fieldValue(field, value) {
+    if (field.number) {
+        return parseFloat(value || 0);
+    }
+    return value || (field.fallback ?? null);
+}
+
+// Lazily map records (objects) to table rows
+async function* recordRows(spec, records, now) {
+    for await (const record of records) {
+        const row = spec.fields.map(field => {
+            let value;
+            for (const key of field.keys) {
+                value = record[key];
+                if (value) break;
+            }
+            return fieldValue(field, value);
+        });
+        row.push(now);
+        yield row;
+    }
+}
+
+// Decode and check a columnar MessagePack batch
+function decodeColumnar(body) {
+    if (!Buffer.isBuffer(body)) {
+        throw httpError(415, `Content-Type must be ${MSGPACK_TYPE}`);
+    }
+    let batch;
+    try {
+        batch = decodeMsgpack(body);
+    } catch (error) {
+        throw httpError(400, 'Invalid MessagePack body');
+    }
+    if (!batch || batch.version !== 1 || typeof batch.columns !== 'object' || !Number.isInteger(batch.count)) {
+        throw httpError(400, 'Unsupported bulk batch');
+    }
+    if (!COLLECTIONS[batch.collection]) {
+        throw httpError(400, `Unknown collection: ${batch.collection}`);
+    }
+    for (const [key, values] of Object.entries(batch.columns)) {
+        if (!Array.isArray(values) || values.length !== batch.count) {
+            throw httpError(400, `Column ${key} does not have ${batch.count} values`);
+        }
+    }
+    return batch;
+}
+
+// Rows of a columnar batch, read straight from its column arrays
+function* columnarRows(spec, batch, now) {
+    const dictColumns = new Set(batch.dict_columns || []);
+    const strings = batch.strings || [];
+    const sources = spec.fields.map(field => field.keys
+        .filter(key => batch.columns[key])
+        .map(key => ({ values: batch.columns[key], dict: dictColumns.has(key) })));
+    
+    for (let i = 0; i < batch.count; i++) {
+        const row = spec.fields.map((field, index) => {
+            let value;
+            for (const source of sources[index]) {
+                value = source.values[i];
+                if (source.dict && value !== null && value !== undefined) {
+                    value = strings[value];
+                }
+                if (value) break;
+            }
+            return fieldValue(field, value);
+        });
+        row.push(now);
+        yield row;
+    }
+}
+
+// Upsert a collection's rows. A body that is already read goes in one
+// transaction; a streamed body commits each statement on its own pooled
+// connection, so a slow upload never holds a connection between chunks.
+async function upsertCollection(spec, rows, { streamed = false } = {}) {
+    const columns = [...spec.fields.map(field => field.column), 'last_synced'];
+    const updateColumns = columns.filter(column => !spec.keyColumns.includes(column));
+    
+    if (streamed) {
+        const result = await bulkUpsert(
+            (sql, values) => pool.query(sql, values), spec.table, columns, updateColumns, rows);
+        logger.info(`${spec.label} saved: ${result.total} received, ${result.inserted} inserted, ${result.updated} updated`);
+        return result;
+    }
+    
+    const connection = await pool.getConnection();
+    
+    try {
+        await connection.beginTransaction();
+        
+        const result = await bulkUpsert(
+            (sql, values) => connection.query(sql, values),
+            spec.table,
+            columns,
+            updateColumns,
+            rows
+        );
+        
+        await connection.commit();
+        
+        logger.info(`${spec.label} saved: ${result.total} received, ${result.inserted} inserted, ${result.updated} updated`);
+        return result;
+        
+    } catch (error) {
+        await connection.rollback();
+        throw error;
+    } finally {
+        connection.release();
+    }
+}
+
+// Upload endpoint of one collection: a JSON array, a single object or an NDJSON stream
+function uploadHandler(name) {
+    const spec = COLLECTIONS[name];
+    const noun = spec.label.toLowerCase();
+    
+    return async (req, res) => {
+        try {
+            const { inserted, updated, total } = await upsertCollection(
+                spec, recordRows(spec, incomingRecords(req), new Date()),
+                { streamed: Boolean(req.is(NDJSON_TYPE)) });
+            
+            res.json({ 
+                success: true, 
+                message: `${spec.label} saved successfully`,
+                inserted,
+                updated,
+                total
+            });
+            
+        } catch (error) {
+            logger.error(`Error saving ${noun}:`, error);
+            res.status(error.status || 500).json({ 
+                success: false, 
+                error: `Failed to save ${noun}`,
+                details: error.message 
+            });
+        }
+    };
+}
+
 // API Key authentication middleware
 const authenticateApiKey = (req, res, next) => {
     const apiKey = req.headers['authorization'];
@@ -83,7 +510,9 @@ app.get('/api/health', (req, res) => {
     res.json({ 
         status: 'ok', 
         timestamp: new Date().toISOString(),
-        version: '1.0.0'
+        version: '1.0.0',
+        accept_encoding: ACCEPTED_ENCODINGS,
+        accept_content_type: ACCEPTED_CONTENT_TYPES
     });
 });
 
@@ -147,257 +576,34 @@ app.post('/api/company', async (req, res) => {
     }
 });
 
-// Ledgers endpoint
-app.post('/api/ledgers', async (req, res) => {
-    try {
-        const ledgers = Array.isArray(req.body) ? req.body : [req.body];
-        logger.info(`Received ${ledgers.length} ledgers`);
-        
-        const connection = await pool.getConnection();
-        
-        try {
-            await connection.beginTransaction();
-            
-            let inserted = 0;
-            let updated = 0;
-            
-            for (const ledger of ledgers) {
-                const ledgerData = {
-                    name: ledger.NAME || ledger.name,
-                    guid: ledger.GUID || ledger.guid || null,
-                    parent: ledger.PARENT || ledger.parent || null,
-                    opening_balance: parseFloat(ledger.OPENINGBALANCE || ledger.opening_balance || 0),
-                    closing_balance: parseFloat(ledger.CLOSINGBALANCE || ledger.closing_balance || 0),
-                    gstin: ledger.PARTYGSTIN || ledger.gstin || null,
-                    phone: ledger.LEDGERPHONE || ledger.phone || null,
-                    email: ledger.LEDGEREMAIL || ledger.email || null,
-                    address: ledger.ADDRESS || ledger.address || null,
-                    last_synced: new Date()
-                };
-                
-                const [result] = await connection.query(
-                    `INSERT INTO ledgers (name, guid, parent, opening_balance, closing_balance, 
-                                         gstin, phone, email, address, last_synced)
-                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                     ON DUPLICATE KEY UPDATE
-                     parent = VALUES(parent),
-                     opening_balance = VALUES(opening_balance),
-                     closing_balance = VALUES(closing_balance),
-                     gstin = VALUES(gstin),
-                     phone = VALUES(phone),
-                     email = VALUES(email),
-                     address = VALUES(address),
-                     last_synced = VALUES(last_synced)`,
-                    [ledgerData.name, ledgerData.guid, ledgerData.parent, 
-                     ledgerData.opening_balance, ledgerData.closing_balance,
-                     ledgerData.gstin, ledgerData.phone, ledgerData.email, 
-                     ledgerData.address, ledgerData.last_synced]
-                );
-                
-                if (result.insertId) {
-                    inserted++;
-                } else {
-                    updated++;
-                }
-            }
-            
-            await connection.commit();
-            
-            logger.info(`Ledgers saved: ${inserted} inserted, ${updated} updated`);
-            
-            res.json({ 
-                success: true, 
-                message: 'Ledgers saved successfully',
-                inserted,
-                updated,
-                total: ledgers.length
-            });
-            
-        } catch (error) {
-            await connection.rollback();
-            throw error;
-        } finally {
-            connection.release();
-        }
-        
-    } catch (error) {
-        logger.error('Error saving ledgers:', error);
-        res.status(500).json({ 
-            success: false, 
-            error: 'Failed to save ledgers',
-            details: error.message 
-        });
-    }
-});
+// Collection endpoints
+app.post('/api/ledgers', uploadHandler('ledgers'));
+app.post('/api/stock-items', uploadHandler('stock-items'));
+app.post('/api/vouchers', uploadHandler('vouchers'));
 
-// Stock items endpoint
-app.post('/api/stock-items', async (req, res) => {
+// Columnar MessagePack batch of any collection
+app.post('/api/bulk', async (req, res) => {
     try {
-        const stockItems = Array.isArray(req.body) ? req.body : [req.body];
-        logger.info(`Received ${stockItems.length} stock items`);
-        
-        const connection = await pool.getConnection();
+        const batch = decodeColumnar(req.body);
+        const spec = COLLECTIONS[batch.collection];
         
-        try {
-            await connection.beginTransaction();
-            
-            let inserted = 0;
-            let updated = 0;
-            
-            for (const item of stockItems) {
-                const stockData = {
-                    name: item.NAME || item.name,
-                    guid: item.GUID || item.guid || null,
-                    parent: item.PARENT || item.parent || null,
-                    base_units: item.BASEUNITS || item.base_units || null,
-                    opening_balance: parseFloat(item.OPENINGBALANCE || item.opening_balance || 0),
-                    opening_value: parseFloat(item.OPENINGVALUE || item.opening_value || 0),
-                    closing_balance: parseFloat(item.CLOSINGBALANCE || item.closing_balance || 0),
-                    closing_value: parseFloat(item.CLOSINGVALUE || item.closing_value || 0),
-                    hsn_code: item.HSNCODE || item.hsn_code || null,
-                    gst_applicable: item.GSTAPPLICABLE || item.gst_applicable || null,
-                    last_synced: new Date()
-                };
-                
-                const [result] = await connection.query(
-                    `INSERT INTO stock_items (name, guid, parent, base_units, opening_balance, 
-                                              opening_value, closing_balance, closing_value, 
-                                              hsn_code, gst_applicable, last_synced)
-                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                     ON DUPLICATE KEY UPDATE
-                     parent = VALUES(parent),
-                     base_units = VALUES(base_units),
-                     opening_balance = VALUES(opening_balance),
-                     opening_value = VALUES(opening_value),
-                     closing_balance = VALUES(closing_balance),
-                     closing_value = VALUES(closing_value),
-                     hsn_code = VALUES(hsn_code),
-                     gst_applicable = VALUES(gst_applicable),
-                     last_synced = VALUES(last_synced)`,
-                    [stockData.name, stockData.guid, stockData.parent, stockData.base_units,
-                     stockData.opening_balance, stockData.opening_value, 
-                     stockData.closing_balance, stockData.closing_value,
-                     stockData.hsn_code, stockData.gst_applicable, stockData.last_synced]
-                );
-                
-                if (result.insertId) {
-                    inserted++;
-                } else {
-                    updated++;
-                }
-            }
-            
-            await connection.commit();
-            
-            logger.info(`Stock items saved: ${inserted} inserted, ${updated} updated`);
-            
-            res.json({ 
-                success: true, 
-                message: 'Stock items saved successfully',
-                inserted,
-                updated,
-                total: stockItems.length
-            });
-            
-        } catch (error) {
-            await connection.rollback();
-            throw error;
-        } finally {
-            connection.release();
-        }
+        const { inserted, updated, total } = await upsertCollection(
+            spec, columnarRows(spec, batch, new Date()));
         
-    } catch (error) {
-        logger.error('Error saving stock items:', error);
-        res.status(500).json({ 
-            success: false, 
-            error: 'Failed to save stock items',
-            details: error.message 
+        res.json({ 
+            success: true, 
+            message: `${spec.label} saved successfully`,
+            collection: batch.collection,
+            inserted,
+            updated,
+            total
         });
-    }
-});
-
-// Vouchers endpoint
-app.post('/api/vouchers', async (req, res) => {
-    try {
-        const vouchers = Array.isArray(req.body) ? req.body : [req.body];
-        logger.info(`Received ${vouchers.length} vouchers`);
-        
-        const connection = await pool.getConnection();
-        
-        try {
-            await connection.beginTransaction();
-            
-            let inserted = 0;
-            let updated = 0;
-            
-            for (const voucher of vouchers) {
-                const voucherData = {
-                    guid: voucher.GUID || voucher.guid || null,
-                    date: voucher.DATE || voucher.date,
-                    voucher_type: voucher.VOUCHERTYPENAME || voucher.voucher_type,
-                    voucher_number: voucher.VOUCHERNUMBER || voucher.voucher_number,
-                    reference: voucher.REFERENCE || voucher.reference || null,
-                    reference_date: voucher.REFERENCEDATE || voucher.reference_date || null,
-                    narration: voucher.NARRATION || voucher.narration || null,
-                    party_name: voucher.PARTYNAME || voucher.party_name || null,
-                    amount: parseFloat(voucher.AMOUNT || voucher.amount || 0),
-                    is_invoice: voucher.ISINVOICE || voucher.is_invoice || 'No',
-                    last_synced: new Date()
-                };
-                
-                const [result] = await connection.query(
-                    `INSERT INTO vouchers (guid, date, voucher_type, voucher_number, reference, 
-                                          reference_date, narration, party_name, amount, 
-                                          is_invoice, last_synced)
-                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                     ON DUPLICATE KEY UPDATE
-                     date = VALUES(date),
-                     voucher_type = VALUES(voucher_type),
-                     voucher_number = VALUES(voucher_number),
-                     reference = VALUES(reference),
-                     reference_date = VALUES(reference_date),
-                     narration = VALUES(narration),
-                     party_name = VALUES(party_name),
-                     amount = VALUES(amount),
-                     is_invoice = VALUES(is_invoice),
-                     last_synced = VALUES(last_synced)`,
-                    [voucherData.guid, voucherData.date, voucherData.voucher_type, 
-                     voucherData.voucher_number, voucherData.reference, voucherData.reference_date,
-                     voucherData.narration, voucherData.party_name, voucherData.amount,
-                     voucherData.is_invoice, voucherData.last_synced]
-                );
-                
-                if (result.insertId) {
-                    inserted++;
-                } else {
-                    updated++;
-                }
-            }
-            
-            await connection.commit();
-            
-            logger.info(`Vouchers saved: ${inserted} inserted, ${updated} updated`);
-            
-            res.json({ 
-                success: true, 
-                message: 'Vouchers saved successfully',
-                inserted,
-                updated,
-                total: vouchers.length
-            });
-            
-        } catch (error) {
-            await connection.rollback();
-            throw error;
-        } finally {
-            connection.release();
-        }
         
     } catch (error) {
-        logger.error('Error saving vouchers:', error);
-        res.status(500).json({ 
+        logger.error('Error saving bulk batch:', error);
+        res.status(error.status || 500).json({ 
             success: false, 
-            error: 'Failed to save vouchers',
+            error: 'Failed to save bulk batch',
             details: error.message 
         });
     }
@@ -1,36 +1,35 @@
 import sys
-import os
-import json
-import logging
 import hashlib
-from datetime import datetime, timedelta
-from pathlib import Path
-import requests
-import xml.etree.ElementTree as ET
+from datetime import datetime
 from typing import Dict, List, Optional
 
 from PyQt6.QtWidgets import (QApplication, QSystemTrayIcon, QMenu, QWidget, 
                               QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, 
-                              QPushButton, QTextEdit, QGroupBox, QSpinBox,
+                              QPushButton, QTextEdit, QPlainTextEdit, QGroupBox, QSpinBox,
                               QMessageBox, QCheckBox, QTabWidget, QDialog,
-                              QDialogButtonBox, QFormLayout)
+                              QDialogButtonBox, QFormLayout, QComboBox)
 from PyQt6.QtCore import QTimer, QThread, pyqtSignal, Qt
-from PyQt6.QtGui import QIcon, QAction, QPixmap, QPainter, QColor
+from PyQt6.QtGui import QIcon, QAction, QPixmap, QPainter, QColor, QTextCursor
 
-# Configure logging
-LOG_DIR = Path.home() / "TallySync" / "logs"
-LOG_DIR.mkdir(parents=True, exist_ok=True)
-LOG_FILE = LOG_DIR / f"tally_sync_{datetime.now().strftime('%Y%m%d')}.log"
+from tally_sync_core import (LOG_FILE, logger, TallyPrimeConnector, ServerSync,
+                             SyncRunner, SyncScheduler, ConfigManager, MetricsStore,
+                             MetricsServer, LogTail, LogIndex)
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(LOG_FILE),
-        logging.StreamHandler()
-    ]
-)
-logger = logging.getLogger(__name__)
+# Log viewer: lines kept in the widget, lines shown around a search hit, poll interval
+LOG_VIEW_MAX_LINES = 5000
+LOG_CONTEXT_LINES = 200
+LOG_POLL_MS = 1000
+
+# How often auto sync checks the scheduler for due collections
+SCHEDULER_TICK_MS = 30 * 1000
+
+# tally_load_mode choices offered in settings (see TallyGovernor)
+TALLY_LOAD_MODES = {
+    'adaptive': "Adaptive (ease off when Tally slows)",
+    'idle': "Only when the PC is idle",
+    'after_hours': "Only after business hours",
+    'off': "Unthrottled",
+}
 
 
 class PasswordManager:
@@ -190,431 +189,27 @@ class ChangePasswordDialog(QDialog):
         self.accept()
 
 
-class TallyPrimeConnector:
-    """Tally Prime/ERP 9 Connector"""
-    
-    def __init__(self, host: str = "localhost", port: int = 9000, company_name: Optional[str] = None):
-        self.base_url = f"http://{host}:{port}"
-        self.company_name = company_name
-        self.headers = {
-            'Content-Type': 'application/xml',
-            'Accept': 'application/xml'
-        }
-        self.tally_version = None
-    
-    def test_connection(self) -> bool:
-        """Test Tally connection"""
-        try:
-            xml_request = """
-            <ENVELOPE>
-                <HEADER>
-                    <VERSION>1</VERSION>
-                    <TALLYREQUEST>Export</TALLYREQUEST>
-                    <TYPE>Data</TYPE>
-                    <ID>SysInfo</ID>
-                </HEADER>
-                <BODY>
-                    <DESC>
-                        <STATICVARIABLES>
-                            <SVEXPORTFORMAT>$$SysName:XML</SVEXPORTFORMAT>
-                        </STATICVARIABLES>
-                    </DESC>
-                </BODY>
-            </ENVELOPE>
-            """
-            response = requests.post(
-                self.base_url,
-                data=xml_request.encode('utf-8'),
-                headers=self.headers,
-                timeout=10
-            )
-            return response.status_code == 200
-        except Exception as e:
-            logger.error(f"Connection test failed: {e}")
-            return False
-    
-    def get_company_list(self) -> List[Dict]:
-        """Get list of all companies"""
-        xml_request = """
-        <ENVELOPE>
-            <HEADER>
-                <VERSION>1</VERSION>
-                <TALLYREQUEST>Export</TALLYREQUEST>
-                <TYPE>Collection</TYPE>
-                <ID>List of Companies</ID>
-            </HEADER>
-            <BODY>
-                <DESC>
-                    <STATICVARIABLES>
-                        <SVEXPORTFORMAT>$$SysName:XML</SVEXPORTFORMAT>
-                    </STATICVARIABLES>
-                </DESC>
-            </BODY>
-        </ENVELOPE>
-        """
-        
-        try:
-            response = self._send_request(xml_request)
-            return self._parse_collection(response, 'COMPANY')
-        except:
-            return []
-    
-    def get_ledgers(self) -> List[Dict]:
-        """Fetch all ledgers"""
-        xml_request = f"""
-        <ENVELOPE>
-            <HEADER>
-                <VERSION>1</VERSION>
-                <TALLYREQUEST>Export</TALLYREQUEST>
-                <TYPE>Collection</TYPE>
-                <ID>AllLedgers</ID>
-            </HEADER>
-            <BODY>
-                <DESC>
-                    <STATICVARIABLES>
-                        <SVEXPORTFORMAT>$$SysName:XML</SVEXPORTFORMAT>
-                        {self._get_company_filter()}
-                    </STATICVARIABLES>
-                </DESC>
-            </BODY>
-        </ENVELOPE>
-        """
-        response = self._send_request(xml_request)
-        return self._parse_collection(response, 'LEDGER')
-    
-    def get_stock_items(self) -> List[Dict]:
-        """Fetch all stock items"""
-        xml_request = f"""
-        <ENVELOPE>
-            <HEADER>
-                <VERSION>1</VERSION>
-                <TALLYREQUEST>Export</TALLYREQUEST>
-                <TYPE>Collection</TYPE>
-                <ID>AllStockItems</ID>
-            </HEADER>
-            <BODY>
-                <DESC>
-                    <STATICVARIABLES>
-                        <SVEXPORTFORMAT>$$SysName:XML</SVEXPORTFORMAT>
-                        {self._get_company_filter()}
-                    </STATICVARIABLES>
-                </DESC>
-            </BODY>
-        </ENVELOPE>
-        """
-        response = self._send_request(xml_request)
-        return self._parse_collection(response, 'STOCKITEM')
-    
-    def get_vouchers(self, from_date: str, to_date: str) -> List[Dict]:
-        """Fetch vouchers for date range"""
-        from_date = self._format_date(from_date)
-        to_date = self._format_date(to_date)
-        
-        xml_request = f"""
-        <ENVELOPE>
-            <HEADER>
-                <VERSION>1</VERSION>
-                <TALLYREQUEST>Export</TALLYREQUEST>
-                <TYPE>Collection</TYPE>
-                <ID>VoucherCollection</ID>
-            </HEADER>
-            <BODY>
-                <DESC>
-                    <STATICVARIABLES>
-                        <SVEXPORTFORMAT>$$SysName:XML</SVEXPORTFORMAT>
-                        <SVFROMDATE>{from_date}</SVFROMDATE>
-                        <SVTODATE>{to_date}</SVTODATE>
-                        {self._get_company_filter()}
-                    </STATICVARIABLES>
-                </DESC>
-            </BODY>
-        </ENVELOPE>
-        """
-        response = self._send_request(xml_request)
-        return self._parse_collection(response, 'VOUCHER')
-    
-    def get_company_info(self) -> Dict:
-        """Get current company information"""
-        xml_request = f"""
-        <ENVELOPE>
-            <HEADER>
-                <VERSION>1</VERSION>
-                <TALLYREQUEST>Export</TALLYREQUEST>
-                <TYPE>Data</TYPE>
-                <ID>CompanyInfo</ID>
-            </HEADER>
-            <BODY>
-                <DESC>
-                    <STATICVARIABLES>
-                        <SVEXPORTFORMAT>$$SysName:XML</SVEXPORTFORMAT>
-                        {self._get_company_filter()}
-                    </STATICVARIABLES>
-                </DESC>
-            </BODY>
-        </ENVELOPE>
-        """
-        response = self._send_request(xml_request)
-        return self._parse_xml_to_dict(response)
-    
-    def _get_company_filter(self) -> str:
-        """Get company filter XML"""
-        if self.company_name:
-            return f"<SVCURRENTCOMPANY>{self.company_name}</SVCURRENTCOMPANY>"
-        return "<SVCURRENTCOMPANY>##SVCURRENTCOMPANY</SVCURRENTCOMPANY>"
-    
-    def _format_date(self, date_str: str) -> str:
-        """Format date to Tally format (YYYYMMDD)"""
-        date_str = date_str.replace('-', '')
-        if len(date_str) == 8 and date_str.isdigit():
-            return date_str
-        return datetime.now().strftime('%Y%m%d')
-    
-    def _send_request(self, xml_request: str) -> str:
-        """Send XML request to Tally"""
-        try:
-            response = requests.post(
-                self.base_url,
-                data=xml_request.encode('utf-8'),
-                headers=self.headers,
-                timeout=30
-            )
-            response.raise_for_status()
-            return response.text
-        except Exception as e:
-            logger.error(f"Tally request failed: {e}")
-            raise
-    
-    def _parse_xml_to_dict(self, xml_string: str) -> Dict:
-        """Parse XML to dictionary"""
-        try:
-            root = ET.fromstring(xml_string)
-            return self._element_to_dict(root)
-        except Exception as e:
-            logger.error(f"XML parsing failed: {e}")
-            return {}
-    
-    def _element_to_dict(self, element) -> Dict:
-        """Convert XML element to dict"""
-        result = {}
-        if element.text and element.text.strip():
-            result['_text'] = element.text.strip()
-        if element.attrib:
-            result['_attributes'] = element.attrib
-        for child in element:
-            child_data = self._element_to_dict(child)
-            if child.tag in result:
-                if not isinstance(result[child.tag], list):
-                    result[child.tag] = [result[child.tag]]
-                result[child.tag].append(child_data)
-            else:
-                result[child.tag] = child_data
-        if len(result) == 1 and '_text' in result:
-            return result['_text']
-        return result
-    
-    def _parse_collection(self, xml_string: str, tag_name: str) -> List[Dict]:
-        """Parse collection XML"""
-        try:
-            root = ET.fromstring(xml_string)
-            items = []
-            paths = [
-                f'.//{tag_name}',
-                f'.//BODY/DATA/COLLECTION/{tag_name}',
-                f'.//BODY/IMPORTDATA/REQUESTDATA/{tag_name}'
-            ]
-            for path in paths:
-                elements = root.findall(path)
-                if elements:
-                    for item in elements:
-                        items.append(self._element_to_dict(item))
-                    break
-            return items
-        except Exception as e:
-            logger.error(f"Collection parsing failed: {e}")
-            return []
-
-
-class ServerSync:
-    """Server synchronization handler"""
-    
-    def __init__(self, server_url: str, api_key: Optional[str] = None):
-        self.server_url = server_url.rstrip('/')
-        self.headers = {'Content-Type': 'application/json'}
-        if api_key:
-            self.headers['Authorization'] = f'Bearer {api_key}'
-    
-    def test_connection(self) -> bool:
-        """Test server connection"""
-        try:
-            response = requests.get(
-                f"{self.server_url}/health",
-                headers=self.headers,
-                timeout=10
-            )
-            return response.status_code in [200, 404]
-        except Exception as e:
-            logger.error(f"Server connection test failed: {e}")
-            return False
-    
-    def send_data(self, endpoint: str, data: Dict or List) -> Dict:
-        """Send data to server"""
-        try:
-            url = f"{self.server_url}/{endpoint}"
-            response = requests.post(
-                url,
-                json=data,
-                headers=self.headers,
-                timeout=60
-            )
-            response.raise_for_status()
-            return {'success': True, 'response': response.json() if response.text else {}}
-        except Exception as e:
-            logger.error(f"Server sync failed for {endpoint}: {e}")
-            return {'success': False, 'error': str(e)}
-    
-    def batch_send(self, endpoint: str, data: List[Dict], batch_size: int = 100) -> Dict:
-        """Send data in batches"""
-        total = len(data)
-        success_count = 0
-        
-        for i in range(0, total, batch_size):
-            batch = data[i:i + batch_size]
-            result = self.send_data(endpoint, batch)
-            if result['success']:
-                success_count += len(batch)
-        
-        return {
-            'total': total,
-            'success': success_count,
-            'failed': total - success_count
-        }
-
-
 class SyncWorker(QThread):
     """Background sync worker thread"""
     
     progress = pyqtSignal(str)
     finished = pyqtSignal(dict)
     
-    def __init__(self, config: Dict):
+    def __init__(self, config: Dict, metrics_store: Optional[MetricsStore] = None,
+                 collections: Optional[List[str]] = None, probe_now: bool = False):
         super().__init__()
         self.config = config
-        self.is_running = True
+        self.collections = collections or []
+        self.runner = SyncRunner(config, progress=self.progress.emit, metrics_store=metrics_store,
+                                 probe_now=probe_now)
     
     def run(self):
         """Execute sync operation"""
-        try:
-            self.progress.emit("🔄 Starting sync...")
-            
-            tally = TallyPrimeConnector(
-                self.config['tally_host'],
-                self.config['tally_port'],
-                self.config.get('company_name')
-            )
-            server = ServerSync(
-                self.config['server_url'],
-                self.config.get('api_key')
-            )
-            
-            results = {
-                'start_time': datetime.now().isoformat(),
-                'success': True,
-                'items_synced': {}
-            }
-            
-            if self.config.get('sync_company', True):
-                self.progress.emit("📊 Syncing company info...")
-                company = tally.get_company_info()
-                result = server.send_data('company', company)
-                results['items_synced']['company'] = 1 if result['success'] else 0
-            
-            if self.config.get('sync_ledgers', True):
-                self.progress.emit("📒 Syncing ledgers...")
-                ledgers = tally.get_ledgers()
-                result = server.batch_send('ledgers', ledgers, self.config.get('batch_size', 100))
-                results['items_synced']['ledgers'] = result['success']
-            
-            if self.config.get('sync_stock', True):
-                self.progress.emit("📦 Syncing stock items...")
-                stock = tally.get_stock_items()
-                result = server.batch_send('stock-items', stock, self.config.get('batch_size', 100))
-                results['items_synced']['stock_items'] = result['success']
-            
-            if self.config.get('sync_vouchers', True):
-                self.progress.emit("🧾 Syncing vouchers...")
-                from_date = self.config.get('from_date', 
-                    (datetime.now() - timedelta(days=1)).strftime('%Y%m%d'))
-                to_date = self.config.get('to_date', 
-                    datetime.now().strftime('%Y%m%d'))
-                
-                vouchers = tally.get_vouchers(from_date, to_date)
-                result = server.batch_send('vouchers', vouchers, self.config.get('batch_size', 100))
-                results['items_synced']['vouchers'] = result['success']
-            
-            results['end_time'] = datetime.now().isoformat()
-            self.progress.emit("✅ Sync completed successfully!")
-            self.finished.emit(results)
-            
-        except Exception as e:
-            logger.error(f"Sync failed: {e}")
-            self.progress.emit(f"❌ Sync failed: {str(e)}")
-            self.finished.emit({
-                'success': False,
-                'error': str(e),
-                'end_time': datetime.now().isoformat()
-            })
-
-
-class ConfigManager:
-    """Configuration manager"""
-    
-    CONFIG_DIR = Path.home() / "TallySync"
-    CONFIG_FILE = CONFIG_DIR / "config.json"
+        self.finished.emit(self.runner.run())
     
-    @classmethod
-    def load(cls) -> Dict:
-        """Load configuration"""
-        cls.CONFIG_DIR.mkdir(parents=True, exist_ok=True)
-        
-        if cls.CONFIG_FILE.exists():
-            try:
-                with open(cls.CONFIG_FILE, 'r') as f:
-                    return json.load(f)
-            except Exception as e:
-                logger.error(f"Failed to load config: {e}")
-        
-        return cls.get_default_config()
-    
-    @classmethod
-    def save(cls, config: Dict):
-        """Save configuration"""
-        try:
-            with open(cls.CONFIG_FILE, 'w') as f:
-                json.dump(config, f, indent=4)
-        except Exception as e:
-            logger.error(f"Failed to save config: {e}")
-    
-    @classmethod
-    def get_default_config(cls) -> Dict:
-        """Get default configuration"""
-        return {
-            'tally_host': 'localhost',
-            'tally_port': 9000,
-            'server_url': 'https://your-server.com/api',
-            'api_key': '',
-            'company_name': '',
-            'sync_interval': 60,
-            'batch_size': 100,
-            'sync_company': True,
-            'sync_ledgers': True,
-            'sync_stock': True,
-            'sync_vouchers': True,
-            'auto_start': False,
-            'start_minimized': False,
-            'from_date': (datetime.now() - timedelta(days=1)).strftime('%Y%m%d'),
-            'to_date': datetime.now().strftime('%Y%m%d'),
-            'settings_password': ''
-        }
+    def cancel(self):
+        """Stop at the next batch or export window; progress is checkpointed"""
+        self.runner.cancel()
 
 
 class MainWindow(QWidget):
@@ -624,9 +219,13 @@ class MainWindow(QWidget):
         super().__init__()
         self.config = ConfigManager.load()
         self.sync_worker = None
+        self.scheduler = SyncScheduler(self.config)
         self.sync_timer = QTimer()
-        self.sync_timer.timeout.connect(self.start_sync)
+        self.sync_timer.timeout.connect(self.run_scheduled)
         self.settings_unlocked = False
+        self.metrics_store = None
+        self.metrics_server = None
+        self.start_metrics()
         
         self.init_ui()
         self.load_config_to_ui()
@@ -635,7 +234,19 @@ class MainWindow(QWidget):
             self.setup_password()
         
         if self.config.get('auto_start', False):
-            self.start_auto_sync()
+            self.start_auto_sync(spread=True)
+    
+    def start_metrics(self):
+        """Keep run metrics for the app's lifetime and serve them if a port is set"""
+        if not self.config.get('metrics_enabled', True):
+            return
+        self.metrics_store = MetricsStore(history=self.config.get('metrics_history', 20))
+        if self.config.get('metrics_port'):
+            try:
+                self.metrics_server = MetricsServer(self.metrics_store, self.config['metrics_port'])
+                self.metrics_server.start()
+            except OSError as e:
+                logger.error(f"Failed to start metrics endpoint: {e}")
     
     def setup_password(self):
         """Setup password for first time"""
@@ -696,10 +307,12 @@ class MainWindow(QWidget):
             self.api_key_input.setEnabled(self.settings_unlocked)
             self.interval_input.setEnabled(self.settings_unlocked)
             self.batch_size_input.setEnabled(self.settings_unlocked)
+            self.tally_load_input.setEnabled(self.settings_unlocked)
             self.sync_company_cb.setEnabled(self.settings_unlocked)
             self.sync_ledgers_cb.setEnabled(self.settings_unlocked)
             self.sync_stock_cb.setEnabled(self.settings_unlocked)
             self.sync_vouchers_cb.setEnabled(self.settings_unlocked)
+            self.incremental_sync_cb.setEnabled(self.settings_unlocked)
             self.auto_start_cb.setEnabled(self.settings_unlocked)
             self.start_minimized_cb.setEnabled(self.settings_unlocked)
     
@@ -773,7 +386,7 @@ class MainWindow(QWidget):
         company_layout = QHBoxLayout()
         company_layout.addWidget(QLabel("Company:"))
         self.company_input = QLineEdit()
-        self.company_input.setPlaceholderText("Leave empty for current company")
+        self.company_input.setPlaceholderText("Empty for current company, 'all', or names separated by commas")
         company_layout.addWidget(self.company_input)
         tally_layout.addLayout(company_layout)
         
@@ -826,10 +439,19 @@ class MainWindow(QWidget):
         batch_layout.addWidget(self.batch_size_input)
         sync_layout.addLayout(batch_layout)
         
+        load_layout = QHBoxLayout()
+        load_layout.addWidget(QLabel("Tally Load:"))
+        self.tally_load_input = QComboBox()
+        for mode, label in TALLY_LOAD_MODES.items():
+            self.tally_load_input.addItem(label, mode)
+        load_layout.addWidget(self.tally_load_input)
+        sync_layout.addLayout(load_layout)
+        
         self.sync_company_cb = QCheckBox("Sync Company Info")
         self.sync_ledgers_cb = QCheckBox("Sync Ledgers")
         self.sync_stock_cb = QCheckBox("Sync Stock Items")
         self.sync_vouchers_cb = QCheckBox("Sync Vouchers")
+        self.incremental_sync_cb = QCheckBox("Incremental sync (only changed masters)")
         self.auto_start_cb = QCheckBox("Auto-start sync on launch")
         self.start_minimized_cb = QCheckBox("Start minimized to tray")
         
@@ -837,6 +459,7 @@ class MainWindow(QWidget):
         sync_layout.addWidget(self.sync_ledgers_cb)
         sync_layout.addWidget(self.sync_stock_cb)
         sync_layout.addWidget(self.sync_vouchers_cb)
+        sync_layout.addWidget(self.incremental_sync_cb)
         sync_layout.addWidget(self.auto_start_cb)
         sync_layout.addWidget(self.start_minimized_cb)
         
@@ -902,6 +525,11 @@ class MainWindow(QWidget):
         self.sync_now_btn.clicked.connect(self.start_sync)
         btn_layout.addWidget(self.sync_now_btn)
         
+        self.stop_sync_btn = QPushButton("⏹️ Stop Sync")
+        self.stop_sync_btn.clicked.connect(self.stop_sync)
+        self.stop_sync_btn.setEnabled(False)
+        btn_layout.addWidget(self.stop_sync_btn)
+
         self.auto_sync_btn = QPushButton("🔄 Start Auto Sync")
         self.auto_sync_btn.clicked.connect(self.toggle_auto_sync)
         btn_layout.addWidget(self.auto_sync_btn)
@@ -945,19 +573,49 @@ class MainWindow(QWidget):
         btn_layout = QHBoxLayout()
         
         refresh_btn = QPushButton("🔄 Refresh Logs")
-        refresh_btn.clicked.connect(self.load_logs)
+        refresh_btn.clicked.connect(self.refresh_logs)
         btn_layout.addWidget(refresh_btn)
         
         clear_btn = QPushButton("🗑️ Clear Display")
         clear_btn.clicked.connect(lambda: self.log_display.clear())
         btn_layout.addWidget(clear_btn)
         
+        self.follow_logs_cb = QCheckBox("Follow")
+        self.follow_logs_cb.setChecked(True)
+        self.follow_logs_cb.toggled.connect(self.follow_logs)
+        btn_layout.addWidget(self.follow_logs_cb)
+        
         layout.addLayout(btn_layout)
         
-        self.log_display = QTextEdit()
+        search_layout = QHBoxLayout()
+        
+        self.log_search_input = QLineEdit()
+        self.log_search_input.setPlaceholderText("Search the whole log file")
+        self.log_search_input.returnPressed.connect(self.find_in_logs)
+        self.log_search_input.textChanged.connect(lambda: setattr(self, 'log_search_line', -1))
+        search_layout.addWidget(self.log_search_input)
+        
+        find_btn = QPushButton("🔍 Find Next")
+        find_btn.clicked.connect(self.find_in_logs)
+        search_layout.addWidget(find_btn)
+        
+        self.log_status_label = QLabel("")
+        search_layout.addWidget(self.log_status_label)
+        
+        layout.addLayout(search_layout)
+        
+        self.log_display = QPlainTextEdit()
         self.log_display.setReadOnly(True)
+        self.log_display.setMaximumBlockCount(LOG_VIEW_MAX_LINES)
         layout.addWidget(self.log_display)
         
+        self.log_tail = LogTail(LOG_FILE, LOG_VIEW_MAX_LINES)
+        self.log_index = LogIndex(LOG_FILE)
+        self.log_search_line = -1
+        self.log_timer = QTimer()
+        self.log_timer.timeout.connect(self.load_logs)
+        self.log_timer.start(LOG_POLL_MS)
+        
         widget.setLayout(layout)
         self.load_logs()
         return widget
@@ -966,16 +624,25 @@ class MainWindow(QWidget):
         """Load configuration to UI"""
         self.tally_host_input.setText(self.config.get('tally_host', 'localhost'))
         self.tally_port_input.setValue(self.config.get('tally_port', 9000))
-        self.company_input.setText(self.config.get('company_name', ''))
+        companies = self.config.get('companies') or []
+        if companies == 'all':
+            self.company_input.setText('all')
+        elif companies:
+            self.company_input.setText(", ".join(companies))
+        else:
+            self.company_input.setText(self.config.get('company_name', ''))
         self.server_url_input.setText(self.config.get('server_url', ''))
         self.api_key_input.setText(self.config.get('api_key', ''))
         self.interval_input.setValue(self.config.get('sync_interval', 60))
         self.batch_size_input.setValue(self.config.get('batch_size', 100))
+        load_index = self.tally_load_input.findData(self.config.get('tally_load_mode', 'adaptive'))
+        self.tally_load_input.setCurrentIndex(max(load_index, 0))
         
         self.sync_company_cb.setChecked(self.config.get('sync_company', True))
         self.sync_ledgers_cb.setChecked(self.config.get('sync_ledgers', True))
         self.sync_stock_cb.setChecked(self.config.get('sync_stock', True))
         self.sync_vouchers_cb.setChecked(self.config.get('sync_vouchers', True))
+        self.incremental_sync_cb.setChecked(self.config.get('incremental_sync', True))
         self.auto_start_cb.setChecked(self.config.get('auto_start', False))
         self.start_minimized_cb.setChecked(self.config.get('start_minimized', False))
     
@@ -986,20 +653,33 @@ class MainWindow(QWidget):
         
         self.config['tally_host'] = self.tally_host_input.text()
         self.config['tally_port'] = self.tally_port_input.value()
-        self.config['company_name'] = self.company_input.text()
+        company_text = self.company_input.text().strip()
+        names = [name.strip() for name in company_text.split(',') if name.strip()]
+        if company_text.lower() == 'all':
+            self.config['companies'] = 'all'
+            self.config['company_name'] = ''
+        elif len(names) > 1:
+            self.config['companies'] = names
+            self.config['company_name'] = ''
+        else:
+            self.config['companies'] = []
+            self.config['company_name'] = company_text
         self.config['server_url'] = self.server_url_input.text()
         self.config['api_key'] = self.api_key_input.text()
         self.config['sync_interval'] = self.interval_input.value()
         self.config['batch_size'] = self.batch_size_input.value()
+        self.config['tally_load_mode'] = self.tally_load_input.currentData()
         
         self.config['sync_company'] = self.sync_company_cb.isChecked()
         self.config['sync_ledgers'] = self.sync_ledgers_cb.isChecked()
         self.config['sync_stock'] = self.sync_stock_cb.isChecked()
         self.config['sync_vouchers'] = self.sync_vouchers_cb.isChecked()
+        self.config['incremental_sync'] = self.incremental_sync_cb.isChecked()
         self.config['auto_start'] = self.auto_start_cb.isChecked()
         self.config['start_minimized'] = self.start_minimized_cb.isChecked()
         
         ConfigManager.save(self.config)
+        self.scheduler.configure(self.config)
         QMessageBox.information(self, "Success", "Configuration saved successfully!")
     
     def test_tally_connection(self):
@@ -1027,20 +707,42 @@ class MainWindow(QWidget):
             QMessageBox.warning(self, "Error", "❌ Failed to connect to server.\n\nPlease check:\n- Server URL is correct\n- API key is valid\n- Server is accessible")
     
     def start_sync(self):
-        """Start sync operation"""
+        """Sync every enabled collection now, even if Tally or the server was down"""
+        self.launch_sync(self.scheduler.collections, probe_now=True)
+    
+    def run_scheduled(self):
+        """Scheduler tick: sync the collections that are due"""
+        if not (self.sync_worker and self.sync_worker.isRunning()):
+            due = self.scheduler.due()
+            if due:
+                self.launch_sync(due)
+        self.update_next_sync_time()
+    
+    def launch_sync(self, collections: List[str], probe_now: bool = False):
+        """Start a sync of the given collections in the background"""
         if self.sync_worker and self.sync_worker.isRunning():
-            QMessageBox.warning(self, "Warning", "Sync is already in progress!")
+            self.update_progress("ℹ️ A sync is already running")
             return
         
         self.progress_log.clear()
         self.status_label.setText("Status: Syncing...")
         self.sync_now_btn.setEnabled(False)
+        self.stop_sync_btn.setEnabled(True)
         
-        self.sync_worker = SyncWorker(self.config)
+        config = SyncScheduler.config_for(self.config, collections)
+        self.sync_worker = SyncWorker(config, self.metrics_store, collections, probe_now)
         self.sync_worker.progress.connect(self.update_progress)
         self.sync_worker.finished.connect(self.sync_finished)
         self.sync_worker.start()
     
+    def stop_sync(self):
+        """Stop the running sync; the next sync resumes where it stopped"""
+        if self.sync_worker and self.sync_worker.isRunning():
+            self.sync_worker.cancel()
+            self.stop_sync_btn.setEnabled(False)
+            self.status_label.setText("Status: Stopping...")
+            self.update_progress("⏹️ Stopping after the current batch...")
+    
     def update_progress(self, message: str):
         """Update progress log"""
         timestamp = datetime.now().strftime('%H:%M:%S')
@@ -1049,6 +751,9 @@ class MainWindow(QWidget):
     def sync_finished(self, results: Dict):
         """Handle sync completion"""
         self.sync_now_btn.setEnabled(True)
+        self.stop_sync_btn.setEnabled(False)
+        self.scheduler.completed(self.sync_worker.collections, results)
+        self.update_next_sync_time()
         
         if results.get('success'):
             self.status_label.setText("Status: Idle")
@@ -1057,6 +762,11 @@ class MainWindow(QWidget):
             items = results.get('items_synced', {})
             summary = "\n".join([f"{k}: {v}" for k, v in items.items()])
             self.update_progress(f"\n📊 Sync Summary:\n{summary}")
+        elif results.get('cancelled'):
+            self.status_label.setText("Status: Stopped")
+        elif results.get('unavailable'):
+            self.status_label.setText("Status: Unavailable")
+            self.update_progress(f"\n⛔ {results.get('error')}")
         else:
             self.status_label.setText("Status: Failed")
             error = results.get('error', 'Unknown error')
@@ -1069,13 +779,12 @@ class MainWindow(QWidget):
         else:
             self.start_auto_sync()
     
-    def start_auto_sync(self):
-        """Start auto sync"""
-        interval_ms = self.config.get('sync_interval', 60) * 60 * 1000
-        self.sync_timer.start(interval_ms)
+    def start_auto_sync(self, spread: bool = False):
+        """Start auto sync, with ``spread`` delaying the first run by part of the jitter"""
+        self.scheduler.start(spread=spread)
+        self.sync_timer.start(SCHEDULER_TICK_MS)
         self.auto_sync_btn.setText("⏸️ Stop Auto Sync")
-        self.update_next_sync_time()
-        self.start_sync()
+        self.run_scheduled()
     
     def stop_auto_sync(self):
         """Stop auto sync"""
@@ -1086,18 +795,64 @@ class MainWindow(QWidget):
     def update_next_sync_time(self):
         """Update next sync time display"""
         if self.sync_timer.isActive():
-            interval_min = self.config.get('sync_interval', 60)
-            next_time = datetime.now() + timedelta(minutes=interval_min)
-            self.next_sync_label.setText(f"Next Sync: {next_time.strftime('%Y-%m-%d %H:%M:%S')}")
+            next_time = self.scheduler.next_run()
+            if next_time:
+                self.next_sync_label.setText(f"Next Sync: {next_time.strftime('%Y-%m-%d %H:%M:%S')}")
     
     def load_logs(self):
-        """Load log file"""
+        """Append log lines written since the last refresh"""
+        if not self.follow_logs_cb.isChecked() or not self.isVisible():
+            return
         try:
-            if LOG_FILE.exists():
-                with open(LOG_FILE, 'r') as f:
-                    self.log_display.setPlainText(f.read())
+            lines, reset = self.log_tail.read_new()
         except Exception as e:
             self.log_display.setPlainText(f"Failed to load logs: {e}")
+            return
+        if reset:
+            self.log_display.setPlainText("\n".join(lines))
+            self.log_display.moveCursor(QTextCursor.MoveOperation.End)
+        elif lines:
+            self.log_display.appendPlainText("\n".join(lines))
+    
+    def refresh_logs(self):
+        """Pick up new log lines, leaving search results for the live tail"""
+        if self.follow_logs_cb.isChecked():
+            self.load_logs()
+        else:
+            self.follow_logs_cb.setChecked(True)
+    
+    def follow_logs(self, follow: bool):
+        """Return to the live tail after browsing search results"""
+        if follow:
+            self.log_status_label.setText("")
+            self.log_display.setPlainText("\n".join(self.log_tail.lines))
+            self.log_display.moveCursor(QTextCursor.MoveOperation.End)
+            self.load_logs()
+    
+    def find_in_logs(self):
+        """Search the whole log file and show the next match in context"""
+        text = self.log_search_input.text()
+        if not text:
+            return
+        try:
+            line = self.log_index.search(text, self.log_search_line + 1)
+        except Exception as e:
+            self.log_status_label.setText(f"Search failed: {e}")
+            return
+        if line is None:
+            self.log_status_label.setText("No matches")
+            return
+        
+        self.log_search_line = line
+        self.follow_logs_cb.setChecked(False)
+        start = max(0, line - LOG_CONTEXT_LINES)
+        self.log_display.setPlainText("\n".join(self.log_index.lines(start, LOG_CONTEXT_LINES * 2 + 1)))
+        
+        cursor = QTextCursor(self.log_display.document().findBlockByNumber(line - start))
+        cursor.movePosition(QTextCursor.MoveOperation.EndOfBlock, QTextCursor.MoveMode.KeepAnchor)
+        self.log_display.setTextCursor(cursor)
+        self.log_display.centerCursor()
+        self.log_status_label.setText(f"Line {line + 1} of {self.log_index.line_count}")
 
 
 class SystemTrayApp(QApplication):
@@ -1121,6 +876,10 @@ class SystemTrayApp(QApplication):
         sync_action.triggered.connect(self.main_window.start_sync)
         tray_menu.addAction(sync_action)
         
+        stop_action = QAction("Stop Sync", self)
+        stop_action.triggered.connect(self.main_window.stop_sync)
+        tray_menu.addAction(stop_action)
+
         tray_menu.addSeparator()
         
         quit_action = QAction("Quit", self)
@@ -1162,6 +921,10 @@ class SystemTrayApp(QApplication):
     def quit_app(self):
         """Quit application"""
         self.main_window.stop_auto_sync()
+        worker = self.main_window.sync_worker
+        if worker and worker.isRunning():
+            worker.cancel()
+            worker.wait(30000)
         self.quit()
 
 
@@ -0,0 +1,110 @@
+"""
+Headless entry point for Tally Server Sync.
+
+Runs the same sync pipeline as the tray application without loading Qt,
+for Windows Server boxes and Linux containers:
+
+    python tally_sync_cli.py --once
+    python tally_sync_cli.py --daemon --config /etc/tallysync/config.json
+"""
+import argparse
+import signal
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from tally_sync_core import (ConfigManager, MetricsServer, MetricsStore, SyncRunner,
+                             SyncScheduler, logger)
+
+
+def run_once(config: Dict, metrics_store: Optional[MetricsStore] = None,
+             stop: Optional[threading.Event] = None, probe_now: bool = False) -> Dict:
+    """Run a single sync pass, log its summary and return the results.
+
+    Setting ``stop`` cancels the pass at its next checkpoint. With
+    ``probe_now`` Tally and the server are probed even if their circuit
+    breakers are open.
+    """
+    results = SyncRunner(config, metrics_store=metrics_store, cancel_event=stop,
+                         probe_now=probe_now).run()
+
+    if results.get('success'):
+        summary = ", ".join(f"{k}: {v}" for k, v in results.get('items_synced', {}).items())
+        logger.info(f"📊 Sync Summary: {summary}")
+
+    return results
+
+
+def run_daemon(config_path: Optional[Path], stop: threading.Event):
+    """Sync each collection on its schedule until stopped"""
+    config = ConfigManager.load(config_path)
+    metrics_store = None
+    metrics_server = None
+    if config.get('metrics_enabled', True):
+        metrics_store = MetricsStore(history=config.get('metrics_history', 20))
+        if config.get('metrics_port'):
+            metrics_server = MetricsServer(metrics_store, config['metrics_port'])
+            metrics_server.start()
+
+    scheduler = SyncScheduler(config)
+    scheduler.start(spread=True)
+
+    while not stop.is_set():
+        config = ConfigManager.load(config_path)
+        scheduler.configure(config)
+
+        due = scheduler.due()
+        if due:
+            results = run_once(SyncScheduler.config_for(config, due), metrics_store, stop)
+            scheduler.completed(due, results)
+            next_run = scheduler.next_run()
+            if next_run:
+                logger.info(f"Next sync at {next_run:%Y-%m-%d %H:%M:%S}")
+
+        wait = scheduler.seconds_until_next()
+        stop.wait(min(60, wait if wait is not None else 60))
+
+    if metrics_server:
+        metrics_server.stop()
+    logger.info("Daemon stopped")
+
+
+def main(argv: Optional[list] = None) -> int:
+    """CLI entry point"""
+    parser = argparse.ArgumentParser(description="Sync Tally data to the server without the GUI")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--once', action='store_true',
+                      help="run a single sync and exit (default); exits 1 on failure, "
+                           "3 if Tally or the server is unreachable")
+    mode.add_argument('--daemon', action='store_true',
+                      help="keep syncing each collection on its schedule")
+    parser.add_argument('--config', type=Path,
+                        help=f"config file to use (default: {ConfigManager.CONFIG_FILE})")
+    args = parser.parse_args(argv)
+
+    if args.config and not args.config.exists():
+        parser.error(f"config file not found: {args.config}")
+
+    stop = threading.Event()
+
+    def request_stop(signum, frame):
+        logger.info(f"Received signal {signum}, stopping at the next checkpoint")
+        stop.set()
+
+    for name in ('SIGINT', 'SIGTERM', 'SIGBREAK'):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), request_stop)
+
+    if not args.daemon:
+        results = run_once(ConfigManager.load(args.config), stop=stop, probe_now=True)
+        if results.get('success'):
+            return 0
+        return 3 if results.get('unavailable') else 1
+
+    run_daemon(args.config, stop)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
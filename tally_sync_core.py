@@ -0,0 +1,3272 @@
+"""
+Sync engine for Tally Server Sync.
+
+Everything needed to pull data from Tally and push it to the server,
+without any Qt dependency. Used by the tray application
+(tally_sync_app.py) and the headless entry point (tally_sync_cli.py).
+"""
+import os
+import json
+import logging
+import gzip
+import hashlib
+import http.server
+import mmap
+import queue
+import random
+import re
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from array import array
+from bisect import bisect_right
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from itertools import islice
+from pathlib import Path
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Configure logging
+LOG_DIR = Path.home() / "TallySync" / "logs"
+LOG_DIR.mkdir(parents=True, exist_ok=True)
+LOG_FILE = LOG_DIR / f"tally_sync_{datetime.now().strftime('%Y%m%d')}.log"
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler(LOG_FILE),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger(__name__)
+
+
+class TallyRecord:
+    """Compact record holding only the schema fields of a Tally object.
+    
+    ``FIELDS`` maps each output field to its Tally sources (``@NAME`` for an
+    attribute, else a path), tried in order.
+    """
+    
+    __slots__ = ()
+    FIELDS: Dict[str, Tuple[str, ...]] = {}
+    
+    def __init__(self, **values):
+        for field in self.__slots__:
+            setattr(self, field, values.get(field))
+    
+    @classmethod
+    def from_element(cls, element) -> 'TallyRecord':
+        """Extract the schema fields from a Tally XML element"""
+        record = cls.__new__(cls)
+        for field, sources in cls.FIELDS.items():
+            setattr(record, field, cls._extract(element, sources))
+        return record
+    
+    @staticmethod
+    def _extract(element, sources: Tuple[str, ...]) -> Optional[str]:
+        """Read the first non-empty value among the sources"""
+        for source in sources:
+            if source.startswith('@'):
+                value = element.get(source[1:])
+            else:
+                child = element.find(source)
+                if child is None:
+                    lines = [e.text.strip() for e in element.findall(f'{source}.LIST/*')
+                             if e.text and e.text.strip()]
+                    value = ', '.join(lines)
+                else:
+                    value = child.text
+            if value and value.strip():
+                return value.strip()
+        return None
+    
+    def get(self, key: str, default=None):
+        """Dict-style field access"""
+        value = getattr(self, key, None) if key in self.__slots__ else None
+        return default if value is None else value
+    
+    def to_row(self) -> Dict:
+        """Flat JSON row with the populated fields"""
+        row = {}
+        for field in self.__slots__:
+            value = getattr(self, field)
+            if value is not None:
+                row[field] = value
+        return row
+
+
+class LedgerRecord(TallyRecord):
+    """Ledger master"""
+    
+    FIELDS = {
+        'NAME': ('@NAME', 'NAME', 'LANGUAGENAME.LIST/NAME.LIST/NAME'),
+        'GUID': ('GUID',),
+        'ALTERID': ('ALTERID',),
+        'PARENT': ('PARENT',),
+        'OPENINGBALANCE': ('OPENINGBALANCE',),
+        'CLOSINGBALANCE': ('CLOSINGBALANCE',),
+        'PARTYGSTIN': ('PARTYGSTIN',),
+        'LEDGERPHONE': ('LEDGERPHONE',),
+        'LEDGEREMAIL': ('LEDGEREMAIL', 'EMAIL'),
+        'ADDRESS': ('ADDRESS',),
+    }
+    __slots__ = tuple(FIELDS)
+
+
+class StockItemRecord(TallyRecord):
+    """Stock item master"""
+    
+    FIELDS = {
+        'NAME': ('@NAME', 'NAME', 'LANGUAGENAME.LIST/NAME.LIST/NAME'),
+        'GUID': ('GUID',),
+        'ALTERID': ('ALTERID',),
+        'PARENT': ('PARENT',),
+        'BASEUNITS': ('BASEUNITS',),
+        'OPENINGBALANCE': ('OPENINGBALANCE',),
+        'OPENINGVALUE': ('OPENINGVALUE',),
+        'CLOSINGBALANCE': ('CLOSINGBALANCE',),
+        'CLOSINGVALUE': ('CLOSINGVALUE',),
+        'HSNCODE': ('HSNCODE', 'GSTDETAILS.LIST/HSNCODE'),
+        'GSTAPPLICABLE': ('GSTAPPLICABLE',),
+    }
+    __slots__ = tuple(FIELDS)
+
+
+class VoucherRecord(TallyRecord):
+    """Voucher"""
+    
+    FIELDS = {
+        'GUID': ('GUID',),
+        'ALTERID': ('ALTERID',),
+        'DATE': ('DATE',),
+        'VOUCHERTYPENAME': ('VOUCHERTYPENAME',),
+        'VOUCHERNUMBER': ('VOUCHERNUMBER',),
+        'REFERENCE': ('REFERENCE',),
+        'REFERENCEDATE': ('REFERENCEDATE',),
+        'NARRATION': ('NARRATION',),
+        'PARTYNAME': ('PARTYNAME', 'PARTYLEDGERNAME'),
+        'AMOUNT': ('AMOUNT', 'ALLLEDGERENTRIES.LIST/AMOUNT', 'LEDGERENTRIES.LIST/AMOUNT'),
+        'ISINVOICE': ('ISINVOICE',),
+    }
+    __slots__ = tuple(FIELDS)
+
+
+class CompanyRecord(TallyRecord):
+    """Company"""
+    
+    FIELDS = {
+        'NAME': ('@NAME', 'NAME', 'BASICCOMPANYFORMALNAME'),
+        'GUID': ('GUID',),
+        'GSTREGISTRATIONNO': ('GSTREGISTRATIONNO', 'GSTIN'),
+        'PAN': ('INCOMETAXNUMBER', 'PAN'),
+        'ADDRESS': ('ADDRESS',),
+        'EMAIL': ('EMAIL',),
+        'PHONE': ('PHONENUMBER', 'PHONE'),
+    }
+    __slots__ = tuple(FIELDS)
+
+
+RECORD_TYPES = {
+    'LEDGER': LedgerRecord,
+    'STOCKITEM': StockItemRecord,
+    'VOUCHER': VoucherRecord,
+    'COMPANY': CompanyRecord,
+}
+
+
+def record_to_json(obj):
+    """json.dumps default hook for compact records"""
+    if isinstance(obj, TallyRecord):
+        return obj.to_row()
+    return str(obj)
+
+
+def encode_json(obj) -> bytes:
+    """Serialize to compact UTF-8 JSON, using orjson when it is installed"""
+    if orjson:
+        return orjson.dumps(obj, default=record_to_json)
+    return json.dumps(obj, default=record_to_json, separators=(',', ':')).encode('utf-8')
+
+
+def create_http_session(pool_size: int = 10, retries: int = 3) -> requests.Session:
+    """Create a keep-alive session with a connection pool and retry adapter"""
+    retry = Retry(
+        total=retries,
+        backoff_factor=0.5,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=None,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def session_stats(session: requests.Session) -> Dict:
+    """Summarize connection reuse across a session's pools"""
+    requests_made = 0
+    connections = 0
+    for adapter in set(session.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                requests_made += pool.num_requests
+                connections += pool.num_connections
+    return {
+        'requests': requests_made,
+        'connections': connections,
+        'reused': max(requests_made - connections, 0)
+    }
+
+
+def retry_count(response: requests.Response) -> int:
+    """Number of transport retries urllib3 made before this response"""
+    retries = getattr(response.raw, 'retries', None)
+    return len(getattr(retries, 'history', ()) or ())
+
+
+class SyncCancelled(Exception):
+    """Raised at a cancellation point once a sync has been asked to stop"""
+
+
+class EndpointUnavailable(Exception):
+    """Raised instead of calling an endpoint whose health probe or circuit breaker failed.
+    
+    ``retry_at`` is when the endpoint is worth trying again.
+    """
+    
+    def __init__(self, message: str, endpoint: str, retry_at: Optional[datetime] = None):
+        super().__init__(message)
+        self.endpoint = endpoint
+        self.retry_at = retry_at
+
+
+class SyncMetrics:
+    """Thread-safe counters and timers for one sync run, keyed by name and labels."""
+    
+    def __init__(self):
+        self.counters: Dict[Tuple, float] = {}
+        self.timers: Dict[Tuple, List[float]] = {}
+        self.lock = threading.Lock()
+    
+    @staticmethod
+    def _key(name: str, labels: Dict) -> Tuple:
+        return (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+    
+    def inc(self, name: str, value: float = 1, **labels):
+        """Add to a counter"""
+        key = self._key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+    
+    def observe(self, name: str, seconds: float, **labels):
+        """Record one timing"""
+        key = self._key(name, labels)
+        with self.lock:
+            timer = self.timers.setdefault(key, [0, 0.0, 0.0])
+            timer[0] += 1
+            timer[1] += seconds
+            timer[2] = max(timer[2], seconds)
+    
+    def merge(self, other: 'SyncMetrics'):
+        """Fold another run's metrics into this one"""
+        with other.lock:
+            counters = dict(other.counters)
+            timers = {key: list(timer) for key, timer in other.timers.items()}
+        with self.lock:
+            for key, value in counters.items():
+                self.counters[key] = self.counters.get(key, 0) + value
+            for key, (count, total, peak) in timers.items():
+                timer = self.timers.setdefault(key, [0, 0.0, 0.0])
+                timer[0] += count
+                timer[1] += total
+                timer[2] = max(timer[2], peak)
+    
+    def snapshot(self) -> Dict:
+        """JSON-ready view of all metrics"""
+        with self.lock:
+            return {
+                'counters': [
+                    {'name': name, 'labels': dict(labels), 'value': value}
+                    for (name, labels), value in sorted(self.counters.items())
+                ],
+                'timers': [
+                    {'name': name, 'labels': dict(labels), 'count': count,
+                     'sum': round(total, 6), 'max': round(peak, 6)}
+                    for (name, labels), (count, total, peak) in sorted(self.timers.items())
+                ]
+            }
+
+
+class CircuitBreaker:
+    """Fail fast on an endpoint that keeps failing.
+    
+    Opens after ``failure_threshold`` failures in a row and lets one call
+    through after ``reset_seconds``, doubling the wait on each further
+    failure up to ``max_reset_seconds``.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    _registry: Dict[str, 'CircuitBreaker'] = {}
+    _registry_lock = threading.Lock()
+    
+    def __init__(self, name: str, failure_threshold: int = 3, reset_seconds: float = 60,
+                 max_reset_seconds: float = 900):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.max_reset_seconds = max(max_reset_seconds, reset_seconds)
+        self.state = self.CLOSED
+        self.failures = 0
+        self.open_seconds = reset_seconds
+        self.opened_at = 0.0
+        self.lock = threading.Lock()
+    
+    @classmethod
+    def for_endpoint(cls, name: str, **settings) -> 'CircuitBreaker':
+        """The process-wide breaker for ``name``, updated with ``settings``"""
+        with cls._registry_lock:
+            breaker = cls._registry.get(name)
+            if breaker is None:
+                breaker = cls._registry[name] = cls(name, **settings)
+            else:
+                for key, value in settings.items():
+                    setattr(breaker, key, value)
+            return breaker
+    
+    @property
+    def is_open(self) -> bool:
+        """Whether calls are being refused right now"""
+        with self.lock:
+            return self._refusing()
+    
+    def _refusing(self) -> bool:
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.open_seconds:
+            self.state = self.HALF_OPEN
+        return self.state == self.OPEN
+    
+    def check(self):
+        """Raise EndpointUnavailable while the breaker is open"""
+        with self.lock:
+            refusing = self._refusing()
+        if refusing:
+            retry_at = self.retry_at()
+            raise EndpointUnavailable(f"{self.name} is unavailable; next attempt at {retry_at:%H:%M:%S}",
+                                      self.name, retry_at)
+    
+    def half_open(self):
+        """Let the next call through now, e.g. for a sync the user started"""
+        with self.lock:
+            if self.state == self.OPEN:
+                self.state = self.HALF_OPEN
+    
+    def retry_at(self) -> datetime:
+        """When the endpoint is worth calling again"""
+        with self.lock:
+            if self.state == self.OPEN:
+                remaining = self.opened_at + self.open_seconds - time.monotonic()
+            else:
+                remaining = self.reset_seconds
+        return datetime.now() + timedelta(seconds=max(0.0, remaining))
+    
+    def record_success(self):
+        """A call succeeded: close the breaker"""
+        with self.lock:
+            if self.state != self.CLOSED:
+                logger.info(f"{self.name} is reachable again")
+            self.state = self.CLOSED
+            self.failures = 0
+            self.open_seconds = self.reset_seconds
+    
+    def record_failure(self):
+        """A call failed: count it and open the breaker at the threshold"""
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN:
+                self.open_seconds = min(self.open_seconds * 2, self.max_reset_seconds)
+            elif self.state == self.OPEN or self.failures < self.failure_threshold:
+                return
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            logger.warning(f"{self.name} failed {self.failures} times in a row; "
+                           f"not calling it for {self.open_seconds:.0f}s")
+
+
+def time_window_end(windows: Iterable, now: datetime) -> Optional[datetime]:
+    """End of the ["HH:MM", "HH:MM"] window containing ``now``, if any.
+    
+    A window whose end is before its start runs past midnight.
+    """
+    for window in windows or []:
+        try:
+            start, end = (datetime.strptime(value, '%H:%M').time() for value in window)
+        except (TypeError, ValueError):
+            logger.warning(f"Ignoring invalid time window: {window}")
+            continue
+        current = now.time()
+        if start <= end:
+            if start <= current < end:
+                return datetime.combine(now.date(), end)
+        elif current >= start:
+            return datetime.combine(now.date() + timedelta(days=1), end)
+        elif current < end:
+            return datetime.combine(now.date(), end)
+    return None
+
+
+def input_idle_seconds() -> Optional[float]:
+    """Seconds since the last keyboard or mouse input, or None off Windows"""
+    if sys.platform != 'win32':
+        return None
+    import ctypes
+    
+    class LASTINPUTINFO(ctypes.Structure):
+        _fields_ = [('cbSize', ctypes.c_uint), ('dwTime', ctypes.c_uint)]
+    
+    info = LASTINPUTINFO()
+    info.cbSize = ctypes.sizeof(info)
+    if not ctypes.windll.user32.GetLastInputInfo(ctypes.byref(info)):
+        return None
+    return ((ctypes.windll.kernel32.GetTickCount() - info.dwTime) & 0xFFFFFFFF) / 1000.0
+
+
+class TallyGovernor:
+    """Pace Tally exports so the operator's screen stays responsive.
+    
+    Modes are 'adaptive' (duty cycle, request gap and latency probes),
+    'idle', 'after_hours' and 'off'.
+    """
+    
+    MODES = ('adaptive', 'idle', 'after_hours', 'off')
+    PROBE_INTERVAL = 5.0
+    MIN_BASELINE = 0.05
+    MIN_SCALE = 0.125
+    MAX_REST = 60.0
+    WAIT_POLL_SECONDS = 15.0
+    
+    def __init__(self, mode: str = 'adaptive', duty_cycle: float = 0.8, min_gap: float = 0.2,
+                 slow_factor: float = 3.0, idle_seconds: float = 300,
+                 business_hours: Iterable = (), metrics: Optional[SyncMetrics] = None,
+                 cancel_event: Optional[threading.Event] = None):
+        if mode not in self.MODES:
+            logger.warning(f"Unknown tally_load_mode '{mode}', using 'adaptive'")
+            mode = 'adaptive'
+        self.mode = mode
+        self.duty_cycle = min(max(duty_cycle, 0.05), 1.0)
+        self.min_gap = max(min_gap, 0.0)
+        self.slow_factor = max(slow_factor, 1.0)
+        self.idle_seconds = idle_seconds
+        self.business_hours = list(business_hours or [])
+        self.metrics = metrics or SyncMetrics()
+        self.cancel_event = cancel_event or threading.Event()
+        self.latency: Optional[float] = None
+        self.baseline: Optional[float] = None
+        self.size_scale = 1.0
+        self.unpaced = False
+        self.next_start = 0.0
+        self.last_probe: Optional[float] = None
+        
+        if self.mode == 'idle' and input_idle_seconds() is None:
+            logger.warning("Idle detection needs Windows; tally_load_mode 'idle' falls back to 'adaptive'")
+            self.mode = 'adaptive'
+    
+    def before_request(self, probe: Optional[Callable[[], None]] = None):
+        """Wait until Tally may take the next request; call under the request lock"""
+        if self.mode == 'off':
+            return
+        started = time.monotonic()
+        
+        if self.mode == 'idle':
+            self._wait_for_idle()
+        elif self.mode == 'after_hours':
+            self._wait_for_after_hours()
+        self.unpaced = self.mode != 'adaptive'
+        
+        if not self.unpaced:
+            delay = self.next_start - time.monotonic()
+            if delay > 0:
+                self.cancel_event.wait(delay)
+            if probe and (self.last_probe is None
+                          or time.monotonic() - self.last_probe >= self.PROBE_INTERVAL):
+                self._probe(probe)
+        
+        if self.cancel_event.is_set():
+            raise SyncCancelled("Sync stopped while waiting for Tally")
+        self.metrics.observe('tally_governor_wait_seconds', time.monotonic() - started)
+    
+    def after_request(self, busy_seconds: float):
+        """Schedule the rest that follows a request which held Tally ``busy_seconds``"""
+        if self.mode == 'off' or self.unpaced:
+            return
+        duty = max(0.05, self.duty_cycle * self.size_scale)
+        rest = min(busy_seconds * (1 - duty) / duty, self.MAX_REST)
+        self.next_start = time.monotonic() + max(rest, self.min_gap)
+    
+    def observe_latency(self, seconds: float):
+        """Fold a probe latency into the average and adjust the size scale"""
+        self.metrics.observe('tally_probe_seconds', seconds)
+        self.latency = seconds if self.latency is None else 0.7 * self.latency + 0.3 * seconds
+        self.baseline = max(min(self.baseline or seconds, seconds), self.MIN_BASELINE)
+        
+        if self.latency > self.slow_factor * self.baseline:
+            if self.size_scale > self.MIN_SCALE:
+                self.size_scale = max(self.MIN_SCALE, self.size_scale / 2)
+                self.metrics.inc('tally_governor_slowdowns_total')
+                logger.info(f"Tally is responding slowly ({self.latency:.2f}s against "
+                            f"{self.baseline:.2f}s), easing off to {self.size_scale:.0%}")
+        elif self.size_scale < 1.0:
+            self.size_scale = min(1.0, self.size_scale * 1.5)
+    
+    def _probe(self, probe: Callable[[], None]):
+        """Time a probe request; failures are left to the real request"""
+        started = time.perf_counter()
+        try:
+            probe()
+        except Exception as e:
+            logger.debug(f"Tally probe failed: {e}")
+            return
+        finally:
+            self.last_probe = time.monotonic()
+        self.observe_latency(time.perf_counter() - started)
+    
+    def _wait_for_idle(self):
+        """Block until the workstation has been idle for idle_seconds"""
+        announced = False
+        while not self.cancel_event.is_set():
+            idle = input_idle_seconds()
+            if idle is None or idle >= self.idle_seconds:
+                return
+            if not announced:
+                logger.info(f"Tally is in use; sync paused until the workstation has been "
+                            f"idle for {self.idle_seconds:.0f}s")
+                announced = True
+            self.cancel_event.wait(min(self.WAIT_POLL_SECONDS, self.idle_seconds - idle))
+    
+    def _wait_for_after_hours(self):
+        """Block until business hours are over"""
+        announced = False
+        while not self.cancel_event.is_set():
+            now = datetime.now()
+            hours_end = time_window_end(self.business_hours, now)
+            if not hours_end:
+                return
+            if not announced:
+                logger.info(f"Business hours; sync paused until {hours_end:%H:%M}")
+                announced = True
+            self.cancel_event.wait(min(self.WAIT_POLL_SECONDS, (hours_end - now).total_seconds()))
+
+
+class TallyPrimeConnector:
+    """Tally Prime/ERP 9 Connector"""
+    
+    STREAM_CHUNK_SIZE = 64 * 1024
+    SPOOL_MAX_MEMORY = 16 * 1024 * 1024
+    VOUCHER_WINDOWS = {'day': 1, 'week': 7, 'month': 30}
+    MAX_WINDOW_DAYS = 92
+    WINDOW_TARGET_RECORDS = 5000
+    WINDOW_TARGET_SECONDS = 10.0
+    SYSINFO_REQUEST = """
+    <ENVELOPE>
+        <HEADER>
+            <VERSION>1</VERSION>
+            <TALLYREQUEST>Export</TALLYREQUEST>
+            <TYPE>Data</TYPE>
+            <ID>SysInfo</ID>
+        </HEADER>
+        <BODY>
+            <DESC>
+                <STATICVARIABLES>
+                    <SVEXPORTFORMAT>$$SysName:XML</SVEXPORTFORMAT>
+                </STATICVARIABLES>
+            </DESC>
+        </BODY>
+    </ENVELOPE>
+    """
+    
+    def __init__(self, host: str = "localhost", port: int = 9000, company_name: Optional[str] = None,
+                 streaming: bool = True, pool_size: int = 2, retries: int = 2,
+                 compact_records: bool = True, projected: Iterable[str] = (),
+                 session: Optional[requests.Session] = None,
+                 request_lock: Optional[threading.Lock] = None,
+                 metrics: Optional[SyncMetrics] = None,
+                 cancel_event: Optional[threading.Event] = None,
+                 governor: Optional[TallyGovernor] = None,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.base_url = f"http://{host}:{port}"
+        self.company_name = company_name
+        self.streaming = streaming
+        self.compact_records = compact_records
+        self.projected = set(projected) if compact_records else set()
+        self.owns_session = session is None
+        self.session = session or create_http_session(pool_size, retries)
+        # Tally's XML server handles one request at a time; connectors for
+        # different companies share this lock so their exports never overlap
+        self.request_lock = request_lock or threading.Lock()
+        self.metrics = metrics or SyncMetrics()
+        self.cancel_event = cancel_event or threading.Event()
+        # Shared with the request lock so pacing spans every company
+        self.governor = governor or TallyGovernor('off')
+        self.breaker = breaker or CircuitBreaker(f"Tally at {host}:{port}")
+        self.timings = {'fetch': 0.0, 'parse': 0.0}
+        self.headers = {
+            'Content-Type': 'application/xml',
+            'Accept': 'application/xml'
+        }
+        self.tally_version = None
+        self._company_response = None
+    
+    def test_connection(self) -> bool:
+        """Test Tally connection"""
+        try:
+            self.check_health(timeout=10)
+            return True
+        except Exception as e:
+            logger.error(f"Connection test failed: {e}")
+            return False
+    
+    def check_health(self, timeout: float = 5):
+        """Raise unless Tally answers a SysInfo request within ``timeout``.
+        
+        Sent without transport retries, so a closed Tally fails in seconds.
+        """
+        response = requests.post(
+            self.base_url,
+            data=self.SYSINFO_REQUEST.encode('utf-8'),
+            headers=self.headers,
+            timeout=timeout
+        )
+        response.raise_for_status()
+    
+    def _probe(self):
+        """Tiny request the governor times to gauge how busy Tally is"""
+        response = self.session.post(
+            self.base_url,
+            data=self.SYSINFO_REQUEST.encode('utf-8'),
+            headers=self.headers,
+            timeout=10
+        )
+        response.raise_for_status()
+    
+    def connection_stats(self) -> Dict:
+        """Get connection reuse statistics"""
+        return session_stats(self.session)
+    
+    def close(self):
+        """Close pooled connections unless the session is shared"""
+        if self.owns_session:
+            self.session.close()
+    
+    def get_company_list(self) -> List[Dict]:
+        """Get list of all companies"""
+        xml_request = """
+        <ENVELOPE>
+            <HEADER>
+                <VERSION>1</VERSION>
+                <TALLYREQUEST>Export</TALLYREQUEST>
+                <TYPE>Collection</TYPE>
+                <ID>List of Companies</ID>
+            </HEADER>
+            <BODY>
+                <DESC>
+                    <STATICVARIABLES>
+                        <SVEXPORTFORMAT>$$SysName:XML</SVEXPORTFORMAT>
+                    </STATICVARIABLES>
+                </DESC>
+            </BODY>
+        </ENVELOPE>
+        """
+        
+        try:
+            return list(self._fetch_collection(xml_request, 'COMPANY', strict=True))
+        except (requests.RequestException, ET.ParseError) as e:
+            logger.error(f"Could not list Tally companies: {e}")
+            return []
+    
+    def get_ledgers(self, after_alter_id: Optional[int] = None) -> Iterator[Dict]:
+        """Fetch all ledgers, or only those altered after ``after_alter_id``"""
+        if after_alter_id is not None or 'LEDGER' in self.projected:
+            xml_request = self._build_collection_request('Ledger', 'LEDGER', after_alter_id)
+            return self._fetch_collection(xml_request, 'LEDGER', strict=after_alter_id is not None)
+        
+        xml_request = f"""
+        <ENVELOPE>
+            <HEADER>
+                <VERSION>1</VERSION>
+                <TALLYREQUEST>Export</TALLYREQUEST>
+                <TYPE>Collection</TYPE>
+                <ID>AllLedgers</ID>
+            </HEADER>
+            <BODY>
+                <DESC>
+                    <STATICVARIABLES>
+                        <SVEXPORTFORMAT>$$SysName:XML</SVEXPORTFORMAT>
+                        {self._get_company_filter()}
+                    </STATICVARIABLES>
+                </DESC>
+            </BODY>
+        </ENVELOPE>
+        """
+        return self._fetch_collection(xml_request, 'LEDGER')
+    
+    def get_stock_items(self, after_alter_id: Optional[int] = None) -> Iterator[Dict]:
+        """Fetch all stock items, or only those altered after ``after_alter_id``"""
+        if after_alter_id is not None or 'STOCKITEM' in self.projected:
+            xml_request = self._build_collection_request('StockItem', 'STOCKITEM', after_alter_id)
+            return self._fetch_collection(xml_request, 'STOCKITEM', strict=after_alter_id is not None)
+        
+        xml_request = f"""
+        <ENVELOPE>
+            <HEADER>
+                <VERSION>1</VERSION>
+                <TALLYREQUEST>Export</TALLYREQUEST>
+                <TYPE>Collection</TYPE>
+                <ID>AllStockItems</ID>
+            </HEADER>
+            <BODY>
+                <DESC>
+                    <STATICVARIABLES>
+                        <SVEXPORTFORMAT>$$SysName:XML</SVEXPORTFORMAT>
+                        {self._get_company_filter()}
+                    </STATICVARIABLES>
+                </DESC>
+            </BODY>
+        </ENVELOPE>
+        """
+        return self._fetch_collection(xml_request, 'STOCKITEM')
+    
+    def get_vouchers(self, from_date: str, to_date: str) -> Iterator[Dict]:
+        """Fetch vouchers for date range"""
+        xml_request = self._build_voucher_request(from_date, to_date)
+        return self._fetch_collection(xml_request, 'VOUCHER')
+    
+    def get_vouchers_chunked(self, from_date: str, to_date: str, window: str = 'week',
+                             adaptive: bool = True, max_retries: int = 2,
+                             on_window: Optional[Callable[[str, str, int], None]] = None) -> Iterator[Dict]:
+        """Fetch vouchers window by window across a date range.
+        
+        Each window is read in full so it can be retried without duplicates;
+        ``on_window`` gets its dates and record count first.
+        """
+        start = datetime.strptime(self._format_date(from_date), '%Y%m%d')
+        end = datetime.strptime(self._format_date(to_date), '%Y%m%d')
+        base_days = self.VOUCHER_WINDOWS.get(window, self.VOUCHER_WINDOWS['week'])
+        days = base_days
+        attempt = 0
+        
+        while start <= end:
+            if self.cancel_event.is_set():
+                raise SyncCancelled(f"Voucher export stopped before {start:%Y%m%d}")
+            span = days if adaptive else max(1, int(days * self.governor.size_scale))
+            window_end = min(start + timedelta(days=span - 1), end)
+            xml_request = self._build_voucher_request(
+                start.strftime('%Y%m%d'), window_end.strftime('%Y%m%d'))
+            
+            started = time.monotonic()
+            try:
+                vouchers = list(self._fetch_collection(xml_request, 'VOUCHER', strict=True))
+            except (SyncCancelled, EndpointUnavailable):
+                raise
+            except Exception as e:
+                if span > 1:
+                    days = max(1, days // 2)
+                    attempt = 0
+                    logger.warning(f"Voucher window {start:%Y%m%d}-{window_end:%Y%m%d} failed ({e}), "
+                                   f"retrying with a smaller window")
+                    self.metrics.inc('tally_retries_total', collection='VOUCHER')
+                    self.cancel_event.wait(1)
+                    continue
+                attempt += 1
+                if attempt > max_retries:
+                    raise
+                logger.warning(f"Voucher window {start:%Y%m%d} failed ({e}), "
+                               f"retry {attempt}/{max_retries}")
+                self.metrics.inc('tally_retries_total', collection='VOUCHER')
+                self.cancel_event.wait(min(2 ** attempt, 30))
+                continue
+            elapsed = time.monotonic() - started
+            attempt = 0
+            
+            logger.info(f"Fetched {len(vouchers)} vouchers for {start:%Y%m%d}-{window_end:%Y%m%d} "
+                        f"in {elapsed:.1f}s")
+            if on_window:
+                on_window(start.strftime('%Y%m%d'), window_end.strftime('%Y%m%d'), len(vouchers))
+            yield from vouchers
+            
+            start = window_end + timedelta(days=1)
+            if adaptive:
+                days = self._next_window_days(days, len(vouchers), elapsed)
+            else:
+                days = min(days * 2, base_days)
+    
+    def _next_window_days(self, days: int, count: int, elapsed: float) -> int:
+        """Scale a voucher window towards the record and latency targets"""
+        size_scale = self.governor.size_scale
+        scale = self.WINDOW_TARGET_SECONDS * size_scale / max(elapsed, 0.1)
+        if count:
+            scale = min(scale, self.WINDOW_TARGET_RECORDS * size_scale / count)
+        scale = max(0.5, min(scale, 2.0))
+        return max(1, min(int(days * scale), self.MAX_WINDOW_DAYS))
+    
+    def _build_collection_request(self, object_type: str, tag_name: str,
+                                  after_alter_id: Optional[int] = None,
+                                  static_variables: str = '') -> str:
+        """Build an inline TDL collection request, optionally filtered on AlterID"""
+        collection = f"TallySync{object_type}"
+        if tag_name in self.projected and tag_name in RECORD_TYPES:
+            methods = f"<FETCH>{self._fetch_list(tag_name)}</FETCH>"
+        else:
+            methods = "<NATIVEMETHOD>*</NATIVEMETHOD>"
+        
+        collection_filter = ''
+        formula = ''
+        if after_alter_id is not None:
+            collection_filter = f"<FILTER>{collection}Filter</FILTER>"
+            formula = (f'<SYSTEM TYPE="Formulae" NAME="{collection}Filter">'
+                       f'$AlterID &gt; {int(after_alter_id)}</SYSTEM>')
+        
+        return f"""
+        <ENVELOPE>
+            <HEADER>
+                <VERSION>1</VERSION>
+                <TALLYREQUEST>Export</TALLYREQUEST>
+                <TYPE>Collection</TYPE>
+                <ID>{collection}</ID>
+            </HEADER>
+            <BODY>
+                <DESC>
+                    <STATICVARIABLES>
+                        <SVEXPORTFORMAT>$$SysName:XML</SVEXPORTFORMAT>
+                        {static_variables}
+                        {self._get_company_filter()}
+                    </STATICVARIABLES>
+                    <TDL>
+                        <TDLMESSAGE>
+                            <COLLECTION NAME="{collection}" ISMODIFY="No">
+                                <TYPE>{object_type}</TYPE>
+                                {methods}
+                                {collection_filter}
+                            </COLLECTION>
+                            {formula}
+                        </TDLMESSAGE>
+                    </TDL>
+                </DESC>
+            </BODY>
+        </ENVELOPE>
+        """
+    
+    @staticmethod
+    def _fetch_list(tag_name: str) -> str:
+        """TDL FETCH list covering every source in a record schema"""
+        methods = []
+        for sources in RECORD_TYPES[tag_name].FIELDS.values():
+            for source in sources:
+                if source.startswith('@'):
+                    continue
+                method = source.split('/')[0].replace('.LIST', '')
+                if method not in methods:
+                    methods.append(method)
+        return ', '.join(methods)
+    
+    def _build_voucher_request(self, from_date: str, to_date: str) -> str:
+        """Build VoucherCollection request for a date range"""
+        from_date = self._format_date(from_date)
+        to_date = self._format_date(to_date)
+        
+        if 'VOUCHER' in self.projected:
+            return self._build_collection_request(
+                'Voucher', 'VOUCHER',
+                static_variables=f"<SVFROMDATE>{from_date}</SVFROMDATE><SVTODATE>{to_date}</SVTODATE>"
+            )
+        
+        return f"""
+        <ENVELOPE>
+            <HEADER>
+                <VERSION>1</VERSION>
+                <TALLYREQUEST>Export</TALLYREQUEST>
+                <TYPE>Collection</TYPE>
+                <ID>VoucherCollection</ID>
+            </HEADER>
+            <BODY>
+                <DESC>
+                    <STATICVARIABLES>
+                        <SVEXPORTFORMAT>$$SysName:XML</SVEXPORTFORMAT>
+                        <SVFROMDATE>{from_date}</SVFROMDATE>
+                        <SVTODATE>{to_date}</SVTODATE>
+                        {self._get_company_filter()}
+                    </STATICVARIABLES>
+                </DESC>
+            </BODY>
+        </ENVELOPE>
+        """
+    
+    def get_company_info(self) -> Dict:
+        """Get current company information"""
+        response = self._company_response or self._request_company_info()
+        self._company_response = None
+        if self.compact_records:
+            try:
+                company = ET.fromstring(response).find('.//COMPANY')
+                if company is not None:
+                    return CompanyRecord.from_element(company).to_row()
+            except ET.ParseError as e:
+                logger.error(f"XML parsing failed: {e}")
+        return self._parse_xml_to_dict(response)
+    
+    def resolve_company(self) -> Optional[str]:
+        """Name of the company exports read from, asking Tally for the open one"""
+        if self.company_name:
+            return self.company_name
+        self._company_response = self._request_company_info()
+        try:
+            company = ET.fromstring(self._company_response).find('.//COMPANY')
+        except ET.ParseError:
+            return None
+        if company is None:
+            return None
+        name = CompanyRecord.from_element(company).NAME
+        return name.strip() if isinstance(name, str) and name.strip() else None
+    
+    def _request_company_info(self) -> str:
+        """Export the company info report"""
+        xml_request = f"""
+        <ENVELOPE>
+            <HEADER>
+                <VERSION>1</VERSION>
+                <TALLYREQUEST>Export</TALLYREQUEST>
+                <TYPE>Data</TYPE>
+                <ID>CompanyInfo</ID>
+            </HEADER>
+            <BODY>
+                <DESC>
+                    <STATICVARIABLES>
+                        <SVEXPORTFORMAT>$$SysName:XML</SVEXPORTFORMAT>
+                        {self._get_company_filter()}
+                    </STATICVARIABLES>
+                </DESC>
+            </BODY>
+        </ENVELOPE>
+        """
+        return self._send_request(xml_request, 'COMPANYINFO')
+    
+    def _get_company_filter(self) -> str:
+        """Get company filter XML"""
+        if self.company_name:
+            return f"<SVCURRENTCOMPANY>{escape(self.company_name)}</SVCURRENTCOMPANY>"
+        return "<SVCURRENTCOMPANY>##SVCURRENTCOMPANY</SVCURRENTCOMPANY>"
+    
+    def _format_date(self, date_str: str) -> str:
+        """Format date to Tally format (YYYYMMDD)"""
+        date_str = date_str.replace('-', '')
+        if len(date_str) == 8 and date_str.isdigit():
+            return date_str
+        return datetime.now().strftime('%Y%m%d')
+    
+    def _send_request(self, xml_request: str, collection: str = '') -> str:
+        """Send XML request to Tally"""
+        self.metrics.inc('tally_requests_total', collection=collection)
+        try:
+            with self.request_lock:
+                self.breaker.check()
+                self.governor.before_request(self._probe)
+                started = time.perf_counter()
+                try:
+                    response = self.session.post(
+                        self.base_url,
+                        data=xml_request.encode('utf-8'),
+                        headers=self.headers,
+                        timeout=30
+                    )
+                    self.metrics.observe('tally_request_seconds', time.perf_counter() - started,
+                                         collection=collection)
+                    self.metrics.inc('tally_retries_total', retry_count(response), collection=collection)
+                    self.metrics.inc('tally_response_bytes_total', len(response.content),
+                                     collection=collection)
+                finally:
+                    self.governor.after_request(time.perf_counter() - started)
+                response.raise_for_status()
+                self.breaker.record_success()
+                return response.text
+        except (SyncCancelled, EndpointUnavailable):
+            raise
+        except Exception as e:
+            if isinstance(e, requests.RequestException):
+                self.breaker.record_failure()
+            self.metrics.inc('tally_request_errors_total', collection=collection)
+            logger.error(f"Tally request failed: {e}")
+            raise
+    
+    def _stream_request(self, xml_request: str, collection: str = '') -> Iterator[bytes]:
+        """Send XML request to Tally and yield the response body in chunks.
+        
+        The body is spooled in full first, so backpressure never holds the
+        request lock.
+        """
+        self.metrics.inc('tally_requests_total', collection=collection)
+        with self.request_lock:
+            self.breaker.check()
+            self.governor.before_request(self._probe)
+            started = time.perf_counter()
+            try:
+                response = self.session.post(
+                    self.base_url,
+                    data=xml_request.encode('utf-8'),
+                    headers=self.headers,
+                    timeout=30,
+                    stream=True
+                )
+                self.metrics.observe('tally_request_seconds', time.perf_counter() - started,
+                                     collection=collection)
+                self.metrics.inc('tally_retries_total', retry_count(response), collection=collection)
+                response.raise_for_status()
+                self.breaker.record_success()
+            except Exception as e:
+                self.governor.after_request(time.perf_counter() - started)
+                if isinstance(e, requests.RequestException):
+                    self.breaker.record_failure()
+                self.metrics.inc('tally_request_errors_total', collection=collection)
+                logger.error(f"Tally request failed: {e}")
+                raise
+            
+            body = tempfile.SpooledTemporaryFile(max_size=self.SPOOL_MAX_MEMORY)
+            try:
+                with response:
+                    for chunk in response.iter_content(chunk_size=self.STREAM_CHUNK_SIZE):
+                        self.metrics.inc('tally_response_bytes_total', len(chunk), collection=collection)
+                        body.write(chunk)
+            except BaseException as e:
+                body.close()
+                if isinstance(e, requests.RequestException):
+                    self.breaker.record_failure()
+                raise
+            finally:
+                self.governor.after_request(time.perf_counter() - started)
+        
+        with body:
+            body.seek(0)
+            for chunk in iter(lambda: body.read(self.STREAM_CHUNK_SIZE), b''):
+                yield chunk
+    
+    def _fetch_collection(self, xml_request: str, tag_name: str, strict: bool = False) -> Iterator[Dict]:
+        """Fetch a collection, streamed or buffered depending on mode"""
+        fetch_before = self.timings['fetch']
+        parse_before = self.timings['parse']
+        count = 0
+        
+        if self.streaming:
+            items = self._iter_collection(self._stream_request(xml_request, tag_name), tag_name, strict)
+        else:
+            started = time.perf_counter()
+            response = self._send_request(xml_request, tag_name)
+            fetched = time.perf_counter()
+            items = self._parse_collection(response, tag_name, strict)
+            self.timings['fetch'] += fetched - started
+            self.timings['parse'] += time.perf_counter() - fetched
+        
+        try:
+            for item in items:
+                count += 1
+                yield item
+        finally:
+            self.metrics.inc('tally_records_total', count, collection=tag_name)
+            self.metrics.observe('tally_fetch_seconds', self.timings['fetch'] - fetch_before,
+                                 collection=tag_name)
+            self.metrics.observe('tally_parse_seconds', self.timings['parse'] - parse_before,
+                                 collection=tag_name)
+    
+    def _parse_xml_to_dict(self, xml_string: str) -> Dict:
+        """Parse XML to dictionary"""
+        try:
+            root = ET.fromstring(xml_string)
+            return self._element_to_dict(root)
+        except Exception as e:
+            logger.error(f"XML parsing failed: {e}")
+            return {}
+    
+    def _element_to_dict(self, element) -> Dict:
+        """Convert XML element to dict"""
+        result = {}
+        if element.text and element.text.strip():
+            result['_text'] = element.text.strip()
+        if element.attrib:
+            result['_attributes'] = element.attrib
+        for child in element:
+            child_data = self._element_to_dict(child)
+            if child.tag in result:
+                if not isinstance(result[child.tag], list):
+                    result[child.tag] = [result[child.tag]]
+                result[child.tag].append(child_data)
+            else:
+                result[child.tag] = child_data
+        if len(result) == 1 and '_text' in result:
+            return result['_text']
+        return result
+    
+    def _to_record(self, element, tag_name: str):
+        """Convert a collection item to a compact record or a generic dict"""
+        record_type = RECORD_TYPES.get(tag_name) if self.compact_records else None
+        if record_type:
+            return record_type.from_element(element)
+        return self._element_to_dict(element)
+    
+    def _parse_collection(self, xml_string: str, tag_name: str, strict: bool = False) -> List[Dict]:
+        """Parse collection XML"""
+        try:
+            root = ET.fromstring(xml_string)
+            items = []
+            paths = [
+                f'.//{tag_name}',
+                f'.//BODY/DATA/COLLECTION/{tag_name}',
+                f'.//BODY/IMPORTDATA/REQUESTDATA/{tag_name}'
+            ]
+            for path in paths:
+                elements = root.findall(path)
+                if elements:
+                    for item in elements:
+                        items.append(self._to_record(item, tag_name))
+                    break
+            return items
+        except Exception as e:
+            logger.error(f"Collection parsing failed: {e}")
+            if strict:
+                raise
+            return []
+    
+    def _iter_collection(self, chunks: Iterable[bytes], tag_name: str, strict: bool = False) -> Iterator[Dict]:
+        """Incrementally parse collection XML, yielding each outermost item as it closes"""
+        parser = ET.XMLPullParser(events=('start', 'end'))
+        stack = []
+        depth = 0
+        chunks = iter(chunks)
+        
+        try:
+            while True:
+                started = time.perf_counter()
+                chunk = next(chunks, None)
+                parsing = time.perf_counter()
+                self.timings['fetch'] += parsing - started
+                if chunk is None:
+                    parser.close()
+                    break
+                
+                parser.feed(chunk)
+                items = []
+                for event, element in parser.read_events():
+                    if event == 'start':
+                        stack.append(element)
+                        if element.tag == tag_name:
+                            depth += 1
+                        continue
+                    
+                    stack.pop()
+                    if element.tag != tag_name:
+                        continue
+                    depth -= 1
+                    if depth:
+                        continue
+                    
+                    items.append(self._to_record(element, tag_name))
+                    element.clear()
+                    if stack:
+                        stack[-1].remove(element)
+                self.timings['parse'] += time.perf_counter() - parsing
+                yield from items
+        except ET.ParseError as e:
+            logger.error(f"Collection parsing failed: {e}")
+            if strict:
+                raise
+
+
+class ChangeStore:
+    """Hashes of acknowledged records per server URL, company and GUID.
+    
+    Used to skip unchanged records; set ``company`` before each company's
+    uploads.
+    """
+    
+    LOOKUP_CHUNK = 500
+    
+    def __init__(self, path: Optional[Path] = None, server_url: str = ''):
+        self.path = path or ConfigManager.CONFIG_DIR / "change_store.db"
+        self.server_url = server_url.rstrip('/')
+        self.company = ''
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(record_hashes)")]
+        if columns and 'server' not in columns:
+            logger.info("Change store predates per-server hashes, starting it afresh")
+            self.conn.execute("DROP TABLE record_hashes")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS record_hashes (
+                   server TEXT NOT NULL,
+                   company TEXT NOT NULL,
+                   endpoint TEXT NOT NULL,
+                   guid TEXT NOT NULL,
+                   hash BLOB NOT NULL,
+                   PRIMARY KEY (server, company, endpoint, guid)
+               ) WITHOUT ROWID"""
+        )
+        self.conn.commit()
+    
+    @staticmethod
+    def record_guid(record: Dict) -> Optional[str]:
+        """Get the GUID of a record, if it has one"""
+        guid = record.get('GUID') if isinstance(record, (dict, TallyRecord)) else None
+        return guid if isinstance(guid, str) and guid else None
+    
+    @staticmethod
+    def record_hash(record: Dict) -> bytes:
+        """Hash the canonical JSON form of a record"""
+        canonical = json.dumps(record, sort_keys=True, separators=(',', ':'),
+                               ensure_ascii=False, default=record_to_json)
+        return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).digest()
+    
+    def filter_changed(self, endpoint: str, records: List[Dict]) -> Tuple[List[Dict], List[Dict], Dict[str, bytes]]:
+        """Split records into changed and unchanged, plus the changed ones' new hashes"""
+        hashes = {}
+        for record in records:
+            guid = self.record_guid(record)
+            if guid:
+                hashes[guid] = self.record_hash(record)
+        
+        stored = {}
+        guids = list(hashes)
+        for i in range(0, len(guids), self.LOOKUP_CHUNK):
+            chunk = guids[i:i + self.LOOKUP_CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT guid, hash FROM record_hashes "
+                f"WHERE server = ? AND company = ? AND endpoint = ? AND guid IN ({placeholders})",
+                [self.server_url, self.company, endpoint, *chunk]
+            )
+            stored.update(rows)
+        
+        changed = []
+        unchanged = []
+        for record in records:
+            guid = self.record_guid(record)
+            if guid and stored.get(guid) == hashes[guid]:
+                unchanged.append(record)
+            else:
+                changed.append(record)
+        
+        changed_hashes = {guid: h for guid, h in hashes.items() if stored.get(guid) != h}
+        return changed, unchanged, changed_hashes
+    
+    def commit(self, endpoint: str, hashes: Dict[str, bytes]):
+        """Record hashes of acknowledged records"""
+        if not hashes:
+            return
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO record_hashes (server, company, endpoint, guid, hash) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(self.server_url, self.company, endpoint, guid, h) for guid, h in hashes.items()]
+            )
+    
+    def close(self):
+        """Close the database"""
+        self.conn.close()
+
+
+class Outbox:
+    """Durable queue of upload batches, replayed with backoff by the next sync.
+    
+    Records a newer upload delivered are dropped from it; batches the server
+    rejects for good go to dead_letters.
+    """
+    
+    BACKOFF_BASE = 60
+    BACKOFF_MAX = 6 * 60 * 60
+    MAX_ATTEMPTS = 10
+    LOOKUP_CHUNK = 500
+    RETRYABLE_STATUSES = {401, 403, 408, 413, 425, 429}
+    
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or ConfigManager.CONFIG_DIR / "outbox.db"
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS outbox (
+                   id INTEGER PRIMARY KEY AUTOINCREMENT,
+                   endpoint TEXT NOT NULL,
+                   payload BLOB NOT NULL,
+                   attempts INTEGER NOT NULL DEFAULT 0,
+                   next_attempt REAL NOT NULL DEFAULT 0,
+                   last_error TEXT,
+                   created REAL NOT NULL
+               )"""
+        )
+        indexed = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'outbox_guids'"
+        ).fetchone()
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS outbox_guids (
+                   endpoint TEXT NOT NULL,
+                   guid TEXT NOT NULL,
+                   batch_id INTEGER NOT NULL,
+                   PRIMARY KEY (endpoint, guid, batch_id)
+               ) WITHOUT ROWID"""
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS outbox_guids_batch ON outbox_guids (batch_id)")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS dead_letters (
+                   id INTEGER PRIMARY KEY,
+                   endpoint TEXT NOT NULL,
+                   payload BLOB NOT NULL,
+                   status INTEGER,
+                   error TEXT,
+                   created REAL NOT NULL
+               )"""
+        )
+        if not indexed:
+            for batch_id, endpoint, payload in self.conn.execute(
+                    "SELECT id, endpoint, payload FROM outbox").fetchall():
+                self._index(batch_id, endpoint, json.loads(payload))
+        self.conn.commit()
+    
+    def _index(self, batch_id: int, endpoint: str, batch: List[Dict]):
+        """Record the GUIDs of a queued batch"""
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO outbox_guids (endpoint, guid, batch_id) VALUES (?, ?, ?)",
+            ((endpoint, guid, batch_id) for guid in map(ChangeStore.record_guid, batch) if guid)
+        )
+    
+    def add(self, endpoint: str, batch: List[Dict]) -> int:
+        """Persist a batch before it is sent"""
+        payload = json.dumps(batch, default=record_to_json).encode('utf-8')
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO outbox (endpoint, payload, created) VALUES (?, ?, ?)",
+                (endpoint, payload, time.time())
+            )
+            self._index(cursor.lastrowid, endpoint, batch)
+        return cursor.lastrowid
+    
+    def remove(self, batch_id: int):
+        """Drop an acknowledged batch"""
+        with self.conn:
+            self.conn.execute("DELETE FROM outbox WHERE id = ?", (batch_id,))
+            self.conn.execute("DELETE FROM outbox_guids WHERE batch_id = ?", (batch_id,))
+    
+    @classmethod
+    def is_permanent(cls, status: Optional[int]) -> bool:
+        """Whether a rejection won't go away by sending the batch again"""
+        return status is not None and 400 <= status < 500 and status not in cls.RETRYABLE_STATUSES
+    
+    def mark_failed(self, batch_id: int, error: str, status: Optional[int] = None):
+        """Schedule a failed batch for a later retry, or dead-letter it"""
+        row = self.conn.execute("SELECT attempts FROM outbox WHERE id = ?", (batch_id,)).fetchone()
+        if row is None:
+            return
+        attempts = row[0] + 1
+        if self.is_permanent(status) or attempts >= self.MAX_ATTEMPTS:
+            self.dead_letter(batch_id, error, status)
+            return
+        
+        delay = min(self.BACKOFF_BASE * 2 ** (attempts - 1), self.BACKOFF_MAX)
+        delay *= random.uniform(0.5, 1.0)
+        with self.conn:
+            self.conn.execute(
+                "UPDATE outbox SET attempts = ?, next_attempt = ?, last_error = ? WHERE id = ?",
+                (attempts, time.time() + delay, error, batch_id)
+            )
+    
+    def dead_letter(self, batch_id: int, error: str, status: Optional[int] = None):
+        """Move a batch out of the queue into dead_letters"""
+        logger.error(f"Moving outbox batch {batch_id} to dead letters (HTTP {status}): {error}")
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO dead_letters (endpoint, payload, status, error, created) "
+                "SELECT endpoint, payload, ?, ?, ? FROM outbox WHERE id = ?",
+                (status, error, time.time(), batch_id)
+            )
+            self.conn.execute("DELETE FROM outbox WHERE id = ?", (batch_id,))
+            self.conn.execute("DELETE FROM outbox_guids WHERE batch_id = ?", (batch_id,))
+    
+    def supersede(self, endpoint: str, guids: Iterable[str]) -> int:
+        """Drop queued records that a newer upload of the endpoint delivered"""
+        guids = [guid for guid in set(guids) if guid]
+        queued = {}
+        for i in range(0, len(guids), self.LOOKUP_CHUNK):
+            chunk = guids[i:i + self.LOOKUP_CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            for guid, batch_id in self.conn.execute(
+                    f"SELECT guid, batch_id FROM outbox_guids "
+                    f"WHERE endpoint = ? AND guid IN ({placeholders})", [endpoint, *chunk]):
+                queued.setdefault(batch_id, set()).add(guid)
+        if not queued:
+            return 0
+        
+        dropped = 0
+        with self.conn:
+            for batch_id, superseded in queued.items():
+                row = self.conn.execute("SELECT payload FROM outbox WHERE id = ?", (batch_id,)).fetchone()
+                batch = json.loads(row[0]) if row else []
+                kept = [record for record in batch if ChangeStore.record_guid(record) not in superseded]
+                dropped += len(batch) - len(kept)
+                if kept:
+                    self.conn.execute(
+                        "UPDATE outbox SET payload = ? WHERE id = ?",
+                        (json.dumps(kept, default=record_to_json).encode('utf-8'), batch_id)
+                    )
+                    self.conn.executemany(
+                        "DELETE FROM outbox_guids WHERE endpoint = ? AND guid = ? AND batch_id = ?",
+                        [(endpoint, guid, batch_id) for guid in superseded]
+                    )
+                else:
+                    self.conn.execute("DELETE FROM outbox WHERE id = ?", (batch_id,))
+                    self.conn.execute("DELETE FROM outbox_guids WHERE batch_id = ?", (batch_id,))
+        if dropped:
+            logger.info(f"Dropped {dropped} superseded {endpoint} records from the outbox")
+        return dropped
+    
+    def due(self) -> List[Tuple[int, str]]:
+        """Batches whose retry time has come, oldest first"""
+        return self.conn.execute(
+            "SELECT id, endpoint FROM outbox WHERE next_attempt <= ? ORDER BY id",
+            (time.time(),)
+        ).fetchall()
+    
+    def load(self, batch_id: int) -> List[Dict]:
+        """Load a queued batch"""
+        row = self.conn.execute("SELECT payload FROM outbox WHERE id = ?", (batch_id,)).fetchone()
+        return json.loads(row[0]) if row else []
+    
+    def pending(self) -> int:
+        """Number of queued batches"""
+        return self.conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+    
+    def dead_letters(self) -> int:
+        """Number of batches the server rejected for good"""
+        return self.conn.execute("SELECT COUNT(*) FROM dead_letters").fetchone()[0]
+    
+    def close(self):
+        """Close the database"""
+        self.conn.close()
+
+
+class BatchSizer:
+    """Adapt the number of records per upload to byte and latency budgets"""
+    
+    MAX_SIZE = 10000
+    
+    def __init__(self, initial: int, byte_budget: int, latency_budget: float, adaptive: bool = True):
+        self.size = max(1, initial)
+        self.byte_budget = byte_budget
+        self.latency_budget = latency_budget
+        self.adaptive = adaptive
+    
+    def observe(self, count: int, result: Dict):
+        """Rescale from the outcome of a batch of ``count`` records"""
+        if not self.adaptive or not count:
+            return
+        if ServerSync._rejected_as_too_large(result):
+            self.size = max(1, min(self.size, count) // 2)
+            return
+        if not result['success'] or not result.get('bytes'):
+            return
+        
+        by_bytes = self.byte_budget * count / result['bytes']
+        by_latency = self.latency_budget * count / max(result.get('elapsed', 0), 0.01)
+        target = min(by_bytes, by_latency, self.size * 2)
+        target = max(target, self.size / 2)
+        self.size = max(1, min(int(target), self.MAX_SIZE))
+
+
+class ColumnarBatch:
+    """MessagePack batch for the server's /bulk endpoint, laid out column by column.
+    
+    Repeated text columns are sent as indexes into ``strings``; missing
+    values are nil.
+    """
+    
+    CONTENT_TYPE = 'application/x-msgpack'
+    VERSION = 1
+    # Dictionary-encode a column when it has at most this share of distinct values
+    MAX_DISTINCT_SHARE = 0.5
+    
+    @classmethod
+    def encode(cls, collection: str, records: List) -> bytes:
+        """Pack records of one collection into a columnar MessagePack document"""
+        record_type = type(records[0]) if records else None
+        if record_type and issubclass(record_type, TallyRecord) and all(
+                type(record) is record_type for record in records):
+            # Compact records: read the slots directly, no per-record dicts
+            columns = {field: [getattr(record, field) for record in records]
+                       for field in record_type.__slots__}
+        else:
+            rows = [record.to_row() if isinstance(record, TallyRecord) else record for record in records]
+            fields = dict.fromkeys(field for row in rows for field in row)
+            columns = {field: [row.get(field) for row in rows] for field in fields}
+        
+        strings: Dict[str, int] = {}
+        dict_columns = []
+        for field, values in list(columns.items()):
+            present = [value for value in values if value is not None]
+            if not present:
+                del columns[field]
+                continue
+            if not all(isinstance(value, str) for value in present):
+                continue
+            if len(set(present)) > len(values) * cls.MAX_DISTINCT_SHARE:
+                continue
+            columns[field] = [None if value is None else strings.setdefault(value, len(strings))
+                              for value in values]
+            dict_columns.append(field)
+        
+        return msgpack.packb({
+            'version': cls.VERSION,
+            'collection': collection,
+            'count': len(records),
+            'columns': columns,
+            'dict_columns': dict_columns,
+            'strings': list(strings)
+        }, default=record_to_json)
+
+
+class NdjsonBody:
+    """Streaming request body with one JSON record per line.
+    
+    Encoded and compressed a chunk at a time as it is read; iterating again
+    starts over so urllib3 can retry.
+    """
+    
+    CONTENT_TYPE = 'application/x-ndjson'
+    CHUNK_BYTES = 64 * 1024
+    
+    def __init__(self, records: List, content_encoding: Optional[str] = None):
+        self.records = records
+        self.content_encoding = content_encoding
+        self.raw_bytes = 0
+        self.wire_bytes = 0
+        self.encode_seconds = 0.0
+    
+    def _compressor(self):
+        """Incremental compressor for the content encoding, if any"""
+        if self.content_encoding == 'zstd':
+            return zstandard.ZstdCompressor(level=3).compressobj()
+        if self.content_encoding == 'gzip':
+            return zlib.compressobj(6, zlib.DEFLATED, 31)
+        return None
+    
+    def __iter__(self) -> Iterator[bytes]:
+        self.raw_bytes = 0
+        self.wire_bytes = 0
+        self.encode_seconds = 0.0
+        compressor = self._compressor()
+        lines = []
+        buffered = 0
+        
+        started = time.perf_counter()
+        for record in self.records:
+            line = encode_json(record) + b'\n'
+            lines.append(line)
+            buffered += len(line)
+            if buffered >= self.CHUNK_BYTES:
+                chunk = self._encode_chunk(compressor, b''.join(lines))
+                lines = []
+                buffered = 0
+                self.encode_seconds += time.perf_counter() - started
+                if chunk:
+                    yield chunk
+                started = time.perf_counter()
+        
+        chunk = self._encode_chunk(compressor, b''.join(lines), final=True)
+        self.encode_seconds += time.perf_counter() - started
+        if chunk:
+            yield chunk
+    
+    def _encode_chunk(self, compressor, data: bytes, final: bool = False) -> bytes:
+        """Compress one chunk of lines and update the byte counts"""
+        self.raw_bytes += len(data)
+        if compressor:
+            data = compressor.compress(data) + (compressor.flush() if final else b'')
+        self.wire_bytes += len(data)
+        return data
+
+
+class ServerSync:
+    """Server synchronization handler"""
+    
+    COMPRESS_MIN_BYTES = 1024
+    MAX_REQUEST_BYTES = 45 * 1024 * 1024
+    STREAM_MIN_RECORDS = 1000
+
+    def __init__(self, server_url: str, api_key: Optional[str] = None,
+                 change_store: Optional[ChangeStore] = None, pool_size: int = 10, retries: int = 3,
+                 outbox: Optional[Outbox] = None, adaptive_batching: bool = False,
+                 batch_byte_budget: int = 4 * 1024 * 1024, batch_latency_budget: float = 10.0,
+                 session: Optional[requests.Session] = None, metrics: Optional[SyncMetrics] = None,
+                 cancel_event: Optional[threading.Event] = None,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.server_url = server_url.rstrip('/')
+        self.change_store = change_store
+        self.outbox = outbox
+        self.adaptive_batching = adaptive_batching
+        self.batch_byte_budget = min(batch_byte_budget, self.MAX_REQUEST_BYTES)
+        self.batch_latency_budget = batch_latency_budget
+        self.owns_session = session is None
+        self.session = session or create_http_session(pool_size, retries)
+        self.headers = {'Content-Type': 'application/json'}
+        if api_key:
+            self.headers['Authorization'] = f'Bearer {api_key}'
+        self.content_encoding = None
+        self.stream_min_records: Optional[int] = None
+        self.columnar = False
+        self.metrics = metrics or SyncMetrics()
+        self.cancel_event = cancel_event or threading.Event()
+        self.breaker = breaker or CircuitBreaker(f"Server at {self.server_url}")
+        self.timings = {'serialize': 0.0, 'upload': 0.0}
+        self._timings_lock = threading.Lock()
+    
+    @staticmethod
+    def supported_encodings() -> List[str]:
+        """Request encodings this client can produce, best first"""
+        return ['zstd', 'gzip'] if zstandard else ['gzip']
+    
+    def negotiate(self, compression: str = 'auto', streaming: str = 'auto',
+                  health: Optional[Dict] = None, upload_format: str = 'auto') -> Optional[str]:
+        """Pick the request Content-Encoding and body format from the server's /health"""
+        self.content_encoding = None
+        self.stream_min_records = None
+        self.columnar = False
+        if compression == 'none' and streaming == 'never' and upload_format == 'json':
+            return None
+        
+        if health is None:
+            try:
+                health = self.check_health(timeout=10)
+            except Exception as e:
+                logger.warning(f"Upload negotiation failed: {e}")
+                health = {}
+        
+        if compression != 'none':
+            offered = health.get('accept_encoding', [])
+            candidates = self.supported_encodings() if compression == 'auto' else [compression]
+            for encoding in candidates:
+                if encoding in offered and encoding in self.supported_encodings():
+                    self.content_encoding = encoding
+                    break
+        
+        accepted_types = health.get('accept_content_type', [])
+        if upload_format != 'json' and ColumnarBatch.CONTENT_TYPE in accepted_types:
+            if msgpack:
+                self.columnar = True
+            elif upload_format == 'msgpack':
+                logger.warning("upload_format 'msgpack' needs the msgpack package; uploading JSON")
+        
+        if streaming != 'never' and NdjsonBody.CONTENT_TYPE in accepted_types:
+            self.stream_min_records = 1 if streaming == 'always' else self.STREAM_MIN_RECORDS
+        
+        logger.info(f"Upload compression: {self.content_encoding or 'none'}, "
+                    f"format: {'msgpack' if self.columnar else 'json'}, "
+                    f"streaming: {'on' if self.stream_min_records and not self.columnar else 'off'}")
+        return self.content_encoding
+    
+    def _compress(self, body: bytes) -> bytes:
+        """Compress a request body with the negotiated encoding"""
+        if self.content_encoding == 'zstd':
+            return zstandard.ZstdCompressor(level=3).compress(body)
+        return gzip.compress(body, compresslevel=6)
+    
+    def test_connection(self) -> bool:
+        """Test server connection"""
+        try:
+            self.check_health(timeout=10)
+            return True
+        except Exception as e:
+            logger.error(f"Server connection test failed: {e}")
+            return False
+    
+    def check_health(self, timeout: float = 5) -> Dict:
+        """Return the server's /health document, raising unless it answers 200.
+        
+        Sent without transport retries, so an unreachable server fails in
+        seconds.
+        """
+        response = requests.get(
+            f"{self.server_url}/health",
+            headers=self.headers,
+            timeout=timeout
+        )
+        response.raise_for_status()
+        try:
+            health = response.json()
+        except ValueError:
+            raise ValueError("/health did not return JSON")
+        return health if isinstance(health, dict) else {}
+    
+    def connection_stats(self) -> Dict:
+        """Get connection reuse statistics"""
+        return session_stats(self.session)
+    
+    def close(self):
+        """Close pooled connections unless the session is shared"""
+        if self.owns_session:
+            self.session.close()
+    
+    def send_data(self, endpoint: str, data: Dict or List) -> Dict:
+        """Send data to server; the result carries the status, body size and latency"""
+        status = None
+        raw_bytes = 0
+        stream = None
+        if self.breaker.is_open:
+            return {
+                'success': False,
+                'error': f"{self.breaker.name} is unavailable",
+                'status': None,
+                'bytes': 0,
+                'timeout': False
+            }
+        try:
+            url = f"{self.server_url}/{endpoint}"
+            started = time.perf_counter()
+            if self.columnar and isinstance(data, list):
+                url = f"{self.server_url}/bulk"
+                body = ColumnarBatch.encode(endpoint, data)
+                raw_bytes = len(body)
+                if raw_bytes > self.MAX_REQUEST_BYTES:
+                    status = 413
+                    raise ValueError(f"Request body of {raw_bytes} bytes exceeds the server limit")
+                headers = {**self.headers, 'Content-Type': ColumnarBatch.CONTENT_TYPE}
+                if self.content_encoding and raw_bytes >= self.COMPRESS_MIN_BYTES:
+                    body = self._compress(body)
+                    headers['Content-Encoding'] = self.content_encoding
+            elif self._should_stream(data):
+                body = stream = NdjsonBody(data, self.content_encoding)
+                headers = {**self.headers, 'Content-Type': NdjsonBody.CONTENT_TYPE}
+                if self.content_encoding:
+                    headers['Content-Encoding'] = self.content_encoding
+            else:
+                body = encode_json(data)
+                raw_bytes = len(body)
+                if raw_bytes > self.MAX_REQUEST_BYTES:
+                    status = 413
+                    raise ValueError(f"Request body of {raw_bytes} bytes exceeds the server limit")
+                headers = self.headers
+                if self.content_encoding and raw_bytes >= self.COMPRESS_MIN_BYTES:
+                    body = self._compress(body)
+                    headers = {**self.headers, 'Content-Encoding': self.content_encoding}
+            serialized = time.perf_counter()
+            response = self.session.post(
+                url,
+                data=body,
+                headers=headers,
+                timeout=60
+            )
+            finished = time.perf_counter()
+            
+            if stream:
+                # Encoding is interleaved with the upload; split its time out
+                serialize_seconds = serialized - started + stream.encode_seconds
+                elapsed = finished - serialized - stream.encode_seconds
+                raw_bytes = stream.raw_bytes
+                wire_bytes = stream.wire_bytes
+            else:
+                serialize_seconds = serialized - started
+                elapsed = finished - serialized
+                wire_bytes = len(body)
+            self.metrics.observe('serialize_seconds', serialize_seconds, endpoint=endpoint)
+            self.metrics.inc('upload_json_bytes_total', raw_bytes, endpoint=endpoint)
+            self.metrics.inc('upload_wire_bytes_total', wire_bytes, endpoint=endpoint)
+            with self._timings_lock:
+                self.timings['serialize'] += serialize_seconds
+                self.timings['upload'] += elapsed
+            status = response.status_code
+            if status >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            self.metrics.observe('upload_seconds', elapsed, endpoint=endpoint)
+            self.metrics.inc('upload_retries_total', retry_count(response), endpoint=endpoint)
+            self.metrics.inc('upload_response_bytes_total', len(response.content), endpoint=endpoint)
+            response.raise_for_status()
+            self.metrics.inc('upload_batches_total', endpoint=endpoint, status='ok')
+            self.metrics.inc('upload_records_total', len(data) if isinstance(data, list) else 1,
+                             endpoint=endpoint)
+            return {
+                'success': True,
+                'response': response.json() if response.text else {},
+                'status': status,
+                'bytes': raw_bytes,
+                'elapsed': elapsed
+            }
+        except Exception as e:
+            if isinstance(e, (requests.ConnectionError, requests.Timeout)):
+                self.breaker.record_failure()
+            if stream:
+                raw_bytes = stream.raw_bytes
+            self.metrics.inc('upload_batches_total', endpoint=endpoint, status='failed')
+            logger.error(f"Server sync failed for {endpoint}: {e}")
+            return {
+                'success': False,
+                'error': str(e),
+                'status': status,
+                'bytes': raw_bytes,
+                'timeout': isinstance(e, requests.exceptions.Timeout)
+            }
+    
+    def _should_stream(self, data) -> bool:
+        """Whether a batch is large enough to upload as an NDJSON stream"""
+        return (self.stream_min_records is not None and isinstance(data, list)
+                and len(data) >= self.stream_min_records)
+    
+    def batch_send(self, endpoint: str, data: Iterable[Dict], batch_size: int = 100,
+                   on_batch: Optional[Callable[[List[Dict], bool], None]] = None,
+                   max_in_flight: int = 1) -> Dict:
+        """Send data in batches, consuming the records lazily.
+        
+        Unchanged records are skipped and reported to ``on_batch`` as
+        acknowledged. Up to ``max_in_flight`` batches are uploaded at once
+        and completed in order.
+        """
+        total = 0
+        cancelled = False
+        unavailable = False
+        success_count = 0
+        skipped = 0
+        hashes = {}
+        batch = []
+        in_flight = deque()
+        executor = ThreadPoolExecutor(max_workers=max_in_flight) if max_in_flight > 1 else None
+        sizer = BatchSizer(batch_size, self.batch_byte_budget, self.batch_latency_budget,
+                           adaptive=self.adaptive_batching)
+        
+        try:
+            records = iter(data)
+            while True:
+                if self.cancel_event.is_set():
+                    cancelled = True
+                    break
+                if self.breaker.is_open:
+                    unavailable = True
+                    break
+                try:
+                    chunk = list(islice(records, sizer.size))
+                except BaseException:
+                    self._drain(endpoint, in_flight, on_batch, sizer)
+                    raise
+                if not chunk:
+                    break
+                total += len(chunk)
+                
+                if self.change_store:
+                    chunk, unchanged, chunk_hashes = self.change_store.filter_changed(endpoint, chunk)
+                    skipped += len(unchanged)
+                    self.metrics.inc('records_skipped_total', len(unchanged), endpoint=endpoint)
+                    hashes.update(chunk_hashes)
+                    if unchanged and self.outbox:
+                        self.outbox.supersede(endpoint, {ChangeStore.record_guid(r) for r in unchanged})
+                    if unchanged and on_batch:
+                        on_batch(unchanged, True)
+                
+                batch.extend(chunk)
+                while len(batch) >= sizer.size:
+                    size = sizer.size
+                    in_flight.append(self._submit_batch(executor, endpoint, batch[:size], hashes))
+                    batch = batch[size:]
+                    while len(in_flight) >= max_in_flight:
+                        success_count += self._complete_batch(endpoint, *in_flight.popleft(), on_batch, sizer)
+            
+            if batch and not (cancelled or unavailable):
+                in_flight.append(self._submit_batch(executor, endpoint, batch, hashes))
+            while in_flight:
+                success_count += self._complete_batch(endpoint, *in_flight.popleft(), on_batch, sizer)
+        finally:
+            if executor:
+                executor.shutdown(wait=True)
+        
+        if cancelled:
+            raise SyncCancelled(f"Upload to {endpoint} stopped after {success_count} records")
+        if unavailable:
+            raise EndpointUnavailable(f"Upload to {endpoint} stopped after {success_count} records: "
+                                      f"{self.breaker.name} is unavailable",
+                                      self.breaker.name, self.breaker.retry_at())
+        
+        return {
+            'total': total,
+            'success': success_count,
+            'skipped': skipped,
+            'failed': total - success_count - skipped
+        }
+    
+    def _drain(self, endpoint: str, in_flight: deque,
+               on_batch: Optional[Callable[[List[Dict], bool], None]], sizer: 'BatchSizer'):
+        """Complete the batches in flight when reading records failed"""
+        while in_flight:
+            try:
+                self._complete_batch(endpoint, *in_flight.popleft(), on_batch, sizer)
+            except Exception as e:
+                logger.error(f"Upload to {endpoint} failed while stopping: {e}")
+    
+    def replay_outbox(self) -> Dict:
+        """Resend queued batches, stopping at the first retryable failure"""
+        replayed = 0
+        if not self.outbox:
+            return {'replayed': 0, 'pending': 0}
+        
+        for batch_id, endpoint in self.outbox.due():
+            if self.cancel_event.is_set():
+                break
+            batch = self.outbox.load(batch_id)
+            result = self.send_data(endpoint, batch)
+            if not result['success']:
+                self.outbox.mark_failed(batch_id, result.get('error', ''), result.get('status'))
+                if Outbox.is_permanent(result.get('status')):
+                    continue
+                break
+            self.outbox.remove(batch_id)
+            replayed += 1
+        
+        return {'replayed': replayed, 'pending': self.outbox.pending()}
+    
+    def _submit_batch(self, executor: Optional[ThreadPoolExecutor], endpoint: str,
+                      batch: List[Dict], hashes: Dict[str, bytes]) -> Tuple[List[Dict], Dict[str, bytes], Optional[int], Future]:
+        """Start uploading one batch, on the executor if there is one"""
+        batch_hashes = {}
+        if self.change_store:
+            for record in batch:
+                guid = ChangeStore.record_guid(record)
+                if guid in hashes:
+                    batch_hashes[guid] = hashes.pop(guid)
+        
+        outbox_id = self._queue(endpoint, batch)
+        
+        if executor:
+            future = executor.submit(self.send_data, endpoint, batch)
+        else:
+            future = Future()
+            future.set_result(self.send_data(endpoint, batch))
+        return batch, batch_hashes, outbox_id, future
+    
+    def _complete_batch(self, endpoint: str, batch: List[Dict], batch_hashes: Dict[str, bytes],
+                        outbox_id: Optional[int], future: Future,
+                        on_batch: Optional[Callable[[List[Dict], bool], None]],
+                        sizer: Optional['BatchSizer'] = None) -> int:
+        """Wait for one batch and return the number of acknowledged records"""
+        result = future.result()
+        if sizer:
+            sizer.observe(len(batch), result)
+        
+        if self._rejected_as_too_large(result) and len(batch) > 1:
+            if outbox_id is not None:
+                self.outbox.remove(outbox_id)
+            parts = self._send_split(endpoint, batch, sizer)
+        else:
+            self._settle_outbox(outbox_id, result)
+            parts = [(batch, result['success'])]
+        
+        acked = 0
+        for part, success in parts:
+            if success:
+                acked += len(part)
+                guids = {ChangeStore.record_guid(record) for record in part}
+                if self.outbox:
+                    self.outbox.supersede(endpoint, guids)
+                if self.change_store:
+                    self.change_store.commit(endpoint, {
+                        guid: h for guid, h in batch_hashes.items() if guid in guids
+                    })
+            if on_batch:
+                on_batch(part, success)
+        return acked
+    
+    def _send_split(self, endpoint: str, batch: List[Dict],
+                    sizer: Optional['BatchSizer']) -> List[Tuple[List[Dict], bool]]:
+        """Resend a batch rejected as too large in halves until each part fits"""
+        self.metrics.inc('upload_splits_total', endpoint=endpoint)
+        half = len(batch) // 2
+        parts = []
+        for part in (batch[:half], batch[half:]):
+            outbox_id = self._queue(endpoint, part)
+            result = self.send_data(endpoint, part)
+            if sizer:
+                sizer.observe(len(part), result)
+            if self._rejected_as_too_large(result) and len(part) > 1:
+                if outbox_id is not None:
+                    self.outbox.remove(outbox_id)
+                parts.extend(self._send_split(endpoint, part, sizer))
+                continue
+            self._settle_outbox(outbox_id, result)
+            parts.append((part, result['success']))
+        return parts
+    
+    @staticmethod
+    def _rejected_as_too_large(result: Dict) -> bool:
+        """Whether a failed upload should be retried as smaller batches"""
+        return not result['success'] and (result.get('status') == 413 or result.get('timeout', False))
+    
+    def _queue(self, endpoint: str, batch: List[Dict]) -> Optional[int]:
+        """Copy a batch to the outbox, unless it is sent as an NDJSON stream"""
+        if not self.outbox or (not self.columnar and self._should_stream(batch)):
+            return None
+        return self.outbox.add(endpoint, batch)
+    
+    def _settle_outbox(self, outbox_id: Optional[int], result: Dict):
+        """Remove or reschedule an outbox entry after an upload"""
+        if outbox_id is None:
+            return
+        if result['success']:
+            self.outbox.remove(outbox_id)
+        else:
+            self.outbox.mark_failed(outbox_id, result.get('error', ''), result.get('status'))
+
+
+class WatermarkStore:
+    """Persisted AlterID watermarks per company and collection, shared by a run"""
+    
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or ConfigManager.CONFIG_DIR / "watermarks.json"
+        self.data = self._load()
+        self.lock = threading.Lock()
+    
+    def _load(self) -> Dict:
+        """Load watermarks from disk"""
+        if self.path.exists():
+            try:
+                with open(self.path, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                logger.error(f"Failed to load watermarks: {e}")
+        return {}
+    
+    def get(self, company: str, collection: str) -> int:
+        """Get the highest acknowledged AlterID"""
+        return int(self.data.get(company, {}).get(collection, 0))
+    
+    def advance(self, company: str, collection: str, alter_id: int):
+        """Move a watermark forward and persist it"""
+        with self.lock:
+            if alter_id <= self.get(company, collection):
+                return
+            self.data.setdefault(company, {})[collection] = alter_id
+            try:
+                tmp_path = self.path.with_suffix('.tmp')
+                with open(tmp_path, 'w') as f:
+                    json.dump(self.data, f, indent=4)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                logger.error(f"Failed to save watermarks: {e}")
+
+
+class CheckpointStore:
+    """Persisted resume points for long exports, per company and collection"""
+    
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or ConfigManager.CONFIG_DIR / "checkpoints.json"
+        self.data = self._load()
+        self.lock = threading.Lock()
+    
+    def _load(self) -> Dict:
+        """Load checkpoints from disk"""
+        if self.path.exists():
+            try:
+                with open(self.path, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                logger.error(f"Failed to load checkpoints: {e}")
+        return {}
+    
+    def get(self, company: str, collection: str) -> Optional[Dict]:
+        """Get the checkpoint of an unfinished export"""
+        with self.lock:
+            return self.data.get(company, {}).get(collection)
+    
+    def save(self, company: str, collection: str, checkpoint: Dict):
+        """Record progress of an export"""
+        with self.lock:
+            self.data.setdefault(company, {})[collection] = checkpoint
+            self._write()
+    
+    def clear(self, company: str, collection: str):
+        """Drop the checkpoint of a finished export"""
+        with self.lock:
+            if self.data.get(company, {}).pop(collection, None) is None:
+                return
+            if not self.data[company]:
+                del self.data[company]
+            self._write()
+    
+    def _write(self):
+        try:
+            tmp_path = self.path.with_suffix('.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump(self.data, f, indent=4)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Failed to save checkpoints: {e}")
+
+
+class MetricsStore:
+    """Rolling metrics.json history of runs, plus totals for Prometheus"""
+    
+    PREFIX = 'tally_sync_'
+    
+    def __init__(self, path: Optional[Path] = None, history: int = 20):
+        self.path = path or ConfigManager.CONFIG_DIR / "metrics.json"
+        self.history = max(1, history)
+        self.totals = SyncMetrics()
+        self.last_run: Optional[Dict] = None
+        self.lock = threading.Lock()
+    
+    def load(self) -> List[Dict]:
+        """Recorded runs, oldest first"""
+        if self.path.exists():
+            try:
+                with open(self.path, 'r') as f:
+                    return json.load(f).get('runs', [])
+            except Exception as e:
+                logger.error(f"Failed to load metrics: {e}")
+        return []
+    
+    def record(self, results: Dict, metrics: SyncMetrics):
+        """Add a finished run and persist the history"""
+        run = {
+            'start_time': results.get('start_time'),
+            'end_time': results.get('end_time'),
+            'success': results.get('success', False),
+            'error': results.get('error'),
+            'items_synced': results.get('items_synced', {}),
+            'stages': results.get('stages', {}),
+            'metrics': metrics.snapshot()
+        }
+        self.totals.merge(metrics)
+        
+        with self.lock:
+            self.last_run = run
+            runs = (self.load() + [run])[-self.history:]
+            try:
+                tmp_path = self.path.with_suffix('.tmp')
+                with open(tmp_path, 'w') as f:
+                    json.dump({'last_run': run, 'runs': runs}, f, indent=2)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                logger.error(f"Failed to save metrics: {e}")
+    
+    def prometheus(self) -> str:
+        """Render totals and last-run gauges in the Prometheus text format"""
+        lines = []
+        
+        def labels_text(labels: Dict) -> str:
+            if not labels:
+                return ''
+            escaped = (f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                       for k, v in labels.items())
+            return '{' + ','.join(escaped) + '}'
+        
+        snapshot = self.totals.snapshot()
+        seen = set()
+        for counter in snapshot['counters']:
+            name = self.PREFIX + counter['name']
+            if name not in seen:
+                lines.append(f"# TYPE {name} counter")
+                seen.add(name)
+            lines.append(f"{name}{labels_text(counter['labels'])} {counter['value']}")
+        
+        for timer in snapshot['timers']:
+            name = self.PREFIX + timer['name']
+            if name not in seen:
+                lines.append(f"# TYPE {name} summary")
+                lines.append(f"# TYPE {name}_max gauge")
+                seen.add(name)
+            labels = labels_text(timer['labels'])
+            lines.append(f"{name}_count{labels} {timer['count']}")
+            lines.append(f"{name}_sum{labels} {timer['sum']}")
+            lines.append(f"{name}_max{labels} {timer['max']}")
+        
+        with self.lock:
+            run = self.last_run
+        if run:
+            prefix = self.PREFIX + 'last_run_'
+            lines.append(f"# TYPE {prefix}success gauge")
+            lines.append(f"{prefix}success {1 if run['success'] else 0}")
+            if run.get('end_time'):
+                lines.append(f"# TYPE {prefix}timestamp_seconds gauge")
+                lines.append(f"{prefix}timestamp_seconds "
+                             f"{datetime.fromisoformat(run['end_time']).timestamp():.0f}")
+            if 'total' in run['stages']:
+                lines.append(f"# TYPE {prefix}duration_seconds gauge")
+                lines.append(f"{prefix}duration_seconds {run['stages']['total']:.3f}")
+            lines.append(f"# TYPE {prefix}records gauge")
+            for name, count in run['items_synced'].items():
+                lines.append(f"{prefix}records{labels_text({'collection': name})} {count}")
+        
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Local HTTP endpoint serving /metrics (Prometheus text) and /metrics.json"""
+    
+    def __init__(self, store: MetricsStore, port: int, host: str = '127.0.0.1'):
+        store_ref = store
+        
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    body = store_ref.prometheus().encode('utf-8')
+                    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+                elif self.path == '/metrics.json':
+                    body = json.dumps({'last_run': store_ref.last_run, 'runs': store_ref.load()}).encode('utf-8')
+                    content_type = 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        self.httpd = http.server.ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+    
+    def start(self):
+        """Serve in a background thread"""
+        self.thread.start()
+        logger.info(f"Metrics endpoint on http://{self.httpd.server_address[0]}:{self.httpd.server_port}/metrics")
+    
+    def stop(self):
+        """Shut the endpoint down"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class LogTail:
+    """Follow a log file, reading only what was appended since the last call"""
+    
+    def __init__(self, path: Path, max_lines: int = 5000, max_read_bytes: int = 1024 * 1024):
+        self.path = Path(path)
+        self.lines = deque(maxlen=max_lines)
+        self.max_read_bytes = max_read_bytes
+        self.offset: Optional[int] = None
+        self._partial = b''
+    
+    def read_new(self) -> Tuple[List[str], bool]:
+        """Complete lines appended since the last read, and whether to redraw from ``lines``"""
+        try:
+            size = self.path.stat().st_size
+        except OSError:
+            return [], False
+        
+        reset = self.offset is None or size < self.offset
+        if reset:
+            self.offset = 0
+        if size - self.offset > self.max_read_bytes:
+            self.offset = size - self.max_read_bytes
+            reset = True
+        if reset:
+            self.lines.clear()
+            self._partial = b''
+        if size == self.offset:
+            return [], reset
+        
+        skip_partial = reset and self.offset > 0
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read(size - self.offset)
+        self.offset += len(data)
+        data = self._partial + data
+        if skip_partial:
+            # Started mid-file; drop the incomplete first line
+            data = data.partition(b'\n')[2]
+        
+        complete, newline, self._partial = data.rpartition(b'\n')
+        if not newline:
+            return [], reset
+        lines = complete.decode('utf-8', errors='replace').splitlines()
+        self.lines.extend(lines)
+        return lines, reset
+
+
+class LogIndex:
+    """On-disk line-offset index (``<log>.idx``) of a log file, searched over an mmap"""
+    
+    def __init__(self, path: Path, index_path: Optional[Path] = None):
+        self.path = Path(path)
+        self.index_path = index_path or self.path.with_suffix('.idx')
+        self.offsets = array('Q', [0])
+        self._load()
+    
+    def _log_size(self) -> int:
+        try:
+            return self.path.stat().st_size
+        except OSError:
+            return 0
+    
+    def _load(self):
+        """Reuse a saved index if it still matches the log"""
+        try:
+            data = self.index_path.read_bytes()
+        except OSError:
+            data = b''
+        offsets = array('Q')
+        offsets.frombytes(data[:len(data) - len(data) % offsets.itemsize])
+        
+        valid = bool(offsets) and offsets[0] == 0 and offsets[-1] <= self._log_size()
+        if valid and offsets[-1] > 0:
+            with open(self.path, 'rb') as f:
+                f.seek(offsets[-1] - 1)
+                valid = f.read(1) == b'\n'
+        if valid:
+            self.offsets = offsets
+        else:
+            self._reset()
+    
+    def _reset(self):
+        self.offsets = array('Q', [0])
+        try:
+            self.index_path.write_bytes(self.offsets.tobytes())
+        except OSError as e:
+            logger.warning(f"Could not write log index: {e}")
+    
+    @property
+    def line_count(self) -> int:
+        """Complete lines covered by the index"""
+        return len(self.offsets) - 1
+    
+    def update(self) -> int:
+        """Index lines appended since the last update and return the line count"""
+        size = self._log_size()
+        if size < self.offsets[-1]:
+            self._reset()
+        if size == self.offsets[-1]:
+            return self.line_count
+        
+        new = array('Q')
+        base = self.offsets[-1]
+        with open(self.path, 'rb') as f:
+            f.seek(base)
+            while base < size:
+                block = f.read(min(1024 * 1024, size - base))
+                if not block:
+                    break
+                pos = block.find(b'\n')
+                while pos != -1:
+                    new.append(base + pos + 1)
+                    pos = block.find(b'\n', pos + 1)
+                base += len(block)
+        
+        if new:
+            self.offsets.extend(new)
+            try:
+                with open(self.index_path, 'ab') as f:
+                    f.write(new.tobytes())
+            except OSError as e:
+                logger.warning(f"Could not write log index: {e}")
+        return self.line_count
+    
+    def line_of(self, offset: int) -> int:
+        """Line number (0-based) containing a byte offset"""
+        return max(0, bisect_right(self.offsets, offset) - 1)
+    
+    def lines(self, start: int, count: int) -> List[str]:
+        """Read ``count`` lines starting at line ``start``"""
+        start = max(0, min(start, self.line_count))
+        end = min(start + count, self.line_count)
+        if end <= start:
+            return []
+        with open(self.path, 'rb') as f:
+            f.seek(self.offsets[start])
+            data = f.read(self.offsets[end] - self.offsets[start])
+        return data.decode('utf-8', errors='replace').splitlines()
+    
+    def search(self, text: str, start_line: int = 0) -> Optional[int]:
+        """Line number of the next case-insensitive match at or after
+        ``start_line``, wrapping around to the top; None without a match"""
+        self.update()
+        end = self.offsets[-1]
+        if not text or end == 0:
+            return None
+        
+        pattern = re.compile(re.escape(text.encode('utf-8')), re.IGNORECASE)
+        start = self.offsets[max(0, min(start_line, self.line_count))]
+        with open(self.path, 'rb') as f, mmap.mmap(f.fileno(), end, access=mmap.ACCESS_READ) as view:
+            match = pattern.search(view, start, end) or pattern.search(view, 0, start)
+            return self.line_of(match.start()) if match else None
+
+
+class AlterIdTracker:
+    """Track which AlterIDs the server has acknowledged during a sync"""
+    
+    def __init__(self, watermark: int):
+        self.watermark = watermark
+        self.max_acked = watermark
+        self.min_failed = None
+    
+    @staticmethod
+    def alter_id(record: Dict) -> Optional[int]:
+        """Read ALTERID from a parsed record"""
+        try:
+            return int(str(record.get('ALTERID', '')).strip())
+        except ValueError:
+            return None
+    
+    def record(self, batch: List[Dict], success: bool):
+        """batch_send callback"""
+        ids = [i for i in map(self.alter_id, batch) if i is not None]
+        if not ids:
+            return
+        if success:
+            self.max_acked = max(self.max_acked, max(ids))
+        else:
+            lowest = min(ids)
+            self.min_failed = lowest if self.min_failed is None else min(self.min_failed, lowest)
+    
+    def new_watermark(self) -> int:
+        """Highest AlterID below which every record was acknowledged"""
+        if self.min_failed is None:
+            return self.max_acked
+        return max(self.watermark, min(self.max_acked, self.min_failed - 1))
+
+
+class WindowTracker:
+    """Track which voucher date windows the server has fully acknowledged.
+    
+    ``on_complete`` is called for each window once it and every earlier
+    window are acknowledged.
+    """
+    
+    def __init__(self, on_complete: Optional[Callable[[str, str, 'WindowTracker'], None]] = None):
+        self.on_complete = on_complete
+        self.windows: List[List] = []
+        self.starts: List[str] = []
+        self.completed = 0
+        self.acked_batches = 0
+        self.acked_records = 0
+        self.lock = threading.Lock()
+    
+    @staticmethod
+    def record_date(record: Dict) -> str:
+        """Read DATE (YYYYMMDD) from a parsed record"""
+        value = record.get('DATE')
+        if isinstance(value, dict):
+            value = value.get('_text')
+        return str(value or '').strip()
+    
+    def add_window(self, start: str, end: str, count: int):
+        """get_vouchers_chunked callback"""
+        with self.lock:
+            self.windows.append([start, end, count, False])
+            self.starts.append(start)
+        self._advance()
+    
+    def record(self, batch: List[Dict], success: bool):
+        """batch_send callback"""
+        with self.lock:
+            for record in batch:
+                date = self.record_date(record)
+                index = bisect_right(self.starts, date) - 1
+                if index < 0 or date > self.windows[index][1]:
+                    continue
+                if success:
+                    self.windows[index][2] -= 1
+                else:
+                    self.windows[index][3] = True
+            if success:
+                self.acked_batches += 1
+                self.acked_records += len(batch)
+        self._advance()
+    
+    def _advance(self):
+        """Report the newest window completing an unbroken acknowledged run"""
+        done = None
+        with self.lock:
+            while self.completed < len(self.windows):
+                start, end, outstanding, failed = self.windows[self.completed]
+                if outstanding > 0 or failed:
+                    break
+                done = (start, end)
+                self.completed += 1
+        if done and self.on_complete:
+            self.on_complete(done[0], done[1], self)
+
+
+class SyncPipeline:
+    """Overlap Tally fetches with server uploads.
+    
+    Each job is a dict with a 'name', a 'fetch' callable returning records
+    and an 'upload' callable consuming them.
+    """
+    
+    _END = object()
+    
+    def __init__(self, queue_size: int = 8, chunk_size: int = 100,
+                 cancel_event: Optional[threading.Event] = None):
+        self.queue = queue.Queue(maxsize=max(1, queue_size))
+        self.chunk_size = max(1, chunk_size)
+        self.stop_event = threading.Event()
+        self.cancel_event = cancel_event or threading.Event()
+        self.timings = {'fetch_blocked': 0.0, 'upload_idle': 0.0}
+    
+    def run(self, jobs: List[Dict], on_start: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """Run all jobs and return their upload results by name"""
+        producer = threading.Thread(target=self._produce, args=(jobs,), daemon=True)
+        producer.start()
+        results = {}
+        try:
+            for index, job in enumerate(jobs):
+                if self.cancel_event.is_set():
+                    raise SyncCancelled(f"Sync stopped before {job['name']}")
+                if on_start:
+                    on_start(job)
+                records = self._records(index)
+                results[job['name']] = job['upload'](records)
+                for _ in records:
+                    pass
+        finally:
+            self.stop_event.set()
+            producer.join()
+        return results
+    
+    def _produce(self, jobs: List[Dict]):
+        """Fetch stage: push record chunks for each job onto the queue"""
+        for index, job in enumerate(jobs):
+            records = None
+            try:
+                chunk = []
+                records = job['fetch']()
+                for record in records:
+                    if self.stop_event.is_set():
+                        return
+                    chunk.append(record)
+                    if len(chunk) >= self.chunk_size:
+                        if not self._put((index, chunk)):
+                            return
+                        chunk = []
+                if chunk and not self._put((index, chunk)):
+                    return
+                if not self._put((index, self._END)):
+                    return
+            except Exception as e:
+                self._put((index, e))
+                return
+            finally:
+                if hasattr(records, 'close'):
+                    records.close()
+    
+    def _put(self, item) -> bool:
+        """Queue an item, giving up if the pipeline is stopped"""
+        started = time.perf_counter()
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    self.queue.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        finally:
+            self.timings['fetch_blocked'] += time.perf_counter() - started
+    
+    def _records(self, index: int) -> Iterator[Dict]:
+        """Upload stage: yield the records queued for one job"""
+        while True:
+            started = time.perf_counter()
+            item_index, item = self.queue.get()
+            self.timings['upload_idle'] += time.perf_counter() - started
+            
+            if item_index != index:
+                raise RuntimeError(f"Pipeline out of order: got job {item_index}, expected {index}")
+            if item is self._END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield from item
+
+
+class SyncRunner:
+    """Run one sync pass over the enabled collections, for the tray app and the CLI"""
+    
+    def __init__(self, config: Dict, progress: Optional[Callable[[str], None]] = None,
+                 metrics_store: Optional[MetricsStore] = None,
+                 cancel_event: Optional[threading.Event] = None,
+                 probe_now: bool = False):
+        self.config = config
+        self.probe_now = probe_now
+        self.progress = progress or logger.info
+        self.cancel_event = cancel_event or threading.Event()
+        if metrics_store is None and config.get('metrics_enabled', True):
+            metrics_store = MetricsStore(history=config.get('metrics_history', 20))
+        self.metrics_store = metrics_store
+        self.metrics = SyncMetrics()
+        self.governor = TallyGovernor(
+            config.get('tally_load_mode', 'adaptive'),
+            duty_cycle=config.get('tally_duty_cycle', 0.8),
+            min_gap=config.get('tally_min_request_gap', 0.2),
+            slow_factor=config.get('tally_slow_factor', 3.0),
+            idle_seconds=config.get('tally_idle_seconds', 300),
+            business_hours=config.get('tally_business_hours', [['09:00', '19:00']]),
+            metrics=self.metrics,
+            cancel_event=self.cancel_event
+        )
+        breaker_settings = {
+            'failure_threshold': config.get('breaker_failure_threshold', 3),
+            'reset_seconds': config.get('breaker_reset_seconds', 60),
+            'max_reset_seconds': config.get('breaker_max_reset_seconds', 900)
+        }
+        self.tally_breaker = CircuitBreaker.for_endpoint(
+            f"Tally at {config.get('tally_host')}:{config.get('tally_port')}", **breaker_settings)
+        self.server_breaker = CircuitBreaker.for_endpoint(
+            f"Server at {str(config.get('server_url', '')).rstrip('/')}", **breaker_settings)
+    
+    def cancel(self):
+        """Ask a running sync to stop at its next cancellation point"""
+        self.cancel_event.set()
+    
+    def run(self) -> Dict:
+        """Execute sync operation and return the results summary"""
+        self.metrics = SyncMetrics()
+        self.governor.metrics = self.metrics
+        results = self._run()
+        results['metrics'] = self.metrics.snapshot()
+        if self.metrics_store:
+            self.metrics_store.record(results, self.metrics)
+        return results
+    
+    def _run(self) -> Dict:
+        """Sync every company; failures are reported in the results"""
+        try:
+            self.progress("🔄 Starting sync...")
+            started = time.perf_counter()
+            
+            retries = self.config.get('http_retries', 3)
+            concurrency = max(1, self.config.get('company_concurrency', 4))
+            tally_session = create_http_session(2, retries)
+            tally_lock = threading.Lock()
+            server_session = create_http_session(
+                max(self.config.get('http_pool_size', 10),
+                    self.config.get('upload_concurrency', 4) * concurrency),
+                retries
+            )
+            
+            change_store = (ChangeStore(server_url=self.config['server_url'])
+                            if self.config.get('skip_unchanged', True) else None)
+            outbox = Outbox() if self.config.get('outbox_enabled', True) else None
+            server = self._create_server(server_session, change_store, outbox)
+            
+            probe_timeout = self.config.get('health_probe_timeout', 5)
+            health = self._preflight(self.server_breaker, lambda: server.check_health(probe_timeout))
+            tally_probe = TallyPrimeConnector(self.config['tally_host'], self.config['tally_port'],
+                                              session=tally_session)
+            self._preflight(self.tally_breaker, lambda: tally_probe.check_health(probe_timeout))
+            server.negotiate(self.config.get('upload_compression', 'auto'),
+                             self.config.get('upload_streaming', 'auto'),
+                             health=health,
+                             upload_format=self.config.get('upload_format', 'auto'))
+            
+            results = {
+                'start_time': datetime.now().isoformat(),
+                'success': True,
+                'items_synced': {}
+            }
+            
+            if outbox and outbox.pending():
+                self.progress(f"📤 Replaying {outbox.pending()} queued batches...")
+                results['outbox'] = server.replay_outbox()
+            
+            companies = self._companies(tally_session, tally_lock)
+            watermarks = WatermarkStore() if self.config.get('incremental_sync', True) else None
+            checkpoints = CheckpointStore() if self.config.get('checkpoint_resume', True) else None
+            
+            if len(companies) == 1:
+                company_results = {companies[0]: self._sync_company(
+                    companies[0], tally_session, tally_lock, server, watermarks, checkpoints)}
+            else:
+                self.progress(f"🏢 Syncing {len(companies)} companies...")
+                with ThreadPoolExecutor(max_workers=min(concurrency, len(companies))) as executor:
+                    futures = {
+                        company: executor.submit(self._sync_company_isolated, company, tally_session,
+                                                 tally_lock, server_session, server, watermarks,
+                                                 checkpoints)
+                        for company in companies
+                    }
+                    company_results = {company: future.result() for company, future in futures.items()}
+                results['companies'] = company_results
+            
+            self._merge_company_results(results, company_results)
+            
+            if change_store:
+                change_store.close()
+            if outbox:
+                results.setdefault('outbox', {})['pending'] = outbox.pending()
+                outbox.close()
+            
+            results['stages']['total'] = time.perf_counter() - started
+            self.progress("⏱️ Stage timings: " + ", ".join(
+                f"{stage} {seconds:.1f}s" for stage, seconds in results['stages'].items()))
+            
+            results['connections'] = {
+                'tally': session_stats(tally_session),
+                'server': session_stats(server_session)
+            }
+            logger.info(f"Connection reuse: {results['connections']}")
+            tally_session.close()
+            server_session.close()
+            
+            results['end_time'] = datetime.now().isoformat()
+            if results['success']:
+                self.progress("✅ Sync completed successfully!")
+            elif results.get('cancelled'):
+                self.progress("⏹️ Sync stopped; the next sync resumes from the last checkpoint")
+            else:
+                self.progress(f"❌ Sync failed: {results['error']}")
+            return results
+            
+        except EndpointUnavailable as e:
+            logger.warning(f"Sync skipped: {e}")
+            self.progress(f"⛔ {e}")
+            return {
+                'success': False,
+                'error': str(e),
+                'unavailable': e.endpoint,
+                'retry_at': e.retry_at.isoformat() if e.retry_at else None,
+                'end_time': datetime.now().isoformat()
+            }
+        except Exception as e:
+            logger.error(f"Sync failed: {e}")
+            self.progress(f"❌ Sync failed: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e),
+                'end_time': datetime.now().isoformat()
+            }
+    
+    def _preflight(self, breaker: CircuitBreaker, probe: Callable):
+        """Run a cheap health probe through ``breaker`` and return its result"""
+        if self.probe_now:
+            breaker.half_open()
+        breaker.check()
+        try:
+            result = probe()
+        except Exception as e:
+            breaker.record_failure()
+            raise EndpointUnavailable(f"{breaker.name} is unavailable: {e}", breaker.name,
+                                      breaker.retry_at())
+        breaker.record_success()
+        return result
+    
+    def _companies(self, tally_session: requests.Session, tally_lock: threading.Lock) -> List[Optional[str]]:
+        """Companies to sync this run; None means Tally's current company"""
+        companies = self.config.get('companies') or []
+        
+        if companies == 'all':
+            tally = TallyPrimeConnector(self.config['tally_host'], self.config['tally_port'],
+                                        session=tally_session, request_lock=tally_lock,
+                                        metrics=self.metrics, cancel_event=self.cancel_event,
+                                        governor=self.governor, breaker=self.tally_breaker)
+            companies = [company.get('NAME') for company in tally.get_company_list()]
+            companies = [name for name in companies if name]
+            if not companies:
+                raise RuntimeError("No companies are loaded in Tally")
+        elif isinstance(companies, str):
+            companies = [companies]
+        
+        return list(dict.fromkeys(companies)) or [self.config.get('company_name') or None]
+    
+    def _create_server(self, session: requests.Session, change_store: Optional[ChangeStore],
+                       outbox: Optional[Outbox]) -> ServerSync:
+        """Build a ServerSync on a shared HTTP session"""
+        return ServerSync(
+            self.config['server_url'],
+            self.config.get('api_key'),
+            change_store=change_store,
+            retries=self.config.get('http_retries', 3),
+            outbox=outbox,
+            adaptive_batching=self.config.get('adaptive_batching', True),
+            batch_byte_budget=self.config.get('batch_byte_budget', 4 * 1024 * 1024),
+            batch_latency_budget=self.config.get('batch_latency_budget', 10),
+            session=session,
+            metrics=self.metrics,
+            cancel_event=self.cancel_event,
+            breaker=self.server_breaker
+        )
+    
+    def _sync_company(self, company: Optional[str], tally_session: requests.Session,
+                      tally_lock: threading.Lock, server: ServerSync,
+                      watermarks: Optional[WatermarkStore], checkpoints: Optional[CheckpointStore],
+                      label_prefix: str = '') -> Dict:
+        """Fetch and upload the enabled collections of one company"""
+        tally = TallyPrimeConnector(
+            self.config['tally_host'],
+            self.config['tally_port'],
+            company,
+            streaming=self.config.get('stream_parse', True),
+            compact_records=self.config.get('record_model', 'compact') == 'compact',
+            projected=self._projected_collections(),
+            session=tally_session,
+            request_lock=tally_lock,
+            metrics=self.metrics,
+            cancel_event=self.cancel_event,
+            governor=self.governor,
+            breaker=self.tally_breaker
+        )
+        pipeline = SyncPipeline(
+            queue_size=self.config.get('pipeline_queue_size', 8),
+            chunk_size=self.config.get('batch_size', 100),
+            cancel_event=self.cancel_event
+        )
+        result = {'success': True, 'items_synced': {}}
+        
+        try:
+            identity = company
+            if company is None and (watermarks or checkpoints or server.change_store):
+                identity = tally.resolve_company()
+                if identity is None:
+                    logger.warning("Could not resolve the open Tally company, "
+                                   "syncing without watermarks, checkpoints or change detection")
+                    watermarks = checkpoints = server.change_store = None
+            if server.change_store:
+                server.change_store.company = identity
+            jobs = self._build_jobs(tally, server, identity, watermarks, checkpoints)
+            job_results = pipeline.run(jobs, on_start=lambda job: self.progress(label_prefix + job['label']))
+            
+            for name, job_result in job_results.items():
+                if name == 'company':
+                    result['items_synced']['company'] = 1 if job_result['success'] else 0
+                else:
+                    self._record_result(result, name, job_result)
+        except SyncCancelled as e:
+            logger.info(f"Sync stopped for {company or 'current company'}: {e}")
+            result['success'] = False
+            result['cancelled'] = True
+            result['error'] = "Sync cancelled"
+        except EndpointUnavailable as e:
+            logger.warning(f"Sync stopped for {company or 'current company'}: {e}")
+            result['success'] = False
+            result['error'] = str(e)
+            result['unavailable'] = e.endpoint
+            result['retry_at'] = e.retry_at.isoformat() if e.retry_at else None
+        except Exception as e:
+            logger.error(f"Sync failed for {company or 'current company'}: {e}")
+            result['success'] = False
+            result['error'] = str(e)
+        
+        result['stages'] = {**tally.timings, **server.timings, **pipeline.timings}
+        return result
+    
+    def _sync_company_isolated(self, company: str, tally_session: requests.Session,
+                               tally_lock: threading.Lock, server_session: requests.Session,
+                               negotiated: ServerSync, watermarks: Optional[WatermarkStore],
+                               checkpoints: Optional[CheckpointStore]) -> Dict:
+        """Sync one company on a worker thread with its own SQLite stores"""
+        change_store = (ChangeStore(server_url=self.config['server_url'])
+                        if self.config.get('skip_unchanged', True) else None)
+        outbox = Outbox() if self.config.get('outbox_enabled', True) else None
+        server = self._create_server(server_session, change_store, outbox)
+        server.content_encoding = negotiated.content_encoding
+        server.stream_min_records = negotiated.stream_min_records
+        server.columnar = negotiated.columnar
+        try:
+            return self._sync_company(company, tally_session, tally_lock, server, watermarks,
+                                      checkpoints, label_prefix=f"[{company}] ")
+        finally:
+            if change_store:
+                change_store.close()
+            if outbox:
+                outbox.close()
+    
+    def _merge_company_results(self, results: Dict, company_results: Dict[str, Dict]):
+        """Fold per-company results into the run summary"""
+        single = len(company_results) == 1
+        stages = {}
+        errors = []
+        
+        for company, result in company_results.items():
+            for name, count in result['items_synced'].items():
+                results['items_synced'][name if single else f"{company}/{name}"] = count
+            for stage, seconds in result['stages'].items():
+                stages[stage] = stages.get(stage, 0.0) + seconds
+            if not result['success']:
+                errors.append(result['error'] if single else f"{company}: {result['error']}")
+            if result.get('cancelled'):
+                results['cancelled'] = True
+            if result.get('unavailable') and not results.get('unavailable'):
+                results['unavailable'] = result['unavailable']
+                results['retry_at'] = result.get('retry_at')
+        
+        results['stages'] = stages
+        if errors:
+            results['success'] = False
+            results['error'] = "; ".join(errors)
+    
+    def _build_jobs(self, tally: TallyPrimeConnector, server: ServerSync, company: Optional[str],
+                    watermarks: Optional[WatermarkStore],
+                    checkpoints: Optional[CheckpointStore] = None) -> List[Dict]:
+        """Build the pipeline jobs for the enabled collections"""
+        jobs = []
+        
+        if self.config.get('sync_company', True):
+            jobs.append({
+                'name': 'company',
+                'label': "📊 Syncing company info...",
+                'fetch': lambda: [tally.get_company_info()],
+                'upload': lambda records: server.send_data('company', next(iter(records)))
+            })
+        
+        if self.config.get('sync_ledgers', True):
+            jobs.append(self._master_job('ledgers', "📒 Syncing ledgers...", 'ledgers',
+                                         tally.get_ledgers, server, company, watermarks))
+        
+        if self.config.get('sync_stock', True):
+            jobs.append(self._master_job('stock_items', "📦 Syncing stock items...", 'stock-items',
+                                         tally.get_stock_items, server, company, watermarks))
+        
+        if self.config.get('sync_vouchers', True):
+            jobs.append(self._voucher_job(tally, server, company, checkpoints))
+        
+        return jobs
+    
+    def _voucher_job(self, tally: TallyPrimeConnector, server: ServerSync, company: Optional[str],
+                     checkpoints: Optional[CheckpointStore]) -> Dict:
+        """Build the voucher job, resuming from a checkpoint when there is one"""
+        batch_size = self.config.get('batch_size', 100)
+        max_in_flight = self._upload_window('vouchers')
+        from_date = self.config.get('from_date', 
+            (datetime.now() - timedelta(days=1)).strftime('%Y%m%d')).replace('-', '')
+        to_date = self.config.get('to_date', 
+            datetime.now().strftime('%Y%m%d')).replace('-', '')
+        
+        if not self.config.get('voucher_chunking', True):
+            return {
+                'name': 'vouchers',
+                'label': "🧾 Syncing vouchers...",
+                'fetch': lambda: tally.get_vouchers(from_date, to_date),
+                'upload': lambda records: server.batch_send(
+                    'vouchers', records, batch_size, max_in_flight=max_in_flight)
+            }
+        
+        start_date = from_date
+        label = "🧾 Syncing vouchers..."
+        checkpoint = checkpoints.get(company, 'vouchers') if checkpoints else None
+        if (checkpoint and checkpoint.get('from_date') == from_date
+                and from_date < checkpoint.get('resume_from', '') <= to_date):
+            start_date = checkpoint['resume_from']
+            label = f"🧾 Resuming vouchers from {start_date}..."
+        
+        def window_done(start: str, end: str, tracker: WindowTracker):
+            checkpoints.save(company, 'vouchers', {
+                'from_date': from_date,
+                'to_date': to_date,
+                'window': [start, end],
+                'resume_from': (datetime.strptime(end, '%Y%m%d') + timedelta(days=1)).strftime('%Y%m%d'),
+                'batches_acked': tracker.acked_batches,
+                'records_acked': tracker.acked_records,
+                'updated': datetime.now().isoformat()
+            })
+        
+        tracker = WindowTracker(window_done if checkpoints else None)
+        
+        def upload(records: Iterable[Dict]) -> Dict:
+            result = server.batch_send('vouchers', records, batch_size,
+                                       on_batch=tracker.record, max_in_flight=max_in_flight)
+            if checkpoints and result['failed'] == 0:
+                checkpoints.clear(company, 'vouchers')
+            return result
+        
+        return {
+            'name': 'vouchers',
+            'label': label,
+            'fetch': lambda: tally.get_vouchers_chunked(
+                start_date, to_date,
+                window=self.config.get('voucher_window', 'week'),
+                adaptive=self.config.get('voucher_window_adaptive', True),
+                on_window=tracker.add_window
+            ),
+            'upload': upload
+        }
+    
+    def _master_job(self, name: str, label: str, endpoint: str, fetch: Callable,
+                    server: ServerSync, company: Optional[str],
+                    watermarks: Optional[WatermarkStore]) -> Dict:
+        """Build a master collection job, incremental by AlterID when enabled"""
+        batch_size = self.config.get('batch_size', 100)
+        max_in_flight = self._upload_window(endpoint)
+        
+        if watermarks is None:
+            return {
+                'name': name,
+                'label': label,
+                'fetch': fetch,
+                'upload': lambda records: server.batch_send(
+                    endpoint, records, batch_size, max_in_flight=max_in_flight)
+            }
+        
+        tracker = AlterIdTracker(watermarks.get(company, endpoint))
+        
+        def upload(records: Iterable[Dict]) -> Dict:
+            result = server.batch_send(endpoint, records, batch_size,
+                                       on_batch=tracker.record, max_in_flight=max_in_flight)
+            watermarks.advance(company, endpoint, tracker.new_watermark())
+            return result
+        
+        return {
+            'name': name,
+            'label': label,
+            'fetch': lambda: fetch(after_alter_id=tracker.watermark),
+            'upload': upload
+        }
+    
+    def _projected_collections(self) -> List[str]:
+        """Tally tags whose exports are limited to the record schema fields"""
+        projection = {'ledgers': True, 'stock_items': True, 'vouchers': True}
+        projection.update(self.config.get('projected_collections', {}))
+        tags = {'ledgers': 'LEDGER', 'stock_items': 'STOCKITEM', 'vouchers': 'VOUCHER'}
+        return [tags[name] for name, enabled in projection.items() if enabled and name in tags]
+    
+    def _upload_window(self, endpoint: str) -> int:
+        """Number of batches allowed in flight for an endpoint"""
+        if endpoint in self.config.get('ordered_endpoints', ['vouchers']):
+            return 1
+        return max(1, self.config.get('upload_concurrency', 4))
+    
+    def _record_result(self, results: Dict, name: str, result: Dict):
+        """Add a batch_send result to the sync summary"""
+        results['items_synced'][name] = result['success']
+        if result.get('skipped'):
+            results['items_synced'][f'{name}_skipped'] = result['skipped']
+
+
+class SyncScheduler:
+    """Decide when each collection is next synced.
+    
+    Overdue runs coalesce, 'quiet_hours' hold runs back, failed or slow runs
+    back off and next runs are jittered by 'schedule_jitter'.
+    """
+    
+    COLLECTION_FLAGS = {
+        'company': 'sync_company',
+        'ledgers': 'sync_ledgers',
+        'stock_items': 'sync_stock',
+        'vouchers': 'sync_vouchers',
+    }
+    COALESCE_SECONDS = 120
+    MAX_BACKOFF = 8
+    
+    def __init__(self, config: Dict, rng: Optional[random.Random] = None):
+        self.rng = rng or random.Random()
+        self.next_due: Dict[str, datetime] = {}
+        self.backoff: Dict[str, float] = {}
+        self.configure(config)
+    
+    def configure(self, config: Dict):
+        """Apply new settings, keeping the current schedule"""
+        self.config = config
+        self.collections = [name for name, flag in self.COLLECTION_FLAGS.items()
+                            if config.get(flag, True)]
+    
+    @classmethod
+    def config_for(cls, config: Dict, collections: Iterable[str]) -> Dict:
+        """Copy of the config that syncs only the given collections"""
+        collections = set(collections)
+        scoped = dict(config)
+        for name, flag in cls.COLLECTION_FLAGS.items():
+            scoped[flag] = config.get(flag, True) and name in collections
+        return scoped
+    
+    def interval(self, collection: str) -> timedelta:
+        """Current interval of a collection, including any backoff"""
+        minutes = (self.config.get('sync_schedule') or {}).get(collection) or self.config.get('sync_interval', 60)
+        return timedelta(minutes=max(1, minutes) * self.backoff.get(collection, 1))
+    
+    def _jitter_seconds(self, collection: str) -> float:
+        return self.interval(collection).total_seconds() * self.config.get('schedule_jitter', 0.1)
+    
+    def start(self, now: Optional[datetime] = None, spread: bool = False):
+        """Make every collection due now, or with ``spread`` at a random
+        point within its jitter span (for unattended starts at boot)"""
+        now = now or datetime.now()
+        for name in self.collections:
+            offset = self.rng.uniform(0, self._jitter_seconds(name)) if spread else 0
+            self.next_due[name] = now + timedelta(seconds=offset)
+    
+    def due(self, now: Optional[datetime] = None) -> List[str]:
+        """Collections to sync now; empty during quiet hours"""
+        now = now or datetime.now()
+        if self._quiet_until(now):
+            return []
+        if not any(self.next_due.get(name, now) <= now for name in self.collections):
+            return []
+        horizon = now + timedelta(seconds=self.COALESCE_SECONDS)
+        return [name for name in self.collections if self.next_due.get(name, now) <= horizon]
+    
+    def completed(self, collections: Iterable[str], results: Dict, now: Optional[datetime] = None):
+        """Schedule the next run of collections that were just synced"""
+        now = now or datetime.now()
+        if results.get('retry_at'):
+            retry_at = max(now, datetime.fromisoformat(results['retry_at']))
+            for name in collections:
+                self.next_due[name] = retry_at
+            logger.info(f"{results.get('unavailable')} unavailable; retrying "
+                        f"{', '.join(collections)} at {retry_at:%H:%M:%S}")
+            return
+        
+        fetch_seconds = results.get('stages', {}).get('fetch', 0.0)
+        slow = fetch_seconds > self.config.get('tally_slow_seconds', 120)
+        failed = not results.get('success') and not results.get('cancelled')
+        
+        for name in collections:
+            if slow or failed:
+                self.backoff[name] = min(self.backoff.get(name, 1) * 2, self.MAX_BACKOFF)
+            else:
+                self.backoff[name] = max(1, self.backoff.get(name, 1) / 2)
+            jitter = self.rng.uniform(-1, 1) * self._jitter_seconds(name)
+            self.next_due[name] = now + self.interval(name) + timedelta(seconds=jitter)
+        
+        if slow or failed:
+            reason = f"Tally fetch took {fetch_seconds:.0f}s" if slow else "sync failed"
+            logger.info(f"Backing off {', '.join(collections)} ({reason}): " + ", ".join(
+                f"{name} every {self.interval(name).total_seconds() / 60:.0f} min" for name in collections))
+    
+    def next_run(self, now: Optional[datetime] = None) -> Optional[datetime]:
+        """When the next run is due, after any quiet hours"""
+        now = now or datetime.now()
+        if not self.collections:
+            return None
+        when = max(now, min(self.next_due.get(name, now) for name in self.collections))
+        for _ in range(len(self.config.get('quiet_hours') or []) + 1):
+            quiet_end = self._quiet_until(when)
+            if not quiet_end:
+                break
+            when = quiet_end
+        return when
+    
+    def seconds_until_next(self, now: Optional[datetime] = None) -> Optional[float]:
+        """Seconds until ``next_run``"""
+        now = now or datetime.now()
+        when = self.next_run(now)
+        return None if when is None else max(0.0, (when - now).total_seconds())
+    
+    def _quiet_until(self, now: datetime) -> Optional[datetime]:
+        """End of the quiet-hours window containing ``now``, if any"""
+        return time_window_end(self.config.get('quiet_hours'), now)
+
+
+class ConfigManager:
+    """Configuration manager"""
+    
+    CONFIG_DIR = Path.home() / "TallySync"
+    CONFIG_FILE = CONFIG_DIR / "config.json"
+    
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> Dict:
+        """Load configuration"""
+        cls.CONFIG_DIR.mkdir(parents=True, exist_ok=True)
+        path = Path(path) if path else cls.CONFIG_FILE
+        
+        if path.exists():
+            try:
+                with open(path, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                logger.error(f"Failed to load config: {e}")
+        
+        return cls.get_default_config()
+    
+    @classmethod
+    def save(cls, config: Dict, path: Optional[Path] = None):
+        """Save configuration"""
+        try:
+            with open(Path(path) if path else cls.CONFIG_FILE, 'w') as f:
+                json.dump(config, f, indent=4)
+        except Exception as e:
+            logger.error(f"Failed to save config: {e}")
+    
+    @classmethod
+    def get_default_config(cls) -> Dict:
+        """Get default configuration"""
+        return {
+            'tally_host': 'localhost',
+            'tally_port': 9000,
+            'server_url': 'https://your-server.com/api',
+            'api_key': '',
+            'company_name': '',
+            'companies': [],
+            'company_concurrency': 4,
+            'metrics_enabled': True,
+            'metrics_history': 20,
+            'metrics_port': 0,
+            'sync_interval': 60,
+            'sync_schedule': {},
+            'quiet_hours': [],
+            'schedule_jitter': 0.1,
+            'tally_slow_seconds': 120,
+            'tally_load_mode': 'adaptive',
+            'tally_duty_cycle': 0.8,
+            'tally_min_request_gap': 0.2,
+            'tally_slow_factor': 3.0,
+            'tally_idle_seconds': 300,
+            'tally_business_hours': [['09:00', '19:00']],
+            'health_probe_timeout': 5,
+            'breaker_failure_threshold': 3,
+            'breaker_reset_seconds': 60,
+            'breaker_max_reset_seconds': 900,
+            'batch_size': 100,
+            'adaptive_batching': True,
+            'batch_byte_budget': 4 * 1024 * 1024,
+            'batch_latency_budget': 10,
+            'stream_parse': True,
+            'record_model': 'compact',
+            'projected_collections': {'ledgers': True, 'stock_items': True, 'vouchers': True},
+            'incremental_sync': True,
+            'skip_unchanged': True,
+            'outbox_enabled': True,
+            'http_pool_size': 10,
+            'http_retries': 3,
+            'upload_concurrency': 4,
+            'ordered_endpoints': ['vouchers'],
+            'upload_compression': 'auto',
+            'upload_streaming': 'auto',
+            'upload_format': 'auto',
+            'pipeline_queue_size': 8,
+            'voucher_chunking': True,
+            'voucher_window': 'week',
+            'voucher_window_adaptive': True,
+            'checkpoint_resume': True,
+            'sync_company': True,
+            'sync_ledgers': True,
+            'sync_stock': True,
+            'sync_vouchers': True,
+            'auto_start': False,
+            'start_minimized': False,
+            'from_date': (datetime.now() - timedelta(days=1)).strftime('%Y%m%d'),
+            'to_date': datetime.now().strftime('%Y%m%d'),
+            'settings_password': ''
+        }
@@ -0,0 +1,70 @@
+import pytest
+
+from tally_sync_core import BatchSizer
+
+
+def ok(nbytes, elapsed):
+    return {'success': True, 'bytes': nbytes, 'elapsed': elapsed}
+
+
+def test_grows_at_most_twofold():
+    sizer = BatchSizer(100, byte_budget=10_000_000, latency_budget=60)
+    sizer.observe(100, ok(1000, 0.1))
+    
+    assert sizer.size == 200
+
+
+def test_shrinks_at_most_by_half():
+    sizer = BatchSizer(1000, byte_budget=1000, latency_budget=60)
+    sizer.observe(1000, ok(10_000_000, 0.1))
+    
+    assert sizer.size == 500
+
+
+def test_settles_on_the_byte_budget():
+    sizer = BatchSizer(1000, byte_budget=600_000, latency_budget=60)
+    sizer.observe(1000, ok(1_000_000, 0.1))
+    
+    assert sizer.size == 600
+
+
+def test_settles_on_the_latency_budget():
+    sizer = BatchSizer(1000, byte_budget=10_000_000, latency_budget=3)
+    sizer.observe(1000, ok(1000, 4))
+    
+    assert sizer.size == 750
+
+
+def test_never_exceeds_max_size():
+    sizer = BatchSizer(BatchSizer.MAX_SIZE, byte_budget=10_000_000, latency_budget=60)
+    sizer.observe(BatchSizer.MAX_SIZE, ok(1000, 0.1))
+    
+    assert sizer.size == BatchSizer.MAX_SIZE
+
+
+@pytest.mark.parametrize('result', [
+    {'success': False, 'status': 413},
+    {'success': False, 'timeout': True},
+])
+def test_too_large_halves_the_failed_batch(result):
+    sizer = BatchSizer(1000, byte_budget=10_000_000, latency_budget=60)
+    sizer.observe(300, result)
+    assert sizer.size == 150
+    
+    sizer.observe(1, result)
+    assert sizer.size == 1
+
+
+def test_other_failures_keep_the_size():
+    sizer = BatchSizer(1000, byte_budget=10_000_000, latency_budget=60)
+    sizer.observe(1000, {'success': False, 'status': 500})
+    
+    assert sizer.size == 1000
+
+
+def test_fixed_size_ignores_results():
+    sizer = BatchSizer(1000, byte_budget=1000, latency_budget=1, adaptive=False)
+    sizer.observe(1000, ok(10_000_000, 30))
+    sizer.observe(1000, {'success': False, 'status': 413})
+    
+    assert sizer.size == 1000
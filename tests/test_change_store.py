@@ -0,0 +1,71 @@
+import sqlite3
+
+import pytest
+
+from tally_sync_core import ChangeStore
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / 'change_store.db'
+
+
+def acknowledge(store, endpoint, records):
+    store.commit(endpoint, {record['GUID']: ChangeStore.record_hash(record) for record in records})
+
+
+def test_unchanged_records_are_split_off(path):
+    store = ChangeStore(path, server_url='https://a.example/api/')
+    store.company = 'Acme'
+    acknowledge(store, 'ledgers', [{'GUID': 'a', 'NAME': 'Cash'}])
+    
+    changed, unchanged, hashes = store.filter_changed(
+        'ledgers', [{'GUID': 'a', 'NAME': 'Cash'}, {'GUID': 'b', 'NAME': 'Bank'}, {'NAME': 'no guid'}])
+    
+    assert unchanged == [{'GUID': 'a', 'NAME': 'Cash'}]
+    assert changed == [{'GUID': 'b', 'NAME': 'Bank'}, {'NAME': 'no guid'}]
+    assert list(hashes) == ['b']
+    store.close()
+
+
+def test_edited_record_counts_as_changed(path):
+    store = ChangeStore(path, server_url='https://a.example/api')
+    acknowledge(store, 'ledgers', [{'GUID': 'a', 'NAME': 'Cash'}])
+    
+    changed, unchanged, _ = store.filter_changed('ledgers', [{'GUID': 'a', 'NAME': 'Petty Cash'}])
+    
+    assert (len(changed), len(unchanged)) == (1, 0)
+    store.close()
+
+
+@pytest.mark.parametrize('server_url, company, endpoint', [
+    ('https://b.example/api', 'Acme', 'ledgers'),
+    ('https://a.example/api', 'Beta', 'ledgers'),
+    ('https://a.example/api', 'Acme', 'stock-items'),
+])
+def test_hashes_are_kept_per_server_company_and_endpoint(path, server_url, company, endpoint):
+    store = ChangeStore(path, server_url='https://a.example/api')
+    store.company = 'Acme'
+    acknowledge(store, 'ledgers', [{'GUID': 'a', 'NAME': 'Cash'}])
+    store.close()
+    
+    other = ChangeStore(path, server_url=server_url)
+    other.company = company
+    changed, unchanged, _ = other.filter_changed(endpoint, [{'GUID': 'a', 'NAME': 'Cash'}])
+    
+    assert (len(changed), len(unchanged)) == (1, 0)
+    other.close()
+
+
+def test_store_without_server_column_starts_afresh(path):
+    conn = sqlite3.connect(str(path))
+    conn.execute("CREATE TABLE record_hashes (endpoint TEXT, guid TEXT, hash BLOB, PRIMARY KEY (endpoint, guid))")
+    conn.execute("INSERT INTO record_hashes VALUES ('ledgers', 'a', x'00')")
+    conn.commit()
+    conn.close()
+    
+    store = ChangeStore(path, server_url='https://a.example/api')
+    acknowledge(store, 'ledgers', [{'GUID': 'a', 'NAME': 'Cash'}])
+    
+    assert store.conn.execute("SELECT COUNT(*) FROM record_hashes").fetchone()[0] == 1
+    store.close()
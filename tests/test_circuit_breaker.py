@@ -0,0 +1,98 @@
+import pytest
+
+import tally_sync_core
+from tally_sync_core import CircuitBreaker, EndpointUnavailable
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(tally_sync_core.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def open_breaker(**settings):
+    breaker = CircuitBreaker('vouchers', **settings)
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    return breaker
+
+
+def test_opens_after_the_threshold(clock):
+    breaker = CircuitBreaker('vouchers', failure_threshold=3)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.check()
+    
+    breaker.record_failure()
+    assert breaker.is_open
+    with pytest.raises(EndpointUnavailable) as excinfo:
+        breaker.check()
+    assert excinfo.value.endpoint == 'vouchers'
+    assert excinfo.value.retry_at is not None
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker('vouchers', failure_threshold=3)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    
+    assert not breaker.is_open
+
+
+def test_half_opens_after_the_reset_wait(clock):
+    breaker = open_breaker(reset_seconds=60)
+    clock[0] += 59
+    assert breaker.is_open
+    
+    clock[0] += 1
+    assert not breaker.is_open
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.check()
+
+
+def test_failed_trial_doubles_the_wait_up_to_the_max(clock):
+    breaker = open_breaker(reset_seconds=60, max_reset_seconds=200)
+    waits = []
+    for _ in range(3):
+        clock[0] += breaker.open_seconds
+        assert not breaker.is_open
+        breaker.record_failure()
+        assert breaker.is_open
+        waits.append(breaker.open_seconds)
+    
+    assert waits == [120, 200, 200]
+
+
+def test_successful_trial_closes_and_resets_the_wait(clock):
+    breaker = open_breaker(reset_seconds=60)
+    clock[0] += 60
+    assert not breaker.is_open
+    breaker.record_failure()
+    clock[0] += 120
+    
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.open_seconds == 60
+    breaker.record_failure()
+    assert not breaker.is_open
+
+
+def test_half_open_lets_a_manual_sync_through(clock):
+    breaker = open_breaker()
+    breaker.half_open()
+    
+    assert not breaker.is_open
+
+
+def test_for_endpoint_shares_one_breaker(monkeypatch):
+    monkeypatch.setattr(CircuitBreaker, '_registry', {})
+    breaker = CircuitBreaker.for_endpoint('ledgers', failure_threshold=2)
+    same = CircuitBreaker.for_endpoint('ledgers', failure_threshold=5)
+    
+    assert same is breaker
+    assert breaker.failure_threshold == 5
+    assert CircuitBreaker.for_endpoint('vouchers') is not breaker
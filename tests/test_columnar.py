@@ -0,0 +1,68 @@
+from decimal import Decimal
+
+import msgpack
+
+from tally_sync_core import ColumnarBatch, LedgerRecord, VoucherRecord
+
+
+def decode(body):
+    """Rows of a columnar batch, read back the way the server does"""
+    batch = msgpack.unpackb(body)
+    strings = batch['strings']
+    rows = [{} for _ in range(batch['count'])]
+    for field, values in batch['columns'].items():
+        for row, value in zip(rows, values):
+            if value is None:
+                continue
+            row[field] = strings[value] if field in batch['dict_columns'] else value
+    return batch, rows
+
+
+def test_dict_rows_round_trip():
+    records = [
+        {'GUID': f'g-{i}', 'VOUCHERTYPENAME': 'Sales' if i % 3 else 'Receipt', 'AMOUNT': i * 10}
+        for i in range(9)
+    ]
+    records[4]['NARRATION'] = 'Paid in cash'
+    
+    batch, rows = decode(ColumnarBatch.encode('vouchers', records))
+    
+    assert rows == records
+    assert batch['collection'] == 'vouchers'
+    assert batch['version'] == ColumnarBatch.VERSION
+    assert batch['dict_columns'] == ['VOUCHERTYPENAME', 'NARRATION']
+    assert sorted(batch['strings']) == ['Paid in cash', 'Receipt', 'Sales']
+
+
+def test_compact_records_round_trip():
+    records = [VoucherRecord(GUID=f'g-{i}', DATE='20260301', VOUCHERTYPENAME='Sales',
+                             VOUCHERNUMBER=str(i)) for i in range(4)]
+    
+    batch, rows = decode(ColumnarBatch.encode('vouchers', records))
+    
+    assert rows == [record.to_row() for record in records]
+    assert 'NARRATION' not in batch['columns']
+    assert set(batch['dict_columns']) == {'DATE', 'VOUCHERTYPENAME'}
+
+
+def test_mixed_record_types_round_trip():
+    records = [LedgerRecord(NAME='Cash', PARENT='Cash-in-Hand'), {'NAME': 'Bank', 'PARENT': 'Bank Accounts'}]
+    
+    _, rows = decode(ColumnarBatch.encode('ledgers', records))
+    
+    assert rows == [{'NAME': 'Cash', 'PARENT': 'Cash-in-Hand'}, {'NAME': 'Bank', 'PARENT': 'Bank Accounts'}]
+
+
+def test_non_string_columns_are_not_dictionary_encoded():
+    records = [{'AMOUNT': Decimal('1.50')}, {'AMOUNT': Decimal('1.50')}, {'AMOUNT': None}]
+    
+    batch, rows = decode(ColumnarBatch.encode('vouchers', records))
+    
+    assert batch['dict_columns'] == []
+    assert rows == [{'AMOUNT': '1.50'}, {'AMOUNT': '1.50'}, {}]
+
+
+def test_empty_batch():
+    batch, rows = decode(ColumnarBatch.encode('ledgers', []))
+    
+    assert (batch['count'], batch['columns'], rows) == (0, {}, [])
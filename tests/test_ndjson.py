@@ -0,0 +1,50 @@
+import gzip
+import json
+
+from tally_sync_core import NdjsonBody, Outbox, ServerSync
+
+
+def records(count):
+    return [{'GUID': f'g{i}', 'NAME': f'Ledger {i}', 'PARENT': 'Sundry Debtors'} for i in range(count)]
+
+
+def decode(body):
+    return [json.loads(line) for line in b''.join(body).decode('utf-8').splitlines()]
+
+
+def test_one_record_per_line():
+    body = NdjsonBody(records(3))
+    assert decode(body) == records(3)
+    assert body.raw_bytes == body.wire_bytes
+
+
+def test_large_batches_are_sent_in_chunks():
+    body = NdjsonBody(records(5000))
+    chunks = list(body)
+    assert len(chunks) > 1
+    assert max(map(len, chunks)) < 2 * NdjsonBody.CHUNK_BYTES
+    assert decode(chunks) == records(5000)
+
+
+def test_gzip_body_decompresses_to_the_records():
+    body = NdjsonBody(records(2000), 'gzip')
+    data = b''.join(body)
+    assert body.wire_bytes == len(data) < body.raw_bytes
+    assert [json.loads(line) for line in gzip.decompress(data).splitlines()] == records(2000)
+
+
+def test_iterating_again_starts_over():
+    body = NdjsonBody(records(10), 'gzip')
+    first = b''.join(body)
+    assert b''.join(body) == first
+
+
+def test_streamed_batches_are_not_queued_in_the_outbox(tmp_path):
+    outbox = Outbox(tmp_path / 'outbox.db')
+    server = ServerSync('http://server.invalid/api', outbox=outbox)
+    server.stream_min_records = 100
+    
+    assert server._queue('ledgers', records(100)) is None
+    assert server._queue('ledgers', records(99)) is not None
+    assert outbox.pending() == 1
+    outbox.close()
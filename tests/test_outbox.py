@@ -0,0 +1,119 @@
+import pytest
+
+from tally_sync_core import ChangeStore, Outbox, ServerSync
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    outbox = Outbox(tmp_path / 'outbox.db')
+    yield outbox
+    outbox.close()
+
+
+def make_server(outbox, change_store=None, fail=(), status=503):
+    server = ServerSync('http://server.invalid/api', outbox=outbox, change_store=change_store)
+    server.sent = []
+    
+    def send_data(endpoint, data):
+        server.sent.append((endpoint, [record['GUID'] for record in data]))
+        if endpoint in fail:
+            return {'success': False, 'error': 'down', 'status': status}
+        return {'success': True}
+    
+    server.send_data = send_data
+    return server
+
+
+def test_replay_sends_due_batches_oldest_first(outbox):
+    outbox.add('ledgers', [{'GUID': 'a'}])
+    outbox.add('vouchers', [{'GUID': 'b'}])
+    server = make_server(outbox)
+    
+    assert server.replay_outbox() == {'replayed': 2, 'pending': 0}
+    assert server.sent == [('ledgers', ['a']), ('vouchers', ['b'])]
+
+
+def test_replay_stops_at_first_failure_and_backs_off(outbox):
+    outbox.add('ledgers', [{'GUID': 'a'}])
+    outbox.add('vouchers', [{'GUID': 'b'}])
+    server = make_server(outbox, fail={'ledgers'})
+    
+    assert server.replay_outbox() == {'replayed': 0, 'pending': 2}
+    assert server.sent == [('ledgers', ['a'])]
+    assert [endpoint for _, endpoint in outbox.due()] == ['vouchers']
+
+
+def test_acknowledged_upload_supersedes_queued_records(outbox):
+    stale = outbox.add('ledgers', [{'GUID': 'a', 'NAME': 'old'}, {'GUID': 'b', 'NAME': 'old'}])
+    outbox.mark_failed(stale, 'down')
+    server = make_server(outbox)
+    
+    server.batch_send('ledgers', [{'GUID': 'a', 'NAME': 'new'}])
+    
+    assert outbox.load(stale) == [{'GUID': 'b', 'NAME': 'old'}]
+    server.batch_send('ledgers', [{'GUID': 'b', 'NAME': 'new'}])
+    assert outbox.pending() == 0
+
+
+def test_unchanged_records_supersede_queued_records(outbox, tmp_path):
+    change_store = ChangeStore(tmp_path / 'change_store.db', server_url='http://server.invalid/api')
+    current = {'GUID': 'a', 'NAME': 'new'}
+    change_store.commit('ledgers', {'a': ChangeStore.record_hash(current)})
+    outbox.add('ledgers', [{'GUID': 'a', 'NAME': 'old'}])
+    server = make_server(outbox, change_store)
+    
+    result = server.batch_send('ledgers', [current])
+    
+    assert result['skipped'] == 1
+    assert server.sent == []
+    assert outbox.pending() == 0
+    change_store.close()
+
+
+def test_supersede_is_per_endpoint(outbox):
+    outbox.add('ledgers', [{'GUID': 'a'}])
+    outbox.add('stock-items', [{'GUID': 'a'}])
+    
+    assert outbox.supersede('ledgers', {'a'}) == 1
+    assert [endpoint for _, endpoint in outbox.due()] == ['stock-items']
+
+
+def test_replay_dead_letters_permanent_rejections_and_goes_on(outbox):
+    outbox.add('ledgers', [{'GUID': 'a'}])
+    outbox.add('vouchers', [{'GUID': 'b'}])
+    server = make_server(outbox, fail={'ledgers'}, status=422)
+    
+    assert server.replay_outbox() == {'replayed': 1, 'pending': 0}
+    assert outbox.dead_letters() == 1
+
+
+def test_permanent_rejection_is_not_requeued(outbox):
+    server = make_server(outbox, fail={'ledgers'}, status=400)
+    
+    server.batch_send('ledgers', [{'GUID': 'a'}])
+    
+    assert outbox.pending() == 0
+    assert outbox.dead_letters() == 1
+    assert outbox.supersede('ledgers', {'a'}) == 0
+
+
+def test_auth_and_server_errors_are_retried(outbox):
+    for status in (401, 429, 503):
+        batch_id = outbox.add('ledgers', [{'GUID': 'a'}])
+        outbox.mark_failed(batch_id, 'failed', status)
+    
+    assert outbox.pending() == 3
+    assert outbox.dead_letters() == 0
+
+
+def test_batches_queued_before_the_guid_index_are_indexed(tmp_path):
+    outbox = Outbox(tmp_path / 'outbox.db')
+    outbox.add('ledgers', [{'GUID': 'a'}])
+    with outbox.conn:
+        outbox.conn.execute("DROP TABLE outbox_guids")
+    outbox.close()
+    
+    outbox = Outbox(tmp_path / 'outbox.db')
+    assert outbox.supersede('ledgers', {'a'}) == 1
+    assert outbox.pending() == 0
+    outbox.close()
@@ -0,0 +1,82 @@
+import pytest
+
+from tally_sync_core import ServerSync, SyncPipeline
+
+
+def collect(records):
+    return list(records)
+
+
+def test_jobs_upload_in_order_with_all_records():
+    pipeline = SyncPipeline(queue_size=2, chunk_size=3)
+    jobs = [
+        {'name': 'ledgers', 'fetch': lambda: iter(range(10)), 'upload': collect},
+        {'name': 'vouchers', 'fetch': lambda: iter(range(100, 105)), 'upload': collect},
+    ]
+    started = []
+    
+    results = pipeline.run(jobs, on_start=lambda job: started.append(job['name']))
+    
+    assert started == ['ledgers', 'vouchers']
+    assert results == {'ledgers': list(range(10)), 'vouchers': list(range(100, 105))}
+
+
+def test_unread_records_are_drained_before_the_next_job():
+    pipeline = SyncPipeline(queue_size=1, chunk_size=2)
+    jobs = [
+        {'name': 'company', 'fetch': lambda: iter(range(7)), 'upload': lambda records: next(iter(records))},
+        {'name': 'ledgers', 'fetch': lambda: iter('abc'), 'upload': collect},
+    ]
+    
+    assert pipeline.run(jobs) == {'company': 0, 'ledgers': ['a', 'b', 'c']}
+
+
+def test_fetch_errors_reach_the_upload_side():
+    def failing():
+        yield 1
+        raise RuntimeError('Tally went away')
+    
+    pipeline = SyncPipeline(chunk_size=1)
+    jobs = [{'name': 'ledgers', 'fetch': failing, 'upload': collect}]
+    
+    with pytest.raises(RuntimeError, match='Tally went away'):
+        pipeline.run(jobs)
+
+
+def test_upload_error_stops_the_fetch_thread():
+    closed = []
+    
+    def endless():
+        try:
+            n = 0
+            while True:
+                n += 1
+                yield n
+        finally:
+            closed.append(True)
+    
+    def failing_upload(records):
+        next(iter(records))
+        raise RuntimeError('server rejected')
+    
+    pipeline = SyncPipeline(queue_size=1, chunk_size=10)
+    jobs = [{'name': 'ledgers', 'fetch': endless, 'upload': failing_upload}]
+    
+    with pytest.raises(RuntimeError, match='server rejected'):
+        pipeline.run(jobs)
+    assert closed == [True]
+
+
+def test_batches_in_flight_complete_when_fetching_fails():
+    server = ServerSync('http://server.invalid/api')
+    server.send_data = lambda endpoint, data: {'success': True}
+    acked = []
+    
+    def records():
+        yield from ({'GUID': f'g{i}'} for i in range(20))
+        raise RuntimeError('Tally went away')
+    
+    with pytest.raises(RuntimeError, match='Tally went away'):
+        server.batch_send('ledgers', records(), batch_size=5,
+                          on_batch=lambda batch, success: acked.extend(batch), max_in_flight=4)
+    assert len(acked) == 20
@@ -0,0 +1,119 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from tally_sync_core import SyncScheduler
+
+NOW = datetime(2026, 3, 2, 10, 0)
+OK = {'success': True, 'stages': {'fetch': 5.0}}
+FAILED = {'success': False, 'stages': {'fetch': 5.0}}
+
+
+def scheduler(**config):
+    config = {'sync_interval': 60, 'schedule_jitter': 0.1, **config}
+    return SyncScheduler(config, rng=random.Random(7))
+
+
+def test_next_run_is_jittered_within_the_span():
+    sched = scheduler()
+    for seed in range(50):
+        sched.rng = random.Random(seed)
+        sched.completed(['ledgers'], OK, NOW)
+        delay = sched.next_due['ledgers'] - NOW
+        assert timedelta(minutes=54) <= delay <= timedelta(minutes=66)
+
+
+def test_spread_start_stays_within_the_jitter_span():
+    sched = scheduler(sync_schedule={'vouchers': 10})
+    sched.start(NOW, spread=True)
+    
+    assert all(NOW <= due <= NOW + timedelta(minutes=6) for due in sched.next_due.values())
+    assert NOW <= sched.next_due['vouchers'] <= NOW + timedelta(minutes=1)
+    assert len(set(sched.next_due.values())) > 1
+
+
+def test_plain_start_makes_everything_due():
+    sched = scheduler(sync_stock=False)
+    sched.start(NOW)
+    
+    assert sched.due(NOW) == ['company', 'ledgers', 'vouchers']
+
+
+def test_nearly_due_collections_coalesce():
+    sched = scheduler(schedule_jitter=0)
+    sched.start(NOW)
+    sched.next_due['ledgers'] = NOW + timedelta(seconds=SyncScheduler.COALESCE_SECONDS - 1)
+    sched.next_due['vouchers'] = NOW + timedelta(seconds=SyncScheduler.COALESCE_SECONDS + 1)
+    
+    assert sched.due(NOW) == ['company', 'ledgers', 'stock_items']
+
+
+def test_nothing_due_until_one_collection_is_overdue():
+    sched = scheduler(schedule_jitter=0)
+    sched.start(NOW)
+    sched.completed(sched.collections, OK, NOW)
+    
+    assert sched.due(NOW + timedelta(minutes=59)) == []
+    assert len(sched.due(NOW + timedelta(minutes=60))) == 4
+
+
+@pytest.mark.parametrize('quiet_hours, quiet, awake', [
+    ([['09:00', '11:00']], datetime(2026, 3, 2, 10, 0), datetime(2026, 3, 2, 11, 0)),
+    ([['22:00', '06:00']], datetime(2026, 3, 2, 23, 30), datetime(2026, 3, 3, 6, 0)),
+    ([['22:00', '06:00']], datetime(2026, 3, 3, 2, 0), datetime(2026, 3, 3, 6, 0)),
+])
+def test_quiet_hours_hold_runs_back(quiet_hours, quiet, awake):
+    sched = scheduler(quiet_hours=quiet_hours)
+    sched.start(quiet - timedelta(hours=1))
+    
+    assert sched.due(quiet) == []
+    assert sched.next_run(quiet) == awake
+    assert len(sched.due(awake)) == 4
+
+
+def test_failures_back_off_up_to_the_limit():
+    sched = scheduler(schedule_jitter=0)
+    intervals = []
+    for _ in range(5):
+        sched.completed(['ledgers'], FAILED, NOW)
+        intervals.append(sched.interval('ledgers'))
+    
+    assert intervals == [timedelta(minutes=60 * factor) for factor in (2, 4, 8, 8, 8)]
+    assert sched.next_due['ledgers'] == NOW + timedelta(minutes=60 * SyncScheduler.MAX_BACKOFF)
+
+
+def test_slow_fetch_backs_off():
+    sched = scheduler(schedule_jitter=0, tally_slow_seconds=30)
+    sched.completed(['vouchers'], {'success': True, 'stages': {'fetch': 31.0}}, NOW)
+    
+    assert sched.interval('vouchers') == timedelta(minutes=120)
+
+
+def test_success_halves_the_backoff():
+    sched = scheduler(schedule_jitter=0)
+    for _ in range(3):
+        sched.completed(['ledgers'], FAILED, NOW)
+    
+    sched.completed(['ledgers'], OK, NOW)
+    assert sched.interval('ledgers') == timedelta(minutes=240)
+    for _ in range(3):
+        sched.completed(['ledgers'], OK, NOW)
+    assert sched.interval('ledgers') == timedelta(minutes=60)
+
+
+def test_cancelled_run_does_not_back_off():
+    sched = scheduler(schedule_jitter=0)
+    sched.completed(['ledgers'], {'success': False, 'cancelled': True}, NOW)
+    
+    assert sched.interval('ledgers') == timedelta(minutes=60)
+
+
+def test_unavailable_endpoint_retries_at_its_time():
+    sched = scheduler()
+    retry_at = NOW + timedelta(minutes=5)
+    sched.completed(['vouchers'], {'success': False, 'unavailable': 'vouchers',
+                                   'retry_at': retry_at.isoformat()}, NOW)
+    
+    assert sched.next_due['vouchers'] == retry_at
+    assert 'vouchers' not in sched.backoff
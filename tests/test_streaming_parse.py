@@ -0,0 +1,49 @@
+import pytest
+import xml.etree.ElementTree as ET
+
+from tally_sync_core import TallyPrimeConnector, VoucherRecord
+
+EXPORT = (b'<ENVELOPE><BODY><DATA><COLLECTION>'
+          b'<VOUCHER><GUID>v1</GUID><DATE>20240101</DATE>'
+          b'<ALLLEDGERENTRIES.LIST><VOUCHER><GUID>nested</GUID></VOUCHER></ALLLEDGERENTRIES.LIST>'
+          b'</VOUCHER>'
+          b'<VOUCHER><GUID>v2</GUID><DATE>20240102</DATE></VOUCHER>'
+          b'</COLLECTION></DATA></BODY></ENVELOPE>')
+
+
+def split(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def parse(chunks, compact=True, strict=False):
+    tally = TallyPrimeConnector('127.0.0.1', 9000, compact_records=compact)
+    return list(tally._iter_collection(chunks, 'VOUCHER', strict))
+
+
+@pytest.mark.parametrize('size', [1, 7, 64, len(EXPORT)])
+def test_items_are_the_same_however_the_body_is_split(size):
+    records = parse(split(EXPORT, size))
+    assert [record.GUID for record in records] == ['v1', 'v2']
+    assert all(isinstance(record, VoucherRecord) for record in records)
+
+
+def test_matches_the_buffered_parser():
+    flat = EXPORT.replace(b'<ALLLEDGERENTRIES.LIST><VOUCHER><GUID>nested</GUID></VOUCHER></ALLLEDGERENTRIES.LIST>',
+                          b'<ALLLEDGERENTRIES.LIST><AMOUNT>-10.00</AMOUNT></ALLLEDGERENTRIES.LIST>')
+    tally = TallyPrimeConnector('127.0.0.1', 9000, compact_records=False)
+    streamed = list(tally._iter_collection(split(flat, 5), 'VOUCHER'))
+    assert streamed == tally._parse_collection(flat.decode(), 'VOUCHER')
+
+
+def test_nested_items_stay_inside_their_parent():
+    tally = TallyPrimeConnector('127.0.0.1', 9000, compact_records=False)
+    records = list(tally._iter_collection([EXPORT], 'VOUCHER'))
+    assert [record['GUID'] for record in records] == ['v1', 'v2']
+    assert records[0]['ALLLEDGERENTRIES.LIST']['VOUCHER'] == {'GUID': 'nested'}
+
+
+def test_truncated_body_ends_the_collection_unless_strict():
+    truncated = EXPORT[:EXPORT.index(b'<VOUCHER><GUID>v2')] + b'<VOUCHER><GU'
+    assert [record.GUID for record in parse([truncated, b'<<'])] == ['v1']
+    with pytest.raises(ET.ParseError):
+        parse([truncated, b'<<'], strict=True)
@@ -0,0 +1,77 @@
+import re
+import threading
+
+import pytest
+
+from tally_sync_core import TallyPrimeConnector
+
+
+class NoWait(threading.Event):
+    def wait(self, timeout=None):
+        return self.is_set()
+
+
+def connector(failures):
+    """Connector whose voucher exports fail ``failures[start]`` times per window start"""
+    tally = TallyPrimeConnector('127.0.0.1', 9000, cancel_event=NoWait())
+    tally.requests = []
+    
+    def fetch(xml_request, tag_name, strict=False):
+        start, end = re.findall(r'<SV(?:FROM|TO)DATE>(\d+)', xml_request)
+        tally.requests.append((start, end))
+        if failures.get(start, 0):
+            failures[start] -= 1
+            raise RuntimeError('Tally timed out')
+        return iter([{'GUID': start, 'DATE': start}])
+    
+    tally._fetch_collection = fetch
+    return tally
+
+
+def test_failed_window_is_halved_then_retried_at_one_day():
+    tally = connector({'20240108': 4})
+    
+    vouchers = list(tally.get_vouchers_chunked('20240101', '20240114', 'week',
+                                               adaptive=False, max_retries=2))
+    
+    assert tally.requests[1:6] == [
+        ('20240108', '20240114'),
+        ('20240108', '20240110'),
+        ('20240108', '20240108'),
+        ('20240108', '20240108'),
+        ('20240108', '20240108'),
+    ]
+    assert [v['DATE'] for v in vouchers][:2] == ['20240101', '20240108']
+
+
+def test_window_grows_back_after_a_failure():
+    tally = connector({'20240108': 3})
+    
+    list(tally.get_vouchers_chunked('20240101', '20240131', 'week', adaptive=False, max_retries=2))
+    
+    assert tally.requests[5:] == [
+        ('20240109', '20240110'),
+        ('20240111', '20240114'),
+        ('20240115', '20240121'),
+        ('20240122', '20240128'),
+        ('20240129', '20240131'),
+    ]
+
+
+def test_gives_up_after_max_retries_at_one_day():
+    tally = connector({'20240101': 10})
+    
+    with pytest.raises(RuntimeError, match='timed out'):
+        list(tally.get_vouchers_chunked('20240101', '20240107', 'week', adaptive=False, max_retries=2))
+    assert tally.requests.count(('20240101', '20240101')) == 3
+
+
+def test_on_window_reports_each_window_before_its_records():
+    tally = connector({})
+    events = []
+    
+    for voucher in tally.get_vouchers_chunked('20240101', '20240110', 'week', adaptive=False,
+                                              on_window=lambda *window: events.append(window)):
+        events.append(voucher['DATE'])
+    
+    assert events == [('20240101', '20240107', 1), '20240101', ('20240108', '20240110', 1), '20240108']
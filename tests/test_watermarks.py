@@ -0,0 +1,45 @@
+from tally_sync_core import AlterIdTracker, WatermarkStore
+
+
+def records(*alter_ids):
+    return [{'GUID': f'g{i}', 'ALTERID': str(i)} for i in alter_ids]
+
+
+def test_watermark_advances_to_highest_acknowledged():
+    tracker = AlterIdTracker(10)
+    tracker.record(records(11, 12), True)
+    tracker.record(records(15, 13), True)
+    assert tracker.new_watermark() == 15
+
+
+def test_watermark_stops_below_first_failure():
+    tracker = AlterIdTracker(10)
+    tracker.record(records(11, 12), True)
+    tracker.record(records(13, 14), False)
+    tracker.record(records(15, 16), True)
+    assert tracker.new_watermark() == 12
+
+
+def test_watermark_never_moves_back():
+    tracker = AlterIdTracker(10)
+    tracker.record(records(5, 11), False)
+    tracker.record(records(12), True)
+    assert tracker.new_watermark() == 10
+
+
+def test_records_without_alter_id_are_ignored():
+    tracker = AlterIdTracker(3)
+    tracker.record([{'GUID': 'x'}, {'GUID': 'y', 'ALTERID': ''}], False)
+    assert tracker.new_watermark() == 3
+
+
+def test_store_is_per_company_and_only_moves_forward(tmp_path):
+    store = WatermarkStore(tmp_path / 'watermarks.json')
+    store.advance('Acme', 'ledgers', 20)
+    store.advance('Acme', 'ledgers', 15)
+    store.advance('Beta', 'ledgers', 5)
+    
+    reloaded = WatermarkStore(tmp_path / 'watermarks.json')
+    assert reloaded.get('Acme', 'ledgers') == 20
+    assert reloaded.get('Beta', 'ledgers') == 5
+    assert reloaded.get('Acme', 'stock-items') == 0
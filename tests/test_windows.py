@@ -0,0 +1,54 @@
+from tally_sync_core import WindowTracker
+
+
+def vouchers(date, count):
+    return [{'GUID': f'{date}-{i}', 'DATE': date} for i in range(count)]
+
+
+def tracker_with_log():
+    completed = []
+    tracker = WindowTracker(lambda start, end, _: completed.append((start, end)))
+    return tracker, completed
+
+
+def test_window_completes_once_all_records_are_acknowledged():
+    tracker, completed = tracker_with_log()
+    tracker.add_window('20240101', '20240107', 3)
+    tracker.record(vouchers('20240102', 2), True)
+    assert completed == []
+    tracker.record(vouchers('20240106', 1), True)
+    assert completed == [('20240101', '20240107')]
+
+
+def test_later_window_waits_for_earlier_ones():
+    tracker, completed = tracker_with_log()
+    tracker.add_window('20240101', '20240107', 1)
+    tracker.add_window('20240108', '20240114', 1)
+    tracker.record(vouchers('20240110', 1), True)
+    assert completed == []
+    tracker.record(vouchers('20240103', 1), True)
+    assert completed == [('20240108', '20240114')]
+
+
+def test_failed_window_blocks_completion():
+    tracker, completed = tracker_with_log()
+    tracker.add_window('20240101', '20240107', 2)
+    tracker.add_window('20240108', '20240114', 1)
+    tracker.record(vouchers('20240101', 1), False)
+    tracker.record(vouchers('20240102', 1), True)
+    tracker.record(vouchers('20240109', 1), True)
+    assert completed == []
+
+
+def test_empty_window_completes_when_registered():
+    tracker, completed = tracker_with_log()
+    tracker.add_window('20240101', '20240107', 0)
+    assert completed == [('20240101', '20240107')]
+
+
+def test_acknowledged_totals():
+    tracker, _ = tracker_with_log()
+    tracker.add_window('20240101', '20240107', 3)
+    tracker.record(vouchers('20240101', 2), True)
+    tracker.record(vouchers('20240102', 1), False)
+    assert (tracker.acked_batches, tracker.acked_records) == (1, 2)